@@ -1,24 +1,86 @@
-import os
 import time
-from typing import List, Dict, Any, Optional
+_import_started = time.monotonic()  # The startup budget covers importing the app
+
+import os
+import json
+import hashlib
+import threading
+import uuid
+from contextlib import asynccontextmanager, nullcontext
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+import anyio
+from fastapi import FastAPI, HTTPException, Request, Response, Header, Query
+from fastapi.responses import JSONResponse, RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.models import AnimationRequest, AnimationResponse, Location, VideoQuality
+from app.models import AnimationRequest, AnimationResponse, BatchAnimationRequest, Location, VideoQuality
+from app.services.delivery import IMMUTABLE_CACHE_CONTROL, VideoDeliveryService
 from app.services.geocoder import geocoding_service
-from app.services.renderer import blender_renderer
+from app.services.jobs import job_store
+from app.services.places import place_index
+from app.services.prewarm import prewarm_scheduler, tour_key
+from app.services.planner import frame_planner
+from app.services.previews import preview_generator, resolve_sprite_urls
+from app.services.profiling import JobProfiler
+from app.services.accounting import usage_ledger
+from app.services.rate_limiter import rate_limiter
+from app.services.render_router import render_router
+from app.services.resources import ResourceUsage
+from app.services.scheduler import render_scheduler, quality_cost
+from app.services.storage import ArtifactStore
+from app.services.tracing import TraceMiddleware, tracer
+from app.services.variants import variant_encoder
+from app.utils.lazy import LazyService
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Seconds from import to serving requests before startup is reported as over budget
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "1.0"))
+
+# Services built in the background after startup, so the first job does not pay for them
+WARM_SERVICES = [geocoding_service, render_router]
+
+# Startup timings and warm-up state reported by /ready
+startup_state: Dict[str, Any] = {"ready": False, "startup_seconds": None, "services": {}, "error": None}
+
+def _warm_services():
+    """Build the lazily initialized services and mark the server ready."""
+    try:
+        for service in WARM_SERVICES:
+            service.get()
+            startup_state["services"][service.name] = round(service.init_seconds or 0.0, 3)
+        startup_state["ready"] = True
+        logger.info("Services warmed up: {}", startup_state["services"])
+    except Exception as e:
+        startup_state["error"] = str(e)
+        logger.error("Service warm-up failed: {}", e)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup_seconds = time.monotonic() - _import_started
+    startup_state["startup_seconds"] = round(startup_seconds, 3)
+    if startup_seconds > STARTUP_BUDGET_SECONDS:
+        logger.warning("Startup took {:.3f}s, over the {:.1f}s budget", startup_seconds, STARTUP_BUDGET_SECONDS)
+    else:
+        logger.info("Started in {:.3f}s", startup_seconds)
+    # Serve immediately; /ready reports 503 until the services are built
+    threading.Thread(target=_warm_services, name="service-warmup", daemon=True).start()
+    prewarm_scheduler.render = _prerender_tour
+    prewarm_scheduler.is_idle = render_scheduler.is_idle
+    # Late-bound, so the artifact store is still built by the warm-up thread
+    prewarm_scheduler.exists = lambda key: artifact_store.exists(key)
+    prewarm_scheduler.start()
+    yield
+    prewarm_scheduler.stop()
+
 app = FastAPI(
     title="Earth Tour Server",
     description="Server for generating 3D flight path animations over Earth using Blender",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # TODO: tighten CORS settings before prod deployment
@@ -29,16 +91,37 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(TraceMiddleware)
 
 # Create output directory if it doesn't exist
 output_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "output")
 os.makedirs(output_dir, exist_ok=True)
 
-# Serve static files (videos)
-app.mount("/videos", StaticFiles(directory=output_dir), name="videos")
+# Serve rendered videos with range, conditional and signed-URL support
+video_delivery = VideoDeliveryService.from_env(output_dir)
+
+# Where finished artifacts are kept: the output directory, or an object store that
+# /videos/ redirects to so any API node can serve any job
+artifact_store = LazyService("artifact_store", lambda: ArtifactStore.from_env(output_dir))
+WARM_SERVICES.append(artifact_store)
+
+# Profiles requested per job (or sampled) are written next to the videos
+job_profiler = JobProfiler.from_env(output_dir)
+
+# API keys that identify clients; unknown keys are ignored, so a made-up key per
+# request cannot buy a fresh rate limit bucket or scheduling share
+API_KEYS = frozenset(key.strip() for key in os.getenv("API_KEYS", "").split(",") if key.strip())
 
-# Job status tracking
-animation_jobs = {}
+# Longest a status request may wait for a job to change
+MAX_JOB_WAIT_SECONDS = float(os.getenv("MAX_JOB_WAIT_SECONDS", "30"))
+# Most jobs returned by one /jobs request
+MAX_JOBS_PER_REQUEST = 100
+# Client ID that pre-rendered popular tours are queued and listed under
+PREWARM_CLIENT = "prewarm"
+
+# Idempotency-Key -> jobs it created, so retried submissions map to the same job(s)
+idempotency_keys = {}
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60  # seconds
 
 @app.get("/")
 async def root():
@@ -49,12 +132,175 @@ async def root():
         "status": "running"
     }
 
+@app.get("/ready")
+async def ready():
+    """
+    Readiness probe for load balancers.
+    
+    Returns 503 until the geocoder and renderers have been built, so traffic only
+    reaches a replica once its first job will not pay for initialization.
+    
+    Returns:
+        dict: Readiness, startup time and per-service initialization times
+    """
+    return JSONResponse(status_code=200 if startup_state["ready"] else 503, content=startup_state)
+
+def _fail_job(request_id: str, error_msg: str):
+    """Mark a job as failed and log the reason."""
+    logger.error(error_msg)
+    job_store.update(request_id, status="failed", error=error_msg)
+
+def _geocode_names(names: List[str]) -> Dict[str, Optional[Tuple[float, float]]]:
+    """
+    Geocode a set of location names, looking each distinct name up only once.
+    
+    Args:
+        names (List[str]): Location names, possibly with duplicates
+        
+    Returns:
+        Dict[str, Optional[Tuple[float, float]]]: Coordinates (or None) per name
+    """
+    geocoded = {}
+    for name in names:
+        if name not in geocoded:
+            geocoded[name] = geocoding_service.geocode(name)
+    return geocoded
+
+def _resolve_locations(
+    request_id: str,
+    locations: List[Location],
+    geocoded: Dict[str, Optional[Tuple[float, float]]]
+) -> Optional[List[Tuple[float, float]]]:
+    """
+    Turn request locations into coordinates, failing the job if any cannot be resolved.
+    
+    Args:
+        request_id (str): Job ID, updated on failure
+        locations (List[Location]): Locations from the request
+        geocoded (Dict): Coordinates for the named locations
+        
+    Returns:
+        Optional[List[Tuple[float, float]]]: List of (lat, lon) tuples, or None on failure
+    """
+    processed_locations = []
+    for location in locations:
+        if location.lat is not None and location.lon is not None:
+            # Location already has coordinates
+            processed_locations.append((location.lat, location.lon))
+        elif location.name:
+            coords = geocoded.get(location.name)
+            if coords:
+                processed_locations.append(coords)
+            else:
+                _fail_job(request_id, f"Failed to geocode location: {location.name}")
+                return None
+        else:
+            _fail_job(request_id, "Location missing both name and coordinates")
+            return None
+    return processed_locations
+
+def _render_job(
+    request_id: str,
+    processed_locations: List[Tuple[float, float]],
+    quality: VideoQuality,
+    fps: int = 30,
+    duration: Optional[int] = None,
+    visual: str = "mobile",
+    frame_budget: Optional[int] = None,
+    profile_dir: Optional[str] = None
+):
+    """
+    Render a job whose locations have been resolved and record the result.
+    
+    Args:
+        request_id (str): Unique request ID
+        processed_locations (List[Tuple[float, float]]): List of (lat, lon) tuples
+        quality (VideoQuality): Video quality setting
+        fps (int): Frames per second
+        duration (int): Animation duration in seconds
+        visual (str): Visual profile name
+        frame_budget (int): Maximum number of frames to render
+        profile_dir (str, optional): Where Blender writes its profiles, for profiled jobs
+    """
+    # Plan before rendering so clients polling the job can see what will be rendered
+    with tracer.span("plan"):
+        plan = frame_planner.plan(processed_locations, fps, duration, frame_budget)
+    job_store.update(request_id, plan=plan.to_dict())
+    
+    usage = ResourceUsage()
+    start_time = time.time()
+    video_path = render_router.render_animation(
+        locations=processed_locations,
+        quality=quality,
+        fps=fps,
+        duration=duration,
+        visual=visual,
+        plan=plan,
+        usage=usage,
+        profile_dir=profile_dir
+    )
+    render_time = time.time() - start_time
+    
+    # Failed renders consumed resources too
+    job_store.update(request_id, usage=usage.to_dict())
+    usage_ledger.record(quality.value, usage, render_time)
+    
+    if video_path:
+        # Convert absolute path to URL path
+        video_filename = os.path.basename(video_path)
+        video_url = f"/videos/{video_filename}"
+        
+        # Generate previews while the video uploads; stored locally, it already is
+        upload_span = tracer.start_span("upload", key=video_filename)
+        upload = artifact_store.upload_async(video_filename, video_path)
+        if upload.done():
+            previews = None
+        else:
+            with tracer.span("previews"):
+                previews = preview_generator.generate(video_path)
+        stored = upload.result()
+        tracer.end_span(upload_span, None if stored else RuntimeError("upload failed"))
+        if not stored:
+            _fail_job(request_id, "Failed to store the rendered video")
+            return
+        
+        # Update job status
+        job_store.update(request_id, status="completed", video_path=video_url,
+                         video_file=video_filename, duration=render_time)
+        
+        # Poster, thumbnails and scrub sprites are a nice-to-have; a failure here
+        # should not fail an otherwise successful render
+        if previews is None:
+            with tracer.span("previews"):
+                previews = preview_generator.generate(video_path)
+        if previews and _store_artifacts(_preview_files(previews)):
+            job_store.update(request_id, previews=previews)
+        
+        # HEVC/AV1 variants take longer than the render itself at high qualities;
+        # the job is already playable, so clients pick them up when they appear
+        variants = {}
+        if variant_encoder.codecs:
+            variants = variant_encoder.encode(video_path, quality.value, fps, usage)
+            variants = {codec: key for codec, key in variants.items() if _store_artifacts([key])}
+            job_store.update(request_id, variants=variants, usage=usage.to_dict())
+        
+        # Render nodes keep nothing once artifacts are in an object store
+        for key in [video_filename] + _preview_files(previews or {}) + list(variants.values()):
+            artifact_store.release_local(os.path.join(output_dir, key))
+        
+        logger.info(f"Animation completed: {video_path} in {render_time:.2f} seconds")
+    else:
+        # Handle rendering failure
+        _fail_job(request_id, "Failed to render animation")
+
 def process_animation_request(
     request_id: str,
     locations: List[Location],
     quality: VideoQuality,
     fps: int = 30,
-    duration: Optional[int] = None
+    duration: Optional[int] = None,
+    visual: str = "mobile",
+    frame_budget: Optional[int] = None
 ):
     """
     Background task to process animation requests.
@@ -65,77 +311,229 @@ def process_animation_request(
         quality (VideoQuality): Video quality setting
         fps (int): Frames per second
         duration (int): Animation duration in seconds
+        visual (str): Visual profile name
+        frame_budget (int): Maximum number of frames to render
+    """
+    profiled = job_store.get(request_id).get("profiled", False)
+    with job_profiler.profile(request_id, profiled) as profile_dir:
+        try:
+            job_store.update(request_id, status="processing")
+            
+            # Process all locations to ensure we have coordinates
+            geocoded = _geocode_names([loc.name for loc in locations if loc.name and loc.lat is None])
+            processed_locations = _resolve_locations(request_id, locations, geocoded)
+            if processed_locations is not None:
+                _render_job(request_id, processed_locations, quality, fps, duration, visual, frame_budget,
+                            profile_dir=profile_dir)
+                
+        except Exception as e:
+            _fail_job(request_id, f"Error processing animation: {str(e)}")
+    if profiled:
+        _store_profile(request_id)
+
+def process_animation_batch(jobs: List[Tuple[str, AnimationRequest]]):
+    """
+    Background task to process a batch of animation requests.
+    
+    All distinct location names across the batch are geocoded up front, so a city
+    shared by several tours is looked up once. Tours are then rendered in order.
+    
+    Args:
+        jobs (List[Tuple[str, AnimationRequest]]): (job ID, request) pairs
     """
     try:
-        animation_jobs[request_id]["status"] = "processing"
-        
-        # Process all locations to ensure we have coordinates
-        processed_locations = []
-
-        # This is a simple, but not the most efficient approach
-        for location in locations:
-            if location.lat is not None and location.lon is not None:
-                # Location already has coordinates
-                processed_locations.append((location.lat, location.lon))
-            elif location.name:
-                # Need to geocode the location
-                coords = geocoding_service.geocode(location.name)
-                if coords:
-                    processed_locations.append(coords)
-                else:
-                    error_msg = f"Failed to geocode location: {location.name}"
-                    logger.error(error_msg)
-                    animation_jobs[request_id]["status"] = "failed"
-                    animation_jobs[request_id]["error"] = error_msg
-                    return
-            else:
-                error_msg = "Location missing both name and coordinates"
-                logger.error(error_msg)
-                animation_jobs[request_id]["status"] = "failed"
-                animation_jobs[request_id]["error"] = error_msg
-                return
-        
-        # Render the animation
-        start_time = time.time()
-        video_path = blender_renderer.render_animation(
-            locations=processed_locations,
-            quality=quality,
-            fps=fps,
-            duration=duration
+        geocoded = _geocode_names([
+            loc.name
+            for _, request in jobs
+            for loc in request.locations
+            if loc.name and loc.lat is None
+        ])
+    except Exception as e:
+        for request_id, _ in jobs:
+            _fail_job(request_id, f"Error processing animation: {str(e)}")
+        return
+    
+    for request_id, request in jobs:
+        profiled = job_store.get(request_id).get("profiled", False)
+        with job_profiler.profile(request_id, profiled) as profile_dir:
+            try:
+                job_store.update(request_id, status="processing")
+                processed_locations = _resolve_locations(request_id, request.locations, geocoded)
+                if processed_locations is not None:
+                    _render_job(request_id, processed_locations, request.quality,
+                                duration=request.duration, visual=request.visual,
+                                frame_budget=request.frame_budget, profile_dir=profile_dir)
+            except Exception as e:
+                _fail_job(request_id, f"Error processing animation: {str(e)}")
+        if profiled:
+            _store_profile(request_id)
+
+def _create_job(request: AnimationRequest, client_id: str) -> str:
+    """
+    Register a new queued job for a request.
+    
+    Args:
+        request (AnimationRequest): Animation request
+        client_id (str): Client the job belongs to
+        
+    Returns:
+        str: The new job ID
+    """
+    # Generate a unique job ID; id(request) is reused as soon as a request is freed
+    request_id = f"job_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex}"
+    
+    # Initialize job status
+    job_store.create(request_id, {
+        "id": request_id,
+        "status": "queued",
+        "created": datetime.now().isoformat(),
+        "client": client_id,
+        "tour": tour_key(request),
+        "profiled": job_profiler.should_profile(request.profile),
+        # Set when tracing: the job's spans belong to the trace of the request creating it
+        "trace_id": tracer.current().trace_id if tracer.current() else None,
+        "request": {
+            "locations": [loc.dict() for loc in request.locations],
+            "quality": request.quality.value,
+            "visual": request.visual,
+            "frame_budget": request.frame_budget
+        }
+    })
+    return request_id
+
+def _serve_prerendered(request_id: str) -> bool:
+    """
+    Complete a job at once from its tour's pre-rendered video, if there is one.
+    
+    Checking that the video is still stored can be a round trip to the object
+    store, so async handlers run this in a worker thread.
+    """
+    prerendered = prewarm_scheduler.lookup(job_store.get(request_id)["tour"])
+    if not prerendered:
+        return False
+    job_store.update(request_id, status="completed", duration=0.0, **prerendered)
+    logger.info(f"Job {request_id} served from a pre-rendered tour")
+    return True
+
+def _prerender_tour(request: AnimationRequest) -> Optional[Dict[str, Any]]:
+    """
+    Render a popular tour ahead of demand, for the pre-render scheduler.
+    
+    The tour renders as a regular job of the "prewarm" client, queued behind client
+    jobs like any other, and the cache segments it used are pinned.
+    
+    Args:
+        request (AnimationRequest): A request for the tour
+        
+    Returns:
+        Optional[Dict[str, Any]]: The pre-render for PrewarmScheduler, or None on failure
+    """
+    request_id = _create_job(request, PREWARM_CLIENT)
+    segment_cache = getattr(render_router.blender, "segment_cache", None)
+    done = threading.Event()
+    segment_keys = set()
+    
+    def run():
+        try:
+            with segment_cache.track() if segment_cache else nullcontext(set()) as keys:
+                process_animation_request(request_id, request.locations, request.quality,
+                                          duration=request.duration, visual=request.visual,
+                                          frame_budget=request.frame_budget)
+            segment_keys.update(keys)
+        finally:
+            done.set()
+    
+    render_scheduler.submit(PREWARM_CLIENT, quality_cost(request.quality.value), run)
+    done.wait()
+    
+    job = job_store.get(request_id)
+    if job["status"] != "completed":
+        return None
+    key = job["tour"]
+    if segment_cache:
+        segment_cache.pin(key, segment_keys)
+    return {
+        "artifact": job["video_file"],
+        "job": {field: job[field] for field in ("video_path", "video_file", "previews", "variants", "plan") if field in job},
+        "release": (lambda: segment_cache.unpin(key)) if segment_cache else None,
+    }
+
+def _client_id(http_request: Request, api_key: Optional[str]) -> str:
+    """
+    Identify the client for rate limiting and fair scheduling.
+    
+    Only keys listed in API_KEYS identify a client; requests with any other key
+    are identified by IP address. Keys are hashed so the identifier can be logged
+    and stored with jobs.
+    """
+    if api_key and api_key in API_KEYS:
+        return f"key:{hashlib.sha256(api_key.encode()).hexdigest()[:12]}"
+    host = http_request.client.host if http_request.client else "unknown"
+    return f"ip:{host}"
+
+def _enforce_rate_limit(client_id: str, cost: float = 1.0):
+    """Raise 429 with a Retry-After header if the client is over its request rate."""
+    allowed, retry_after = rate_limiter.check(client_id, cost)
+    if not allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))}
         )
-        render_time = time.time() - start_time
+
+def _request_fingerprint(payload: Any) -> str:
+    """Hash a request body so a reused Idempotency-Key can be checked against it."""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def _lookup_idempotency_key(scope: str, key: str, fingerprint: str) -> Optional[List[str]]:
+    """
+    Find the jobs previously created with an Idempotency-Key.
+    
+    Args:
+        scope (str): Endpoint the key was used on
+        key (str): Value of the Idempotency-Key header
+        fingerprint (str): Fingerprint of the current request body
         
-        if video_path:
-            # Convert absolute path to URL path
-            video_filename = os.path.basename(video_path)
-            video_url = f"/videos/{video_filename}"
-            
-            # Update job status
-            animation_jobs[request_id]["status"] = "completed"
-            animation_jobs[request_id]["video_path"] = video_url
-            animation_jobs[request_id]["duration"] = render_time
-            
-            logger.info(f"Animation completed: {video_path} in {render_time:.2f} seconds")
-        else:
-            # Handle rendering failure
-            error_msg = "Failed to render animation"
-            animation_jobs[request_id]["status"] = "failed"
-            animation_jobs[request_id]["error"] = error_msg
-            logger.error(error_msg)
-            
-    except Exception as e:
-        error_msg = f"Error processing animation: {str(e)}"
-        animation_jobs[request_id]["status"] = "failed"
-        animation_jobs[request_id]["error"] = error_msg
-        logger.error(error_msg)
+    Returns:
+        Optional[List[str]]: Job IDs created by the original request, or None if the key is new
+    """
+    now = time.time()
+    for stale_key in [k for k, v in idempotency_keys.items() if now - v["created"] > IDEMPOTENCY_KEY_TTL]:
+        del idempotency_keys[stale_key]
+    
+    entry = idempotency_keys.get(f"{scope}:{key}")
+    if entry is None:
+        return None
+    if entry["fingerprint"] != fingerprint:
+        raise HTTPException(status_code=422,
+                            detail="Idempotency-Key has already been used with a different request")
+    return entry["job_ids"]
+
+def _remember_idempotency_key(scope: str, key: str, fingerprint: str, job_ids: List[str]):
+    """Record the jobs created for an Idempotency-Key."""
+    idempotency_keys[f"{scope}:{key}"] = {
+        "fingerprint": fingerprint,
+        "job_ids": job_ids,
+        "created": time.time()
+    }
 
 @app.post("/generate-animation", response_model=dict)
-async def generate_animation(request: AnimationRequest, background_tasks: BackgroundTasks):
+async def generate_animation(
+    request: AnimationRequest,
+    http_request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    x_api_key: Optional[str] = Header(None)
+):
     """
     Generate a flight path animation over Earth.
     
     Args:
         request (AnimationRequest): Animation request with locations and quality
+        idempotency_key (str, optional): Idempotency-Key header; retries with the same
+            key return the original job instead of queuing a new render
+        x_api_key (str, optional): X-API-Key header identifying the client for rate
+            limiting and fair scheduling; the client IP is used without it
         
     Returns:
         dict: Job ID and status information
@@ -145,27 +543,45 @@ async def generate_animation(request: AnimationRequest, background_tasks: Backgr
         if len(request.locations) < 2:
             raise HTTPException(status_code=400, detail="At least 2 locations are required")
         
-        # Generate a unique job ID
-        request_id = f"job_{datetime.now().strftime('%Y%m%d%H%M%S')}_{id(request)}"
+        if idempotency_key:
+            fingerprint = _request_fingerprint(request.dict())
+            existing = _lookup_idempotency_key("single", idempotency_key, fingerprint)
+            if existing:
+                response.headers["Idempotent-Replayed"] = "true"
+                logger.info(f"Idempotent replay of job {existing[0]}")
+                return {
+                    "job_id": existing[0],
+                    "status": job_store.get(existing[0])["status"],
+                    "message": "Animation request was already submitted with this Idempotency-Key"
+                }
         
-        # Initialize job status
-        animation_jobs[request_id] = {
-            "id": request_id,
-            "status": "queued",
-            "created": datetime.now().isoformat(),
-            "request": {
-                "locations": [loc.dict() for loc in request.locations],
-                "quality": request.quality.value
+        # Replays above are free; only new renders count against the rate limit
+        client_id = _client_id(http_request, x_api_key)
+        _enforce_rate_limit(client_id)
+        
+        request_id = _create_job(request, client_id)
+        if idempotency_key:
+            _remember_idempotency_key("single", idempotency_key, fingerprint, [request_id])
+        
+        prewarm_scheduler.record(request)
+        if await anyio.to_thread.run_sync(_serve_prerendered, request_id):
+            return {
+                "job_id": request_id,
+                "status": "completed",
+                "message": "Animation was served from a pre-rendered tour"
             }
-        }
         
-        # Add task to background processing
-        background_tasks.add_task(
+        # Queue the render, sharing workers fairly between clients
+        render_scheduler.submit(
+            client_id,
+            quality_cost(request.quality.value),
             process_animation_request,
             request_id,
             request.locations,
             request.quality,
-            duration=request.duration
+            duration=request.duration,
+            visual=request.visual,
+            frame_budget=request.frame_budget
         )
         
         logger.info(f"Animation request queued with ID: {request_id}")
@@ -177,49 +593,375 @@ async def generate_animation(request: AnimationRequest, background_tasks: Backgr
             "message": "Animation request has been queued for processing"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing animation request: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/job/{job_id}")
-async def get_job_status(job_id: str):
+@app.post("/generate-animations", response_model=dict)
+async def generate_animations(
+    request: BatchAnimationRequest,
+    http_request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    x_api_key: Optional[str] = Header(None)
+):
     """
-    Get the status of an animation job.
+    Generate several flight path animations in one call.
     
     Args:
-        job_id (str): Job ID to check
+        request (BatchAnimationRequest): Batch of animation requests
+        idempotency_key (str, optional): Idempotency-Key header; retries with the same
+            key return the original jobs instead of queuing new renders
+        x_api_key (str, optional): X-API-Key header identifying the client
         
     Returns:
-        dict: Job status information
+        dict: Job IDs and status information, in the order of the submitted tours
     """
-    if job_id not in animation_jobs:
-        raise HTTPException(status_code=404, detail="Job not found")
+    try:
+        if idempotency_key:
+            fingerprint = _request_fingerprint(request.dict())
+            existing = _lookup_idempotency_key("batch", idempotency_key, fingerprint)
+            if existing:
+                response.headers["Idempotent-Replayed"] = "true"
+                logger.info(f"Idempotent replay of batch with {len(existing)} jobs")
+                return {
+                    "jobs": [{"job_id": job_id, "status": job_store.get(job_id)["status"]}
+                             for job_id in existing],
+                    "message": "Animation requests were already submitted with this Idempotency-Key"
+                }
+        
+        # Each tour counts as one request against the rate limit, so a batch larger
+        # than the burst could never be accepted; say so instead of asking for a retry
+        if rate_limiter.enabled and len(request.tours) > rate_limiter.burst:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch of {len(request.tours)} tours exceeds the limit of {int(rate_limiter.burst)} "
+                       f"tours per request; split it into smaller batches"
+            )
+        client_id = _client_id(http_request, x_api_key)
+        _enforce_rate_limit(client_id, len(request.tours))
+        
+        jobs = [(_create_job(tour, client_id), tour) for tour in request.tours]
+        job_ids = [request_id for request_id, _ in jobs]
+        if idempotency_key:
+            _remember_idempotency_key("batch", idempotency_key, fingerprint, job_ids)
+        
+        for tour in request.tours:
+            prewarm_scheduler.record(tour)
+        to_render = []
+        for request_id, tour in jobs:
+            if not await anyio.to_thread.run_sync(_serve_prerendered, request_id):
+                to_render.append((request_id, tour))
+        if to_render:
+            render_scheduler.submit(
+                client_id,
+                sum(quality_cost(tour.quality.value) for _, tour in to_render),
+                process_animation_batch,
+                to_render
+            )
+        
+        logger.info(f"Batch of {len(jobs)} animation requests queued: {', '.join(job_ids)}")
+        
+        return {
+            "jobs": [{"job_id": job_id, "status": job_store.get(job_id)["status"]} for job_id in job_ids],
+            "message": f"{len(job_ids)} animation requests have been queued for processing"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing batch animation request: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _preview_files(previews: Dict[str, Any]) -> List[str]:
+    """Artifact keys of a job's preview images."""
+    if not previews:
+        return []
+    return [previews["poster"], *previews["thumbnails"].values(), previews["sprite"], previews["sprite_vtt"]]
+
+def _store_artifacts(keys: List[str]) -> bool:
+    """Upload artifacts from the output directory concurrently; True if all were stored."""
+    uploads = [artifact_store.upload_async(key, os.path.join(output_dir, key)) for key in keys]
+    return all([upload.result() for upload in uploads])
+
+def _store_profile(request_id: str):
+    """Store a profiled job's profile files and list them with the job."""
+    keys = job_profiler.artifacts(request_id)
+    if not keys or not _store_artifacts(keys):
+        logger.warning(f"No profile stored for job {request_id}")
+        return
+    job_store.update(request_id, profile=keys)
+    for key in keys:
+        artifact_store.release_local(os.path.join(output_dir, key))
+
+def _profile_urls(job_id: str, keys: List[str]) -> Dict[str, str]:
+    """Delivery URLs of a job's profile files, by path within its profile directory."""
+    prefix = f"profiles/{job_id}/"
+    return {key[len(prefix):] if key.startswith(prefix) else key: video_delivery.url_for(key) for key in keys}
+
+def _preview_urls(previews: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn stored preview paths into (optionally signed) delivery URLs."""
+    return {
+        "poster": video_delivery.url_for(previews["poster"]),
+        "thumbnails": {width: video_delivery.url_for(path) for width, path in previews["thumbnails"].items()},
+        "sprite": video_delivery.url_for(previews["sprite"]),
+        "sprite_vtt": video_delivery.url_for(previews["sprite_vtt"]),
+    }
+
+@app.get("/geocode/suggest")
+async def suggest_places(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(5, ge=1, le=20)
+):
+    """
+    Suggest places with coordinates for a partially typed, possibly misspelt name.
+    
+    Served from memory; picking a suggestion lets the client send coordinates, so
+    the job skips geocoding and cannot fail on a typo after being queued.
     
-    job_info = animation_jobs[job_id]
+    Args:
+        q (str): Text typed so far
+        limit (int): Most suggestions returned
+        
+    Returns:
+        dict: Ranked suggestions with name, lat, lon and score
+    """
+    return {"query": q, "suggestions": place_index.suggest(q, limit)}
+
+@app.get("/usage")
+async def get_usage():
+    """
+    Resource usage of rendered jobs, aggregated per quality, and the most
+    requested tours.
+    
+    Returns:
+        dict: Totals and per-job averages keyed by quality, and popular tours with
+            their decayed request counts and whether they are pre-rendered
+    """
+    return {"qualities": usage_ledger.summary(), "popular_tours": prewarm_scheduler.popular()}
+
+def _job_status(job_id: str) -> Dict[str, Any]:
+    """Build the status payload of a job."""
+    job_info = job_store.get(job_id)
     
     # If job is completed, include the video path
     if job_info["status"] == "completed":
-        return {
+        response = {
             "job_id": job_id,
             "status": "completed",
-            "video_path": job_info["video_path"],
+            "created": job_info["created"],
+            "trace_id": job_info.get("trace_id"),
+            # Signed per status payload so the URL never expires while the job is stored
+            "video_path": video_delivery.url_for(job_info["video_file"]),
             "duration": job_info["duration"]
         }
+        if "previews" in job_info:
+            response["previews"] = _preview_urls(job_info["previews"])
+        if job_info.get("variants"):
+            response["variants"] = {codec: video_delivery.url_for(filename)
+                                    for codec, filename in job_info["variants"].items()}
+        if "plan" in job_info:
+            response["plan"] = job_info["plan"]
+        if "usage" in job_info:
+            response["usage"] = job_info["usage"]
+        if "profile" in job_info:
+            response["profile"] = _profile_urls(job_id, job_info["profile"])
+        return response
     
     # If job failed, include the error message
     elif job_info["status"] == "failed":
-        return {
+        response = {
             "job_id": job_id,
             "status": "failed",
+            "created": job_info["created"],
+            "trace_id": job_info.get("trace_id"),
             "error": job_info.get("error", "Unknown error")
         }
+        if "usage" in job_info:
+            response["usage"] = job_info["usage"]
+        if "profile" in job_info:
+            response["profile"] = _profile_urls(job_id, job_info["profile"])
+        return response
     
-    # Otherwise, just return the status
+    # Otherwise, just return the status (and the frame plan once it exists)
     else:
-        return {
+        response = {
             "job_id": job_id,
-            "status": job_info["status"]
+            "status": job_info["status"],
+            "created": job_info["created"],
+            "trace_id": job_info.get("trace_id")
         }
+        if "plan" in job_info:
+            response["plan"] = job_info["plan"]
+        return response
+
+def _job_etag(version: int) -> str:
+    """ETag of a job's status: its version, plus the URL signing epoch."""
+    return f'"{version}-{video_delivery.url_epoch()}"'
+
+@app.get("/job/{job_id}")
+async def get_job_status(
+    job_id: str,
+    if_none_match: Optional[str] = Header(None),
+    wait: float = Query(0, ge=0)
+):
+    """
+    Get the status of an animation job.
+    
+    Responses carry an ETag. A request whose If-None-Match matches it gets a 304,
+    after first waiting up to `wait` seconds for the job to change (long-polling),
+    so clients can poll without a sleep between requests.
+    
+    Args:
+        job_id (str): Job ID to check
+        if_none_match (str, optional): ETag of the status the client already has
+        wait (float): Seconds to wait for a change to that status, capped at
+            MAX_JOB_WAIT_SECONDS
+        
+    Returns:
+        Response: Job status information, or 304 if it has not changed
+    """
+    if job_id not in job_store:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    # Read the version once: waiting on a version read after the ETag was built
+    # would sleep through an update made in between
+    version = job_store.version(job_id)
+    etag = _job_etag(version)
+    client_etags = [tag.strip() for tag in if_none_match.split(",")] if if_none_match else []
+    if etag in client_etags and wait > 0:
+        await job_store.wait_for_change(job_id, version, min(wait, MAX_JOB_WAIT_SECONDS))
+        etag = _job_etag(job_store.version(job_id))
+    
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in client_etags:
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=_job_payload(job_id), media_type="application/json", headers=headers)
+
+def _job_payload(job_id: str) -> bytes:
+    """Serialized status of a job, rebuilt only when the job or URL epoch changes."""
+    return job_store.cached_payload(
+        job_id,
+        lambda: json.dumps(_job_status(job_id), separators=(",", ":")).encode(),
+        video_delivery.url_epoch()
+    )
+
+@app.get("/jobs")
+async def list_jobs(
+    http_request: Request,
+    ids: Optional[str] = None,
+    status: Optional[str] = None,
+    client: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_JOBS_PER_REQUEST),
+    x_api_key: Optional[str] = Header(None)
+):
+    """
+    Look up several jobs at once, or page through the job history.
+    
+    With `ids`, returns the status of each listed job, as `/job/{job_id}` would.
+    Otherwise lists jobs newest first, filtered by status, client and creation
+    time, `limit` at a time; pass the returned `next_cursor` to get the next page.
+    
+    Args:
+        ids (str, optional): Comma-separated job IDs
+        status (str, optional): Only jobs with this status
+        client (str, optional): Only jobs of this client ID, or "me" for the caller's
+        created_after (datetime, optional): Only jobs created at or after this time
+        created_before (datetime, optional): Only jobs created before this time
+        cursor (str, optional): Cursor from the previous page
+        limit (int): Jobs per page
+        x_api_key (str, optional): X-API-Key header, identifies the caller for client=me
+        
+    Returns:
+        Response: Job statuses, plus missing IDs or the next page's cursor
+    """
+    if ids is not None:
+        job_ids = list(dict.fromkeys(job_id.strip() for job_id in ids.split(",") if job_id.strip()))
+        if len(job_ids) > MAX_JOBS_PER_REQUEST:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_JOBS_PER_REQUEST} job IDs per request")
+        found = [job_id for job_id in job_ids if job_id in job_store]
+        missing = [job_id for job_id in job_ids if job_id not in job_store]
+        # Splice the cached per-job payloads instead of re-serializing them
+        content = (b'{"jobs":[' + b",".join(_job_payload(job_id) for job_id in found)
+                   + b'],"missing":' + json.dumps(missing).encode() + b"}")
+        return Response(content=content, media_type="application/json")
+    
+    if client == "me":
+        client = _client_id(http_request, x_api_key)
+    try:
+        position = int(cursor) if cursor is not None else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    job_ids, next_cursor = job_store.list_jobs(
+        status=status,
+        client=client,
+        created_after=created_after.timestamp() if created_after else None,
+        created_before=created_before.timestamp() if created_before else None,
+        cursor=position,
+        limit=limit
+    )
+    content = (b'{"jobs":[' + b",".join(_job_payload(job_id) for job_id in job_ids)
+               + b'],"next_cursor":' + json.dumps(None if next_cursor is None else str(next_cursor)).encode() + b"}")
+    return Response(content=content, media_type="application/json")
+
+async def _sprite_index_response(file_path: str) -> Response:
+    """
+    Serve a scrub sprite's WebVTT index with its cues pointing at the sprite's own
+    delivery URL, signed when URLs are signed (and redirected from when stored remotely).
+    """
+    content = await anyio.to_thread.run_sync(artifact_store.read, file_path)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+    sprite_url = video_delivery.url_for(f"{os.path.dirname(file_path)}/sprite.jpg")
+    # The embedded signatures expire, so signed indexes are cached for half their lifetime
+    cache_control = (f"private, max-age={video_delivery.url_ttl // 2}" if video_delivery.signing_key
+                     else IMMUTABLE_CACHE_CONTROL)
+    return Response(content=resolve_sprite_urls(content.decode(), sprite_url), media_type="text/vtt",
+                    headers={"Cache-Control": cache_control})
+
+@app.api_route("/videos/{file_path:path}", methods=["GET", "HEAD"])
+async def get_video(file_path: str, request: Request):
+    """
+    Serve a rendered artifact.
+    
+    Supports byte ranges for seeking, strong ETags with 304 responses, long-lived
+    caching, signed URLs and offloading the transfer to a reverse proxy. Artifacts
+    kept in an object store are redirected to.
+    
+    Args:
+        file_path (str): Path of the artifact relative to the output directory
+        
+    Returns:
+        Response: The (partial) file, a redirect, or an empty conditional/error response
+    """
+    if not video_delivery.verify(file_path,
+                                 request.query_params.get("expires"),
+                                 request.query_params.get("signature")):
+        raise HTTPException(status_code=403, detail="Invalid or expired video URL")
+    
+    # Keys are used verbatim by the artifact store, so refuse anything that could leave the output directory
+    if not ArtifactStore.valid_key(file_path):
+        raise HTTPException(status_code=404, detail="Video not found")
+    
+    if file_path.endswith("/sprite.vtt"):
+        return await _sprite_index_response(file_path)
+    
+    if video_delivery.resolve(file_path) is None:
+        # Not rendered on this node: send the client to the object store, which
+        # handles ranges and conditional requests itself
+        redirect_url = await anyio.to_thread.run_sync(artifact_store.redirect_url, file_path)
+        if redirect_url is None:
+            raise HTTPException(status_code=404, detail="Video not found")
+        return RedirectResponse(redirect_url, status_code=307)
+    
+    return video_delivery.build_response(file_path, request.headers, method=request.method)
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,9 +1,12 @@
 from enum import Enum
 from typing import List, Optional, Union
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, root_validator, validator
+
+from app.quality_profiles import VISUAL_PROFILES
 
 
 class VideoQuality(str, Enum):
+    PREVIEW_360P = "360p"
     HD_720P = "720p"
     HD_1080P = "1080p"
     QHD_1440P = "1440p"
@@ -24,31 +27,40 @@ class Location(BaseModel):
     lat: Optional[float] = Field(None, description="Latitude in decimal degrees", ge=-90, le=90)
     lon: Optional[float] = Field(None, description="Longitude in decimal degrees", ge=-180, le=180)
     
-    @validator('lat')
-    def validate_lat_lon_pair(cls, v, values):
-        # If lat is provided, lon must also be provided
-        if v is not None and 'lon' not in values:
-            raise ValueError("If latitude is provided, longitude must also be provided")
-        return v
-    
-    @validator('name')
-    def validate_name_or_coordinates(cls, v, values):
-        # Either name or both lat/lon must be provided
-        if v is None and ('lat' not in values or values.get('lat') is None):
+    @root_validator(skip_on_failure=True)
+    def validate_name_or_coordinates(cls, values):
+        # Coordinates come as a pair; either they or a name must be provided
+        lat, lon = values.get('lat'), values.get('lon')
+        if (lat is None) != (lon is None):
+            raise ValueError("Latitude and longitude must be provided together")
+        if values.get('name') is None and lat is None:
             raise ValueError("Either name or both lat/lon must be provided")
-        return v
+        return values
 
 
 class AnimationRequest(BaseModel):
     locations: List[Location] = Field(..., min_items=2, description="List of locations (min 2)")
     quality: VideoQuality = Field(VideoQuality.HD_1080P, description="Video quality setting")
-    duration: Optional[int] = Field(None, description="Animation duration in seconds (optional, dynamically calculated if not provided)")
+    duration: Optional[int] = Field(None, ge=1, description="Animation duration in seconds (optional, planned from leg distances if not provided)")
+    frame_budget: Optional[int] = Field(None, ge=1, description="Maximum number of frames to render (optional); legs are shortened proportionally to fit")
+    visual: str = Field("mobile", description="Visual profile: mobile, landscape or cinematic. The server picks the cheapest render engine that supports it.")
+    profile: bool = Field(False, description="Profile the render (server stack samples, Blender phase timings and cProfile stats); the results are listed under 'profile' in the job status")
     
     @validator('locations')
     def validate_locations(cls, v):
         if len(v) < 2:
             raise ValueError("At least 2 locations are required")
         return v
+    
+    @validator('visual')
+    def validate_visual(cls, v):
+        if v.lower() not in VISUAL_PROFILES:
+            raise ValueError(f"Unknown visual profile, expected one of: {', '.join(VISUAL_PROFILES)}")
+        return v.lower()
+
+
+class BatchAnimationRequest(BaseModel):
+    tours: List[AnimationRequest] = Field(..., min_items=1, max_items=50, description="Animation requests to queue (max 50)")
 
 
 class AnimationResponse(BaseModel):
@@ -0,0 +1,201 @@
+# Quality profile registry.
+#
+# Every quality tier the server offers is defined here once: output resolution,
+# render engine and sampling, and encoder settings. Visual profiles (camera, look)
+# live here too. BlenderRenderer embeds the resolved profiles in each job's config
+# file and the Blender script reads them from there, so this module must stay
+# importable from Blender's bundled Python (standard library only).
+from dataclasses import dataclass, asdict, replace
+from typing import Dict, Optional, Tuple
+
+# Blender only exposes coarse FFMPEG quality levels; these are the x264 CRFs behind them
+_BLENDER_CRF_LEVELS = {
+    "LOSSLESS": 0, "PERC_LOSSLESS": 17, "HIGH": 20, "MEDIUM": 23,
+    "LOW": 26, "VERYLOW": 29, "LOWEST": 32,
+}
+_BLENDER_PRESETS = {
+    "ultrafast": "REALTIME", "superfast": "REALTIME", "veryfast": "REALTIME",
+    "faster": "GOOD", "fast": "GOOD", "medium": "GOOD",
+    "slow": "BEST", "slower": "BEST", "veryslow": "BEST",
+}
+_WORKBENCH_AA_SAMPLES = [5, 8, 11, 16, 32]
+
+# Render engines from cheapest to most expensive
+ENGINE_COST_ORDER = ["BLENDER_WORKBENCH", "BLENDER_EEVEE"]
+
+
+@dataclass(frozen=True)
+class QualityProfile:
+    name: str                       # Value used in requests, e.g. "1080p"
+    short_side: int                 # Pixels along the short edge of the frame
+    aspect: str = "9:16"            # Width:height; portrait by default for phones
+    engine: str = "BLENDER_WORKBENCH"
+    samples: int = 8                # Anti-aliasing samples per pixel
+    resolution_percentage: int = 100
+    crf: int = 23                   # x264 constant rate factor (lower is better)
+    max_bitrate: Optional[int] = None  # Peak video bitrate in kbps, None for uncapped
+    encoder_preset: str = "medium"  # x264 speed/compression preset
+    gop_seconds: float = 1.0        # Keyframe interval; short GOPs make seeking precise
+
+    def with_overrides(self, **changes) -> "QualityProfile":
+        """Return a copy of the profile with some fields replaced."""
+        return replace(self, **changes)
+
+    def gop_frames(self, fps: int) -> int:
+        """Keyframe interval in frames at a frame rate."""
+        return max(1, round(fps * self.gop_seconds))
+
+    @property
+    def resolution(self) -> Tuple[int, int]:
+        """Output (width, height) in pixels, derived from the short side and aspect."""
+        aspect_w, aspect_h = (int(part) for part in self.aspect.split(":"))
+        long_side = round(self.short_side * max(aspect_w, aspect_h) / min(aspect_w, aspect_h))
+        # Video encoders want even dimensions
+        long_side += long_side % 2
+        if aspect_w <= aspect_h:
+            return self.short_side, long_side
+        return long_side, self.short_side
+
+    def blender_settings(self) -> Dict[str, str]:
+        """Map the profile onto the closest enum values Blender's render settings accept."""
+        crf_level = min(_BLENDER_CRF_LEVELS, key=lambda level: abs(_BLENDER_CRF_LEVELS[level] - self.crf))
+        if self.samples <= 1:
+            render_aa = "FXAA"
+        else:
+            render_aa = str(min(_WORKBENCH_AA_SAMPLES, key=lambda n: abs(n - self.samples)))
+        return {
+            "constant_rate_factor": crf_level,
+            "ffmpeg_preset": _BLENDER_PRESETS.get(self.encoder_preset, "GOOD"),
+            "render_aa": render_aa,
+        }
+
+    def to_dict(self) -> Dict[str, object]:
+        """Serialize the profile for a render config, including derived settings."""
+        data = asdict(self)
+        data["resolution"] = list(self.resolution)
+        data["blender"] = self.blender_settings()
+        return data
+
+
+QUALITY_PROFILES: Dict[str, QualityProfile] = {}
+
+
+def register_profile(profile: QualityProfile) -> QualityProfile:
+    """
+    Add (or replace) a quality profile in the registry.
+
+    Args:
+        profile (QualityProfile): Profile to register
+
+    Returns:
+        QualityProfile: The registered profile
+    """
+    QUALITY_PROFILES[profile.name.lower()] = profile
+    return profile
+
+
+def get_profile(quality: str) -> QualityProfile:
+    """
+    Look up the profile for a quality name, case-insensitively.
+
+    Args:
+        quality (str): Quality name, e.g. "720p" or "4K"
+
+    Returns:
+        QualityProfile: The matching profile
+
+    Raises:
+        ValueError: If no profile is registered under that name
+    """
+    try:
+        return QUALITY_PROFILES[quality.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown quality profile: {quality}")
+
+
+register_profile(QualityProfile("360p", 360, samples=1, crf=28, max_bitrate=800, encoder_preset="veryfast"))
+register_profile(QualityProfile("720p", 720, samples=5, crf=23, max_bitrate=3000, encoder_preset="faster"))
+register_profile(QualityProfile("1080p", 1080, samples=8, crf=22, max_bitrate=6000, encoder_preset="medium"))
+register_profile(QualityProfile("1440p", 1440, samples=8, crf=21, max_bitrate=12000, encoder_preset="medium"))
+register_profile(QualityProfile("4K", 2160, samples=11, crf=20, max_bitrate=25000, encoder_preset="slow"))
+
+
+@dataclass(frozen=True)
+class VisualProfile:
+    name: str
+    camera: str = "follow"          # "follow": above the aircraft; "orbit": wide view of the globe
+    aspect: Optional[str] = None    # Overrides the quality profile's aspect when set
+    atmosphere: bool = False        # Translucent atmosphere shell around the Earth
+    glow: bool = False              # Emissive aircraft/trail and bloom
+    labels: bool = True             # Location name labels
+    min_engine: str = "BLENDER_WORKBENCH"  # Cheapest engine that can produce this look
+
+    def to_dict(self) -> Dict[str, object]:
+        """Serialize the profile for a render config."""
+        return asdict(self)
+
+
+VISUAL_PROFILES: Dict[str, VisualProfile] = {}
+
+
+def register_visual_profile(profile: VisualProfile) -> VisualProfile:
+    """
+    Add (or replace) a visual profile in the registry.
+
+    Args:
+        profile (VisualProfile): Profile to register
+
+    Returns:
+        VisualProfile: The registered profile
+    """
+    VISUAL_PROFILES[profile.name.lower()] = profile
+    return profile
+
+
+def get_visual_profile(name: str) -> VisualProfile:
+    """
+    Look up a visual profile by name, case-insensitively.
+
+    Args:
+        name (str): Visual profile name, e.g. "mobile"
+
+    Returns:
+        VisualProfile: The matching profile
+
+    Raises:
+        ValueError: If no profile is registered under that name
+    """
+    try:
+        return VISUAL_PROFILES[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown visual profile: {name}")
+
+
+def resolve_render_profile(quality: str, visual: str = "mobile") -> Tuple[QualityProfile, VisualProfile]:
+    """
+    Combine a quality tier with a visual profile.
+
+    The engine is the cheapest one that satisfies both: the quality tier's default,
+    upgraded only if the visual profile needs effects that engine cannot render.
+
+    Args:
+        quality (str): Quality profile name
+        visual (str): Visual profile name
+
+    Returns:
+        Tuple[QualityProfile, VisualProfile]: Effective quality profile and visual profile
+    """
+    quality_profile = get_profile(quality)
+    visual_profile = get_visual_profile(visual)
+
+    engine = max(quality_profile.engine, visual_profile.min_engine, key=ENGINE_COST_ORDER.index)
+    overrides = {"engine": engine}
+    if visual_profile.aspect:
+        overrides["aspect"] = visual_profile.aspect
+    return quality_profile.with_overrides(**overrides), visual_profile
+
+
+register_visual_profile(VisualProfile("mobile"))
+register_visual_profile(VisualProfile("landscape", camera="orbit", aspect="16:9", atmosphere=True))
+register_visual_profile(VisualProfile("cinematic", camera="follow", atmosphere=True, glow=True,
+                                      min_engine="BLENDER_EEVEE"))
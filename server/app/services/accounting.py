@@ -0,0 +1,82 @@
+import threading
+from typing import Any, Dict, Optional
+
+from app.services.resources import ResourceUsage
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Samples a quality needs before its measured cost replaces the estimate
+MIN_COST_SAMPLES = 5
+BASELINE_QUALITY = "720p"
+
+
+class UsageLedger:
+    def __init__(self):
+        """Initialize the per-quality aggregate of job resource usage."""
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, quality: str, usage: ResourceUsage, render_seconds: float) -> None:
+        """
+        Add a finished job's resource usage to its quality's totals.
+
+        Args:
+            quality (str): Quality profile name
+            usage (ResourceUsage): Resources the job used
+            render_seconds (float): Wall-clock render time
+        """
+        with self._lock:
+            totals = self._totals.setdefault(quality.lower(), {
+                "jobs": 0, "cpu_seconds": 0.0, "render_seconds": 0.0,
+                "output_bytes": 0, "temp_bytes": 0, "peak_rss_bytes": 0,
+            })
+            totals["jobs"] += 1
+            totals["cpu_seconds"] += usage.cpu_seconds
+            totals["render_seconds"] += render_seconds
+            totals["output_bytes"] += usage.output_bytes
+            totals["temp_bytes"] += usage.temp_bytes
+            totals["peak_rss_bytes"] = max(totals["peak_rss_bytes"], usage.peak_rss_bytes)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Totals and per-job averages for every quality rendered so far.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Aggregates keyed by quality
+        """
+        with self._lock:
+            result = {}
+            for quality, totals in self._totals.items():
+                jobs = totals["jobs"]
+                result[quality] = {
+                    **{key: round(value, 3) if isinstance(value, float) else value for key, value in totals.items()},
+                    "avg_cpu_seconds": round(totals["cpu_seconds"] / jobs, 3),
+                    "avg_render_seconds": round(totals["render_seconds"] / jobs, 3),
+                    "avg_output_bytes": totals["output_bytes"] // jobs,
+                }
+            return result
+
+    def relative_cost(self, quality: str) -> Optional[float]:
+        """
+        Measured CPU cost of a quality's jobs relative to baseline (720p) jobs.
+
+        Args:
+            quality (str): Quality profile name
+
+        Returns:
+            Optional[float]: Mean CPU seconds per job divided by the baseline's, or None
+                until both qualities have enough samples
+        """
+        with self._lock:
+            totals = self._totals.get(quality.lower())
+            baseline = self._totals.get(BASELINE_QUALITY)
+            if (not totals or not baseline
+                    or totals["jobs"] < MIN_COST_SAMPLES or baseline["jobs"] < MIN_COST_SAMPLES
+                    or baseline["cpu_seconds"] <= 0):
+                return None
+            return (totals["cpu_seconds"] / totals["jobs"]) / (baseline["cpu_seconds"] / baseline["jobs"])
+
+
+# Singleton instance
+usage_ledger = UsageLedger()
@@ -0,0 +1,335 @@
+import os
+import hmac
+import time
+import hashlib
+import mimetypes
+from typing import Optional, Tuple
+from urllib.parse import urlencode
+
+import anyio
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Rendered artifacts get a unique, timestamped filename and are never rewritten,
+# so clients and CDNs can keep them for as long as they like
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+CHUNK_SIZE = 256 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a Range header cannot be satisfied for the file size."""
+
+
+def parse_range_header(range_header: str, file_size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range HTTP Range header.
+
+    Args:
+        range_header (str): Value of the Range header, e.g. "bytes=0-1023"
+        file_size (int): Size of the requested file in bytes
+
+    Returns:
+        Optional[Tuple[int, int]]: Inclusive (start, end) byte positions, or None if the
+            header should be ignored and the full file served (malformed or multi-range)
+
+    Raises:
+        RangeNotSatisfiable: If the range lies entirely outside the file
+    """
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not ranges or "," in ranges:
+        # Multi-range responses are rarely used by video players; per RFC 9110 we may
+        # ignore the header and send the whole representation instead
+        return None
+
+    start_str, sep, end_str = ranges.strip().partition("-")
+    if not sep:
+        return None
+
+    try:
+        if start_str == "":
+            # Suffix range: the last N bytes
+            suffix_length = int(end_str)
+            if suffix_length <= 0:
+                raise RangeNotSatisfiable(range_header)
+            start = max(0, file_size - suffix_length)
+            end = file_size - 1
+        else:
+            start = int(start_str)
+            end = int(end_str) if end_str else file_size - 1
+    except ValueError:
+        return None
+
+    if start < 0 or end < start:
+        return None
+    if start >= file_size:
+        raise RangeNotSatisfiable(range_header)
+
+    return start, min(end, file_size - 1)
+
+
+class RangeFileResponse(Response):
+    """
+    Streams a byte range of a file, using zero-copy transfers where the server allows it.
+
+    When the ASGI server advertises the ``http.response.zerocopysend`` extension the
+    file descriptor is handed to the server, which transfers it with ``sendfile``.
+    Otherwise the file is read in chunks off the event loop.
+    """
+
+    def __init__(self, path: str, start: int, length: int, status_code: int = 200,
+                 headers: Optional[dict] = None, media_type: Optional[str] = None,
+                 send_body: bool = True):
+        self.path = path
+        self.start = start
+        self.length = length
+        self.send_body = send_body
+        super().__init__(content=None, status_code=status_code, headers=headers, media_type=media_type)
+        self.headers["content-length"] = str(length)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        if not self.send_body or self.length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f.fileno(),
+                    "offset": self.start,
+                    "count": self.length,
+                    "more_body": False,
+                })
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as f:
+            await f.seek(self.start)
+            remaining = self.length
+            while remaining > 0:
+                chunk = await f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0,
+                })
+            if remaining > 0:
+                # File shrank underneath us; close the body so the client does not hang
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class VideoDeliveryService:
+    def __init__(self, root_dir: str,
+                 signing_key: Optional[str] = None,
+                 url_ttl: int = 3600,
+                 offload_header: Optional[str] = None,
+                 offload_prefix: str = "/protected-videos/"):
+        """
+        Initialize the video delivery service.
+
+        Args:
+            root_dir (str): Directory containing the rendered artifacts
+            signing_key (str, optional): Secret used to sign video URLs. When set, every
+                request must carry a valid, unexpired signature.
+            url_ttl (int): Lifetime of signed URLs in seconds
+            offload_header (str, optional): Header used to hand the transfer to a reverse
+                proxy (e.g. "X-Accel-Redirect" for nginx, "X-Sendfile" for Apache)
+            offload_prefix (str): Internal location prefix the proxy maps to root_dir
+        """
+        self.root_dir = os.path.realpath(root_dir)
+        self.signing_key = signing_key.encode() if signing_key else None
+        self.url_ttl = url_ttl
+        self.offload_header = offload_header
+        self.offload_prefix = offload_prefix.rstrip("/") + "/"
+
+        logger.info(f"Video delivery initialized for {self.root_dir} "
+                    f"(signed URLs: {'on' if self.signing_key else 'off'}, "
+                    f"offload: {self.offload_header or 'off'})")
+
+    @classmethod
+    def from_env(cls, root_dir: str) -> "VideoDeliveryService":
+        """
+        Build a delivery service configured from environment variables.
+
+        Args:
+            root_dir (str): Directory containing the rendered artifacts
+
+        Returns:
+            VideoDeliveryService: Configured service
+        """
+        return cls(
+            root_dir,
+            signing_key=os.getenv("VIDEO_URL_SIGNING_KEY") or None,
+            url_ttl=int(os.getenv("VIDEO_URL_TTL", "3600")),
+            offload_header=os.getenv("VIDEO_OFFLOAD_HEADER") or None,
+            offload_prefix=os.getenv("VIDEO_OFFLOAD_PREFIX", "/protected-videos/"),
+        )
+
+    def resolve(self, relative_path: str) -> Optional[str]:
+        """
+        Map a request path onto a file inside the artifact directory.
+
+        Args:
+            relative_path (str): Path relative to the artifact directory
+
+        Returns:
+            Optional[str]: Absolute path to the file, or None if it does not exist or
+                escapes the artifact directory
+        """
+        full_path = os.path.realpath(os.path.join(self.root_dir, relative_path))
+        if os.path.commonpath([full_path, self.root_dir]) != self.root_dir:
+            logger.warning(f"Rejected path outside artifact directory: {relative_path}")
+            return None
+        if not os.path.isfile(full_path):
+            return None
+        return full_path
+
+    @staticmethod
+    def etag_for(stat_result: os.stat_result) -> str:
+        """
+        Compute a strong ETag for an artifact.
+
+        Artifacts are written once under a unique name, so identity plus size and
+        modification time changes exactly when the bytes do.
+
+        Args:
+            stat_result (os.stat_result): Result of os.stat on the file
+
+        Returns:
+            str: Quoted ETag value
+        """
+        token = f"{stat_result.st_ino:x}-{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"
+        return f'"{token}"'
+
+    def _signature(self, relative_path: str, expires: int) -> str:
+        message = f"{relative_path}:{expires}".encode()
+        return hmac.new(self.signing_key, message, hashlib.sha256).hexdigest()
+
+    def url_for(self, relative_path: str) -> str:
+        """
+        Build the public URL for an artifact, signing it if signing is enabled.
+
+        Args:
+            relative_path (str): Path relative to the artifact directory
+
+        Returns:
+            str: URL path (with query string when signed)
+        """
+        url = f"/videos/{relative_path}"
+        if not self.signing_key:
+            return url
+        expires = int(time.time()) + self.url_ttl
+        query = urlencode({"expires": expires, "signature": self._signature(relative_path, expires)})
+        return f"{url}?{query}"
+
+    def url_epoch(self) -> int:
+        """
+        Period in which URLs from url_for() may be reused.
+
+        A URL built during the current epoch stays valid for at least half its TTL,
+        so responses embedding signed URLs can be cached for the epoch.
+
+        Returns:
+            int: Epoch number, always 0 when signing is disabled
+        """
+        if not self.signing_key:
+            return 0
+        return int(time.time() // max(1, self.url_ttl // 2))
+
+    def verify(self, relative_path: str, expires: Optional[str], signature: Optional[str]) -> bool:
+        """
+        Check a signed URL.
+
+        Args:
+            relative_path (str): Path relative to the artifact directory
+            expires (str, optional): Expiry timestamp from the query string
+            signature (str, optional): Signature from the query string
+
+        Returns:
+            bool: True if signing is disabled or the signature is valid and unexpired
+        """
+        if not self.signing_key:
+            return True
+        if not expires or not signature:
+            return False
+        try:
+            expires_at = int(expires)
+        except ValueError:
+            return False
+        if expires_at < time.time():
+            return False
+        return hmac.compare_digest(self._signature(relative_path, expires_at), signature)
+
+    def build_response(self, relative_path: str, request_headers, method: str = "GET") -> Response:
+        """
+        Build the HTTP response for an artifact request.
+
+        Handles conditional requests (If-None-Match, If-Range), single byte ranges and
+        proxy offloading.
+
+        Args:
+            relative_path (str): Path relative to the artifact directory
+            request_headers: Incoming request headers
+            method (str): HTTP method, "GET" or "HEAD"
+
+        Returns:
+            Response: Response to send to the client
+        """
+        full_path = self.resolve(relative_path)
+        if full_path is None:
+            return Response(status_code=404)
+
+        stat_result = os.stat(full_path)
+        file_size = stat_result.st_size
+        etag = self.etag_for(stat_result)
+        media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+
+        headers = {
+            "accept-ranges": "bytes",
+            "etag": etag,
+            "cache-control": IMMUTABLE_CACHE_CONTROL if not self.signing_key
+                             else f"private, max-age={self.url_ttl}",
+        }
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or
+                              etag in [tag.strip() for tag in if_none_match.split(",")]):
+            return Response(status_code=304, headers=headers)
+
+        if self.offload_header:
+            # Let the reverse proxy do the transfer (ranges included) with sendfile
+            headers[self.offload_header] = self.offload_prefix + os.path.relpath(full_path, self.root_dir)
+            return Response(status_code=200, headers=headers, media_type=media_type)
+
+        byte_range = None
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and (not if_range or if_range.strip() == etag):
+            try:
+                byte_range = parse_range_header(range_header, file_size)
+            except RangeNotSatisfiable:
+                headers["content-range"] = f"bytes */{file_size}"
+                return Response(status_code=416, headers=headers)
+
+        send_body = method != "HEAD"
+        if byte_range is None:
+            return RangeFileResponse(full_path, 0, file_size, status_code=200, headers=headers,
+                                     media_type=media_type, send_body=send_body)
+
+        start, end = byte_range
+        headers["content-range"] = f"bytes {start}-{end}/{file_size}"
+        return RangeFileResponse(full_path, start, end - start + 1, status_code=206, headers=headers,
+                                 media_type=media_type, send_body=send_body)
@@ -0,0 +1,308 @@
+import os
+import subprocess
+from typing import List, Optional
+
+from app.quality_profiles import QualityProfile
+from app.services.resources import ResourceUsage, wait_with_usage
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Software encoders for the optional delivery variants, with the CRF offset giving
+# roughly the quality of the H.264 CRF and the share of the H.264 bitrate cap
+VARIANT_CODECS = {
+    "hevc": {"args": ["-c:v", "libx265", "-tag:v", "hvc1", "-x265-params", "log-level=error:scenecut=0"],
+             "crf_offset": 5, "bitrate_share": 0.7},
+    "av1": {"args": ["-c:v", "libsvtav1", "-preset", "8"],
+            "crf_offset": 12, "bitrate_share": 0.6},
+}
+
+# Image formats Blender can stream to the encoder, mapped to ffmpeg's decoder names.
+# BMP is uncompressed, so Blender spends no time compressing frames ffmpeg decodes again.
+FRAME_FORMATS = {
+    "BMP": "bmp",
+    "PNG": "png",
+}
+
+
+class FFmpegEncoder:
+    def __init__(self, ffmpeg_path: str = "ffmpeg",
+                 threads: int = 0,
+                 preset: Optional[str] = None):
+        """
+        Initialize the external encoder.
+
+        Args:
+            ffmpeg_path (str): Path to the ffmpeg executable
+            threads (int): Encoder threads, 0 lets x264 pick based on the core count
+            preset (str, optional): x264 preset overriding the quality profile's preset,
+                e.g. "ultrafast" to trade file size for encode speed
+        """
+        self.ffmpeg_path = ffmpeg_path
+        self.threads = threads
+        self.preset = preset
+
+        logger.info(f"FFmpeg encoder initialized: {self.ffmpeg_path} "
+                    f"(threads: {self.threads or 'auto'}, preset: {self.preset or 'per profile'})")
+
+    @classmethod
+    def from_env(cls) -> "FFmpegEncoder":
+        """
+        Build an encoder configured from environment variables.
+
+        Returns:
+            FFmpegEncoder: Configured encoder
+        """
+        return cls(
+            ffmpeg_path=os.getenv("FFMPEG_PATH", "ffmpeg"),
+            threads=int(os.getenv("ENCODER_THREADS", "0")),
+            preset=os.getenv("ENCODER_PRESET") or None,
+        )
+
+    @staticmethod
+    def raw_input_args(width: int, height: int, fps: int, pix_fmt: str = "rgb24") -> List[str]:
+        """
+        Input arguments for reading raw, uncompressed frames from stdin.
+
+        Args:
+            width (int): Frame width in pixels
+            height (int): Frame height in pixels
+            fps (int): Frames per second of the stream
+            pix_fmt (str): Pixel layout of the frames
+
+        Returns:
+            List[str]: ffmpeg input arguments
+        """
+        return ["-f", "rawvideo", "-pix_fmt", pix_fmt, "-s", f"{width}x{height}",
+                "-framerate", str(fps), "-i", "-"]
+
+    @staticmethod
+    def image_pipe_input_args(pipe_path: str, fps: int, frame_format: str = "BMP") -> List[str]:
+        """
+        Input arguments for reading a stream of encoded still images from a pipe.
+
+        Args:
+            pipe_path (str): Path to the named pipe (or "-" for stdin)
+            fps (int): Frames per second of the stream
+            frame_format (str): Blender image format written to the pipe
+
+        Returns:
+            List[str]: ffmpeg input arguments
+        """
+        codec = FRAME_FORMATS[frame_format]
+        return ["-f", "image2pipe", "-framerate", str(fps), "-c:v", codec, "-i", pipe_path]
+
+    def output_args(self, profile: QualityProfile, gop_size: Optional[int] = None) -> List[str]:
+        """
+        H.264 output arguments for a quality profile.
+
+        Output is fast-start (the index is written before the media, so playback
+        can begin before the download finishes) and rate-capped with a one-second
+        buffer, for phones on cellular networks.
+
+        Args:
+            profile (QualityProfile): Quality profile to encode for
+            gop_size (int, optional): Fixed keyframe interval in frames. Scene-cut
+                keyframes are disabled so GOP boundaries are predictable.
+
+        Returns:
+            List[str]: ffmpeg output arguments (without the output path)
+        """
+        args = [
+            "-c:v", "libx264",
+            "-preset", self.preset or profile.encoder_preset,
+            "-crf", str(profile.crf),
+        ]
+        return args + self._delivery_args(profile, profile.max_bitrate, gop_size)
+
+    def variant_output_args(self, profile: QualityProfile, codec: str, gop_size: Optional[int] = None,
+                            threads: Optional[int] = None) -> List[str]:
+        """
+        Output arguments for a delivery variant in another codec.
+
+        Args:
+            profile (QualityProfile): Quality profile to encode for
+            codec (str): Key of VARIANT_CODECS, e.g. "hevc"
+            gop_size (int, optional): Fixed keyframe interval in frames
+            threads (int, optional): Encoder threads, overriding the configured count
+
+        Returns:
+            List[str]: ffmpeg output arguments (without the output path)
+        """
+        settings = VARIANT_CODECS[codec]
+        max_bitrate = round(profile.max_bitrate * settings["bitrate_share"]) if profile.max_bitrate else None
+        args = settings["args"] + ["-crf", str(min(63, profile.crf + settings["crf_offset"]))]
+        return args + self._delivery_args(profile, max_bitrate, gop_size, threads)
+
+    def _delivery_args(self, profile: QualityProfile, max_bitrate: Optional[int],
+                       gop_size: Optional[int], threads: Optional[int] = None) -> List[str]:
+        """Pixel format, threads, rate cap, GOP and fast-start arguments shared by all codecs."""
+        args = ["-pix_fmt", "yuv420p", "-threads", str(self.threads if threads is None else threads)]
+        if max_bitrate:
+            args += ["-maxrate", f"{max_bitrate}k", "-bufsize", f"{max_bitrate}k"]
+        if gop_size:
+            args += ["-g", str(gop_size), "-keyint_min", str(gop_size), "-sc_threshold", "0"]
+        return args + ["-movflags", "+faststart"]
+
+    def start(self, input_args: List[str], output_path: str, profile: QualityProfile,
+              stdin=None, gop_size: Optional[int] = None) -> subprocess.Popen:
+        """
+        Launch an encoder process that runs alongside the frame producer.
+
+        Args:
+            input_args (List[str]): ffmpeg input arguments
+            output_path (str): Path of the video to write
+            profile (QualityProfile): Quality profile to encode for
+            stdin: Standard input for the process, e.g. subprocess.PIPE for raw frames
+            gop_size (int, optional): Fixed keyframe interval in frames
+
+        Returns:
+            subprocess.Popen: The running encoder process
+        """
+        cmd = ([self.ffmpeg_path, "-hide_banner", "-loglevel", "error", "-y"]
+               + input_args + self.output_args(profile, gop_size) + [output_path])
+        logger.info(f"Starting encoder: {' '.join(cmd)}")
+        # Binary pipes: stdin may carry raw frame data
+        return subprocess.Popen(cmd, stdin=stdin, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    @staticmethod
+    def finish(process: subprocess.Popen, timeout: int = 300, usage: Optional[ResourceUsage] = None) -> bool:
+        """
+        Wait for an encoder process to flush and exit.
+
+        Args:
+            process (subprocess.Popen): Encoder process returned by start()
+            timeout (int): Seconds to wait before killing the encoder
+            usage (ResourceUsage, optional): Accumulates the encoder's CPU time and memory
+
+        Returns:
+            bool: True if the encoder exited successfully
+        """
+        try:
+            _, stderr, rusage = wait_with_usage(process, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+            logger.error(f"Encoder did not finish within {timeout}s and was killed")
+            return False
+        if usage is not None and rusage is not None:
+            usage.add_rusage(rusage)
+
+        if process.returncode != 0:
+            error = stderr.decode(errors="replace").strip() if stderr else ""
+            logger.error(f"Encoder failed with code {process.returncode}: {error}")
+            return False
+        return True
+
+    def concat(self, segment_paths: List[str], output_path: str) -> bool:
+        """
+        Join encoded segments into one video without re-encoding.
+
+        Segments must share codec parameters and each start on a keyframe, which holds
+        for segments encoded separately from the same quality profile.
+
+        Args:
+            segment_paths (List[str]): Segments in playback order
+            output_path (str): Path of the joined video
+
+        Returns:
+            bool: True if the segments were joined successfully
+        """
+        list_path = f"{output_path}.segments.txt"
+        try:
+            with open(list_path, "w") as f:
+                for path in segment_paths:
+                    escaped = os.path.abspath(path).replace("'", "'\\''")
+                    f.write(f"file '{escaped}'\n")
+
+            cmd = [self.ffmpeg_path, "-hide_banner", "-loglevel", "error", "-y",
+                   "-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy",
+                   "-movflags", "+faststart", output_path]
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                    universal_newlines=True)
+            if result.returncode != 0:
+                logger.error(f"Segment concat failed with code {result.returncode}: {result.stderr.strip()}")
+                return False
+            return True
+        finally:
+            try:
+                os.remove(list_path)
+            except OSError:
+                pass
+
+    def faststart(self, video_path: str, usage: Optional[ResourceUsage] = None) -> bool:
+        """
+        Move a video's index to the front of the file without re-encoding.
+
+        For videos written by other encoders (Blender's FFMPEG output puts the
+        index at the end, so players must download the whole file first).
+
+        Args:
+            video_path (str): Video to rewrite in place
+            usage (ResourceUsage, optional): Accumulates ffmpeg's CPU time and memory
+
+        Returns:
+            bool: True if the video was rewritten
+        """
+        tmp_path = f"{video_path}.faststart.mp4"
+        cmd = [self.ffmpeg_path, "-hide_banner", "-loglevel", "error", "-y",
+               "-i", video_path, "-c", "copy", "-movflags", "+faststart", tmp_path]
+        try:
+            process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except OSError as e:
+            logger.warning(f"Could not run ffmpeg for fast-start remux: {str(e)}")
+            return False
+        if not self.finish(process, usage=usage):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        os.replace(tmp_path, video_path)
+        return True
+
+    def transcode(self, source_path: str, output_path: str, profile: QualityProfile, codec: str,
+                  gop_size: Optional[int] = None, usage: Optional[ResourceUsage] = None,
+                  cores: Optional[List[int]] = None) -> bool:
+        """
+        Encode a delivery variant of a finished video in another codec.
+
+        Args:
+            source_path (str): H.264 video to transcode
+            output_path (str): Path of the variant
+            profile (QualityProfile): Quality profile the source was encoded for
+            codec (str): Key of VARIANT_CODECS
+            gop_size (int, optional): Fixed keyframe interval in frames
+            usage (ResourceUsage, optional): Accumulates ffmpeg's CPU time and memory
+            cores (List[int], optional): Reserved cores; ffmpeg is pinned to them and
+                runs one thread per core
+
+        Returns:
+            bool: True if the variant was written
+        """
+        threads = len(cores) if cores else None
+        cmd = ([self.ffmpeg_path, "-hide_banner", "-loglevel", "error", "-y", "-i", source_path]
+               + self.variant_output_args(profile, codec, gop_size, threads) + [output_path])
+        pin = (lambda: os.sched_setaffinity(0, cores)) if cores and hasattr(os, "sched_setaffinity") else None
+        logger.info(f"Encoding {codec} variant: {output_path}")
+        try:
+            process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, preexec_fn=pin)
+        except OSError as e:
+            logger.error(f"Could not run ffmpeg for {codec} variant: {str(e)}")
+            return False
+        return self.finish(process, timeout=1800, usage=usage)
+
+    @staticmethod
+    def release_pipe(pipe_path: str) -> None:
+        """
+        Unblock an encoder still waiting on a pipe whose producer never opened it.
+
+        Opening the write end and closing it again delivers EOF to the reader.
+
+        Args:
+            pipe_path (str): Path to the named pipe
+        """
+        try:
+            fd = os.open(pipe_path, os.O_WRONLY | os.O_NONBLOCK)
+            os.close(fd)
+        except OSError:
+            # No reader attached (ENXIO) or pipe already gone: nothing is waiting
+            pass
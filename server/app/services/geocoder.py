@@ -1,67 +1,320 @@
+import os
 import time
-from functools import lru_cache
-from typing import Dict, Tuple, Optional
-
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Tuple, Optional
+from urllib.parse import urlparse
 
+from app.services.places import place_index
+from app.services.tracing import Span, tracer
+from app.utils.lazy import LazyService
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-class GeocodingService:
-    def __init__(self, user_agent: str = "earth-tour-server"):
+
+class ProviderError(Exception):
+    """A geocoding provider failed to answer (timeout, outage, rate limit)."""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Initialize a closed circuit breaker.
+
+        After failure_threshold consecutive failures the breaker opens and calls
+        are refused without being attempted. After reset_timeout seconds one trial
+        call is let through: success closes the breaker, failure opens it again.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the breaker
+            reset_timeout (float): Seconds the breaker stays open before a trial call
         """
-        Initialize the geocoding service with Nominatim.
-        
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half-open"
+                self._trial_running = False
+            if self.state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == "half-open" or self._failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._trial_running = False
+
+
+class GeocodingProvider:
+    """A geocoding backend. Subclasses implement lookup()."""
+
+    def __init__(self, name: str, breaker: CircuitBreaker = None):
+        self.name = name
+        self.breaker = breaker or CircuitBreaker()
+
+    def lookup(self, location_name: str, timeout: float) -> Optional[Tuple[float, float]]:
+        """
+        Geocode a name.
+
+        Args:
+            location_name (str): Name of the location
+            timeout (float): Seconds to wait for the provider
+
+        Returns:
+            Optional[Tuple[float, float]]: (lat, lon), or None if the provider has no match
+
+        Raises:
+            ProviderError: If the provider could not answer
+        """
+        raise NotImplementedError
+
+
+class NominatimProvider(GeocodingProvider):
+    def __init__(self, user_agent: str = "earth-tour-server", url: str = None):
+        """
+        Geocode with Nominatim: the public OpenStreetMap service, or a self-hosted
+        instance or local stand-in (see nominatim_standin) at url.
+
         Args:
             user_agent (str): User agent for Nominatim requests
+            url (str, optional): Base URL of the instance, e.g. "http://localhost:8088"
+        """
+        # geopy pulls in requests and every geocoder it ships; import it only once
+        # the service is actually used
+        from geopy.geocoders import Nominatim
+
+        options = {}
+        if url:
+            parsed = urlparse(url)
+            options = {"domain": parsed.netloc + parsed.path.rstrip("/"), "scheme": parsed.scheme or "http"}
+        self.geolocator = Nominatim(user_agent=user_agent, **options)
+        super().__init__(url or "nominatim")
+
+    def lookup(self, location_name: str, timeout: float) -> Optional[Tuple[float, float]]:
+        from geopy.exc import GeocoderQueryError, GeocoderServiceError
+
+        try:
+            location = self.geolocator.geocode(location_name, timeout=timeout)
+        except GeocoderQueryError:
+            return None
+        except GeocoderServiceError as e:
+            raise ProviderError(str(e)) from e
+        return (location.latitude, location.longitude) if location else None
+
+
+def providers_from_spec(spec: str, user_agent: str = "earth-tour-server") -> List[GeocodingProvider]:
+    """
+    Build providers from a comma-separated list of "nominatim" (the public
+    service) and Nominatim-compatible base URLs.
+
+    Args:
+        spec (str): Provider list, e.g. "http://geocoder.internal:8080,nominatim"
+        user_agent (str): User agent for Nominatim requests
+
+    Returns:
+        List[GeocodingProvider]: Providers in order of preference
+    """
+    providers = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if entry == "nominatim":
+            providers.append(NominatimProvider(user_agent))
+        elif entry:
+            providers.append(NominatimProvider(user_agent, url=entry))
+    return providers
+
+
+class GeocodingService:
+    def __init__(self, providers: List[GeocodingProvider] = None,
+                 timeout: float = 5.0,
+                 hedge_after: float = 1.0,
+                 negative_ttl: float = 3600.0,
+                 max_negative_entries: int = 10000):
+        """
+        Initialize the geocoding service.
+
+        A lookup goes to the first provider whose circuit breaker is closed. If it
+        has not answered after hedge_after seconds (or fails), the next provider is
+        asked as well and the first answer wins. Lookups never take longer than
+        timeout, and fail immediately while every provider's breaker is open.
+
+        Args:
+            providers (List[GeocodingProvider]): Providers in order of preference.
+                Defaults to the public Nominatim service.
+            timeout (float): Maximum seconds for a lookup, across all providers
+            hedge_after (float): Seconds to wait for a provider before also asking the next
+            negative_ttl (float): Seconds a name no provider knows is remembered as unknown
+            max_negative_entries (int): Unknown names remembered at most
+        """
+        self.providers = providers or [NominatimProvider()]
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self.negative_ttl = negative_ttl
+        self.max_negative_entries = max_negative_entries
+        self._not_found: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=4 * len(self.providers), thread_name_prefix="geocode")
+        logger.info(f"Geocoding service initialized with providers: {', '.join(p.name for p in self.providers)}")
+
+    @classmethod
+    def from_env(cls) -> "GeocodingService":
         """
-        self.geolocator = Nominatim(user_agent=user_agent)
-        logger.info("Geocoding service initialized")
-        
-    @lru_cache(maxsize=1000)
-    def geocode(self, location_name: str, max_retries: int = 3) -> Optional[Tuple[float, float]]:
+        Build a geocoding service configured from environment variables.
+
+        Returns:
+            GeocodingService: Configured service
+        """
+        return cls(
+            providers=providers_from_spec(os.getenv("GEOCODER_PROVIDERS", "nominatim")),
+            timeout=float(os.getenv("GEOCODER_TIMEOUT", "5")),
+            hedge_after=float(os.getenv("GEOCODER_HEDGE_AFTER", "1")),
+            negative_ttl=float(os.getenv("GEOCODER_NEGATIVE_TTL", "3600")),
+        )
+
+    def geocode(self, location_name: str) -> Optional[Tuple[float, float]]:
         """
         Geocode a location name to latitude and longitude.
-        
+
         Args:
             location_name (str): Name of the location to geocode
-            max_retries (int): Maximum number of retries for geocoding
-            
+
         Returns:
             Optional[Tuple[float, float]]: Tuple of (latitude, longitude) or None if geocoding failed
         """
+        with tracer.span("geocode", location=location_name or "") as span:
+            coords = self._geocode(location_name)
+            if span is not None:
+                span.attributes["found"] = coords is not None
+            return coords
+
+    def _geocode(self, location_name: str) -> Optional[Tuple[float, float]]:
         if not location_name:
             logger.error("Empty location name provided")
             return None
-            
-        retry_count = 0
-        while retry_count < max_retries:
-            try:
-                logger.info(f"Geocoding location: {location_name}")
-                location = self.geolocator.geocode(location_name)
-                
-                if location:
-                    coords = (location.latitude, location.longitude)
-                    logger.info(f"Geocoded {location_name} to {coords}")
-                    return coords
-                else:
-                    logger.warning(f"Could not geocode location: {location_name}")
-                    return None
-                    
-            except (GeocoderTimedOut, GeocoderUnavailable) as e:
-                retry_count += 1
-                wait_time = 2 ** retry_count  # Exponential backoff
-                logger.warning(f"Geocoding attempt {retry_count} failed: {str(e)}. Retrying in {wait_time}s.")
-                time.sleep(wait_time)
-                
-            except Exception as e:
-                logger.error(f"Unexpected error during geocoding: {str(e)}")
-                return None
-                
-        logger.error(f"Failed to geocode {location_name} after {max_retries} attempts")
-        return None
-
-# Singleton instance
-geocoding_service = GeocodingService()
+
+        # Names picked from /geocode/suggest, or geocoded before, need no request
+        known = place_index.lookup(location_name)
+        if known:
+            place_index.add(location_name, *known)
+            return known
+
+        if self._known_missing(location_name):
+            logger.info(f"Skipping lookup of {location_name}, recently not found")
+            return None
+
+        logger.info(f"Geocoding location: {location_name}")
+        answered, coords = self._lookup_hedged(location_name, self.providers)
+        if coords:
+            logger.info(f"Geocoded {location_name} to {coords}")
+            place_index.add(location_name, *coords)
+        elif answered:
+            logger.warning(f"Could not geocode location: {location_name}")
+            self._remember_missing(location_name)
+        else:
+            logger.error(f"No geocoding provider answered for {location_name}")
+        return coords
+
+    def _lookup_hedged(self, location_name: str,
+                       providers: List[GeocodingProvider]) -> Tuple[bool, Optional[Tuple[float, float]]]:
+        """
+        Ask providers in turn, starting the next one whenever the previous fails or
+        is slower than hedge_after, and return the first answer.
+
+        A provider's circuit breaker is consulted only when the provider is about to
+        be started: a half-open breaker hands out its single trial call then, and
+        the call always records its outcome, even if another provider answers first.
+
+        Returns:
+            Tuple[bool, Optional[Tuple[float, float]]]: Whether any provider answered,
+                and the coordinates (None if not found)
+        """
+        deadline = time.monotonic() + self.timeout
+        waiting = list(providers)
+        pending: Dict[Future, GeocodingProvider] = {}
+
+        parent = tracer.current()
+
+        def start_next() -> Optional[GeocodingProvider]:
+            while waiting:
+                provider = waiting.pop(0)
+                if provider.breaker.allow():
+                    pending[self._pool.submit(self._ask, provider, location_name, deadline, parent)] = provider
+                    return provider
+            return None
+
+        if start_next() is None:
+            logger.warning(f"All geocoding providers are unavailable, not geocoding {location_name}")
+            return False, None
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(pending, timeout=min(remaining, self.hedge_after) if waiting else remaining,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = pending.pop(future)
+                answered, coords = future.result()
+                if answered:
+                    return True, coords
+            if waiting:
+                started = start_next()
+                if started is not None and not done:
+                    logger.info(f"Geocoding {location_name} is slow, hedged with {started.name}")
+        return False, None
+
+    def _ask(self, provider: GeocodingProvider, location_name: str, deadline: float,
+             parent: Optional[Span] = None) -> Tuple[bool, Optional[Tuple[float, float]]]:
+        """Query one provider, recording the outcome in its circuit breaker."""
+        span = tracer.start_span("geocode.provider", parent=parent, provider=provider.name)
+        try:
+            coords = provider.lookup(location_name, timeout=max(0.1, deadline - time.monotonic()))
+        except Exception as e:
+            tracer.end_span(span, e)
+            provider.breaker.record_failure()
+            logger.warning(f"Geocoding provider {provider.name} failed: {str(e)}")
+            return False, None
+        tracer.end_span(span)
+        provider.breaker.record_success()
+        return True, coords
+
+    def _known_missing(self, location_name: str) -> bool:
+        with self._lock:
+            expires = self._not_found.get(location_name)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self._not_found[location_name]
+                return False
+            return True
+
+    def _remember_missing(self, location_name: str) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if len(self._not_found) >= self.max_negative_entries:
+                self._not_found = {name: expires for name, expires in self._not_found.items() if expires > now}
+            if len(self._not_found) < self.max_negative_entries:
+                self._not_found[location_name] = now + self.negative_ttl
+
+# Singleton instance, built on first use
+geocoding_service = LazyService("geocoder", GeocodingService.from_env)
@@ -0,0 +1,227 @@
+import time
+import asyncio
+import threading
+from bisect import bisect_left, insort
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class JobStore:
+    def __init__(self):
+        """
+        Initialize the in-memory store of animation jobs.
+
+        Every change to a job bumps its version. Status requests use the version
+        for ETags and to cache the serialized payload, and long-polling requests
+        wait for it to change.
+
+        Jobs are also indexed by creation order, client, status and client and
+        status together, so a listing page is a slice of one sorted index.
+        """
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._versions: Dict[str, int] = {}
+        # Job IDs and creation times in creation order; a job's position in these
+        # lists is its index key
+        self._order: List[str] = []
+        self._created: List[float] = []
+        self._positions: Dict[str, int] = {}
+        self._by_client: Dict[str, List[int]] = {}
+        # Sorted positions of the jobs with each client, status, and (client, status)
+        self._by_status: Dict[str, List[int]] = {}
+        self._by_client_status: Dict[Tuple[str, str], List[int]] = {}
+        # job ID -> (event loop, future) of each request waiting for a change
+        self._waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+        # job ID -> (cache key, payload) of the last serialized status
+        self._payloads: Dict[str, Tuple[Hashable, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._jobs
+
+    def create(self, job_id: str, record: Dict[str, Any]) -> None:
+        """
+        Add a new job.
+
+        Args:
+            job_id (str): Job ID
+            record (Dict[str, Any]): Initial job record
+
+        Raises:
+            ValueError: If a job with this ID already exists
+        """
+        with self._lock:
+            if job_id in self._jobs:
+                raise ValueError(f"Job already exists: {job_id}")
+            self._jobs[job_id] = record
+            self._versions[job_id] = 1
+            position = len(self._order)
+            self._order.append(job_id)
+            # Clamp so creation times stay sorted even if the clock steps back
+            self._created.append(max(time.time(), self._created[-1] if self._created else 0.0))
+            self._positions[job_id] = position
+            # The new position is the largest, so appending keeps the indexes sorted
+            client, status = record.get("client"), record.get("status")
+            self._by_client.setdefault(client, []).append(position)
+            self._by_status.setdefault(status, []).append(position)
+            self._by_client_status.setdefault((client, status), []).append(position)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return a job's record. Change it through update() only.
+
+        Args:
+            job_id (str): Job ID
+
+        Returns:
+            Optional[Dict[str, Any]]: The record, or None if the job does not exist
+        """
+        return self._jobs.get(job_id)
+
+    def version(self, job_id: str) -> Optional[int]:
+        return self._versions.get(job_id)
+
+    def update(self, job_id: str, **fields) -> None:
+        """
+        Change fields of a job and wake the requests waiting on it.
+
+        Safe to call from render worker threads.
+
+        Args:
+            job_id (str): Job ID
+            **fields: Fields to set
+        """
+        with self._lock:
+            record = self._jobs[job_id]
+            if "status" in fields and fields["status"] != record.get("status"):
+                position = self._positions[job_id]
+                client, old, new = record.get("client"), record.get("status"), fields["status"]
+                _move(self._by_status, old, new, position)
+                _move(self._by_client_status, (client, old), (client, new), position)
+            record.update(fields)
+            self._versions[job_id] += 1
+            self._payloads.pop(job_id, None)
+            waiters = self._waiters.pop(job_id, [])
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                pass  # The waiter's event loop has shut down
+
+    def list_jobs(self, status: Optional[str] = None, client: Optional[str] = None,
+                  created_after: Optional[float] = None, created_before: Optional[float] = None,
+                  cursor: Optional[int] = None, limit: int = 50) -> Tuple[List[str], Optional[int]]:
+        """
+        List jobs newest first, one page at a time.
+
+        Args:
+            status (str, optional): Only jobs with this status
+            client (str, optional): Only jobs of this client
+            created_after (float, optional): Only jobs created at or after this Unix time
+            created_before (float, optional): Only jobs created before this Unix time
+            cursor (int, optional): Cursor returned with the previous page
+            limit (int): Jobs per page
+
+        Returns:
+            Tuple[List[str], Optional[int]]: Job IDs, and the cursor of the next page
+                or None if this is the last
+        """
+        with self._lock:
+            # Every filter combination has its own index; positions are in creation order
+            if client is not None and status is not None:
+                positions = self._by_client_status.get((client, status), [])
+            elif client is not None:
+                positions = self._by_client.get(client, [])
+            elif status is not None:
+                positions = self._by_status.get(status, [])
+            else:
+                positions = range(len(self._order))
+
+            # Creation times grow with position, so the time range and the cursor
+            # are both a contiguous slice of positions
+            first = bisect_left(self._created, created_after) if created_after is not None else 0
+            end = bisect_left(self._created, created_before) if created_before is not None else len(self._order)
+            if cursor is not None:
+                end = min(end, cursor)
+            start, stop = bisect_left(positions, first), bisect_left(positions, end)
+
+            page = positions[max(start, stop - limit):stop]
+            job_ids = [self._order[p] for p in reversed(page)]
+            next_cursor = page[0] if page and stop - start > limit else None
+        return job_ids, next_cursor
+
+    async def wait_for_change(self, job_id: str, version: int, timeout: float) -> Optional[int]:
+        """
+        Wait until a job's version differs from the one given, or the timeout passes.
+
+        Args:
+            job_id (str): Job ID
+            version (int): Version the caller has already seen
+            timeout (float): Maximum seconds to wait
+
+        Returns:
+            Optional[int]: The job's current version
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self._versions.get(job_id) != version:
+                return self._versions.get(job_id)
+            waiter = (loop, future)
+            self._waiters.setdefault(job_id, []).append(waiter)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                waiters = self._waiters.get(job_id, [])
+                if waiter in waiters:
+                    waiters.remove(waiter)
+                    if not waiters:
+                        del self._waiters[job_id]
+        return self._versions.get(job_id)
+
+    def cached_payload(self, job_id: str, build: Callable[[], bytes], epoch: Hashable = None) -> bytes:
+        """
+        Return a job's serialized status, building it only when the job has changed.
+
+        Args:
+            job_id (str): Job ID
+            build (Callable[[], bytes]): Serializes the status
+            epoch (Hashable): Rebuilds the payload when it changes, for content that
+                depends on more than the job, e.g. signed URLs
+
+        Returns:
+            bytes: The serialized status
+        """
+        key = (self._versions.get(job_id), epoch)
+        cached = self._payloads.get(job_id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        payload = build()
+        with self._lock:
+            # Only cache what was built from the current version
+            if key[0] == self._versions.get(job_id):
+                self._payloads[job_id] = (key, payload)
+        return payload
+
+
+def _move(index: Dict[Hashable, List[int]], old_key: Hashable, new_key: Hashable, position: int) -> None:
+    """Move a job's position from one sorted list of an index to another."""
+    positions = index.get(old_key, [])
+    at = bisect_left(positions, position)
+    if at < len(positions) and positions[at] == position:
+        del positions[at]
+        if not positions:
+            del index[old_key]
+    insort(index.setdefault(new_key, []), position)
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+# Singleton instance
+job_store = JobStore()
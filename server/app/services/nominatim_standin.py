@@ -0,0 +1,80 @@
+"""
+Local stand-in for a Nominatim server, for tests and development.
+
+Answers Nominatim's /search API from the place index, with optional latency and
+failures to exercise the geocoder's hedging and circuit breaking:
+
+    python -m app.services.nominatim_standin --port 8088 --delay 2 --fail-rate 0.5
+    GEOCODER_PROVIDERS=http://localhost:8088 uvicorn app.main:app
+"""
+import json
+import time
+import random
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from app.services.places import place_index
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+    fail_rate = 0.0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/search":
+            self._send(404, {"error": "not found"})
+            return
+        if self.delay:
+            time.sleep(self.delay)
+        if random.random() < self.fail_rate:
+            self._send(503, {"error": "unavailable"})
+            return
+
+        query = parse_qs(url.query).get("q", [""])[0]
+        coords = place_index.lookup(query)
+        name = query
+        if coords is None:
+            # Like Nominatim, match names the query is the start of
+            matches = [s for s in place_index.suggest(query, 1) if s["score"] >= 1.0]
+            if matches:
+                name, coords = matches[0]["name"], (matches[0]["lat"], matches[0]["lon"])
+        results = []
+        if coords:
+            results.append({"place_id": abs(hash(name)), "lat": str(coords[0]), "lon": str(coords[1]),
+                            "display_name": name})
+        self._send(200, results)
+
+    def _send(self, status: int, body) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logger.debug("{}", format % args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nominatim stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before answering")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    StandinHandler.delay = args.delay
+    StandinHandler.fail_rate = args.fail_rate
+    server = ThreadingHTTPServer((args.host, args.port), StandinHandler)
+    logger.info(f"Nominatim stand-in listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
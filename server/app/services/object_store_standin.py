@@ -0,0 +1,200 @@
+"""
+Local stand-in for an S3-compatible object store, for tests and development.
+
+Implements the subset of the S3 API the artifact store uses (path-style
+PUT/GET/HEAD/DELETE of objects, with byte ranges, and multipart uploads),
+keeping objects as files under a directory. Requests are not authenticated.
+
+    python -m app.services.object_store_standin --port 9000 --root /tmp/objects
+    ARTIFACT_STORE=s3 S3_ENDPOINT_URL=http://localhost:9000 \\
+        AWS_ACCESS_KEY_ID=test AWS_SECRET_ACCESS_KEY=test S3_REGION=us-east-1 uvicorn app.main:app
+"""
+import io
+import os
+import uuid
+import shutil
+import hashlib
+import argparse
+import mimetypes
+import xml.etree.ElementTree as ElementTree
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from app.services.delivery import RangeNotSatisfiable, parse_range_header
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+S3_NAMESPACE = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+
+def _read_chunked(stream) -> bytes:
+    """Decode a chunked body: HTTP chunked transfer coding or S3's aws-chunked encoding."""
+    body = bytearray()
+    while True:
+        header = stream.readline().strip()
+        size = int(header.split(b";")[0], 16)
+        if size == 0:
+            # Skip trailers (S3 puts checksums there) up to the blank line
+            while stream.readline().strip():
+                pass
+            return bytes(body)
+        body += stream.read(size)
+        stream.readline()
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    root = "objects"
+    protocol_version = "HTTP/1.1"
+
+    def _parse(self):
+        url = urlparse(self.path)
+        bucket, _, key = unquote(url.path).lstrip("/").partition("/")
+        query = {name: values[0] for name, values in parse_qs(url.query, keep_blank_values=True).items()}
+        return bucket, key, query
+
+    def _object_path(self, bucket: str, key: str) -> str:
+        path = os.path.realpath(os.path.join(self.root, bucket, key))
+        if not path.startswith(os.path.realpath(self.root) + os.sep):
+            raise ValueError(key)
+        return path
+
+    def _upload_dir(self, upload_id: str) -> str:
+        return os.path.join(self.root, ".uploads", os.path.basename(upload_id))
+
+    def _body(self) -> bytes:
+        if "chunked" in self.headers.get("Transfer-Encoding", ""):
+            body = _read_chunked(self.rfile)
+        else:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if "aws-chunked" in self.headers.get("Content-Encoding", ""):
+            body = _read_chunked(io.BytesIO(body))
+        return body
+
+    def do_PUT(self):
+        bucket, key, query = self._parse()
+        body = self._body()
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if "uploadId" in query:
+            upload_dir = self._upload_dir(query["uploadId"])
+            if not os.path.isdir(upload_dir):
+                self._error(404, "NoSuchUpload")
+                return
+            with open(os.path.join(upload_dir, f"{int(query['partNumber']):05d}"), "wb") as f:
+                f.write(body)
+        else:
+            self._write_object(bucket, key, [body])
+        self._send(200, headers={"ETag": etag})
+
+    def do_POST(self):
+        bucket, key, query = self._parse()
+        body = self._body()
+        if "uploads" in query:
+            upload_id = uuid.uuid4().hex
+            os.makedirs(self._upload_dir(upload_id))
+            self._xml(200, "InitiateMultipartUploadResult", {"Bucket": bucket, "Key": key, "UploadId": upload_id})
+        elif "uploadId" in query:
+            upload_dir = self._upload_dir(query["uploadId"])
+            if not os.path.isdir(upload_dir):
+                self._error(404, "NoSuchUpload")
+                return
+            numbers = [int(element.text) for element in ElementTree.fromstring(body).iter()
+                       if element.tag.endswith("PartNumber")]
+            parts = []
+            for number in numbers:
+                with open(os.path.join(upload_dir, f"{number:05d}"), "rb") as f:
+                    parts.append(f.read())
+            self._write_object(bucket, key, parts)
+            shutil.rmtree(upload_dir)
+            self._xml(200, "CompleteMultipartUploadResult", {"Bucket": bucket, "Key": key, "ETag": '"multipart"'})
+        else:
+            self._error(400, "InvalidRequest")
+
+    def do_DELETE(self):
+        bucket, key, query = self._parse()
+        if "uploadId" in query:
+            shutil.rmtree(self._upload_dir(query["uploadId"]), ignore_errors=True)
+        else:
+            path = self._object_path(bucket, key)
+            if os.path.isfile(path):
+                os.remove(path)
+        self._send(204)
+
+    def do_HEAD(self):
+        self._get(send_body=False)
+
+    def do_GET(self):
+        self._get(send_body=True)
+
+    def _get(self, send_body: bool):
+        bucket, key, _ = self._parse()
+        path = self._object_path(bucket, key)
+        if not os.path.isfile(path):
+            self._error(404, "NoSuchKey", send_body=send_body)
+            return
+        size = os.path.getsize(path)
+        headers = {"Content-Type": mimetypes.guess_type(key)[0] or "application/octet-stream",
+                   "Accept-Ranges": "bytes", "ETag": f'"{os.stat(path).st_mtime_ns:x}-{size:x}"'}
+        start, end, status = 0, size - 1, 200
+        if self.headers.get("Range"):
+            try:
+                byte_range = parse_range_header(self.headers["Range"], size)
+            except RangeNotSatisfiable:
+                self._error(416, "InvalidRange", send_body=send_body)
+                return
+            if byte_range:
+                (start, end), status = byte_range, 206
+                headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        with open(path, "rb") as f:
+            f.seek(start)
+            self._send(status, f.read(end - start + 1), headers, send_body=send_body)
+
+    def _write_object(self, bucket: str, key: str, parts) -> None:
+        path = self._object_path(bucket, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.partial", "wb") as f:
+            for part in parts:
+                f.write(part)
+        os.replace(f"{path}.partial", path)
+
+    def _xml(self, status: int, root: str, fields: dict) -> None:
+        element = ElementTree.Element(root, xmlns=S3_NAMESPACE)
+        for name, value in fields.items():
+            ElementTree.SubElement(element, name).text = value
+        self._send(status, ElementTree.tostring(element, xml_declaration=True, encoding="UTF-8"),
+                   {"Content-Type": "application/xml"})
+
+    def _error(self, status: int, code: str, send_body: bool = True) -> None:
+        element = ElementTree.Element("Error")
+        ElementTree.SubElement(element, "Code").text = code
+        self._send(status, ElementTree.tostring(element), {"Content-Type": "application/xml"}, send_body=send_body)
+
+    def _send(self, status: int, body: bytes = b"", headers: dict = None, send_body: bool = True) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("{}", format % args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="S3-compatible object store stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--root", default="objects", help="Directory objects are kept in")
+    args = parser.parse_args()
+
+    StandinHandler.root = args.root
+    os.makedirs(os.path.join(args.root, ".uploads"), exist_ok=True)
+    server = ThreadingHTTPServer((args.host, args.port), StandinHandler)
+    logger.info(f"Object store stand-in listening on http://{args.host}:{args.port}, objects in {args.root}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Local stand-in for an OpenTelemetry collector, for tests and development.
+
+Accepts OTLP/HTTP trace exports in JSON encoding, appends the spans to a JSONL
+file and logs a one-line summary per trace, slowest spans first:
+
+    python -m app.services.otlp_standin --port 4318 --output logs/collected_spans.jsonl
+    TRACE_EXPORTER=otlp OTLP_ENDPOINT=http://localhost:4318 uvicorn app.main:app
+
+GET /v1/traces/<trace_id> returns the spans received for a trace.
+"""
+import json
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _attribute_value(value: Dict[str, Any]) -> Any:
+    for kind in ("stringValue", "boolValue", "doubleValue"):
+        if kind in value:
+            return value[kind]
+    if "intValue" in value:
+        return int(value["intValue"])
+    return None
+
+
+def flatten(body: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Turn an OTLP export request into flat span records."""
+    spans = []
+    for resource_spans in body.get("resourceSpans", []):
+        resource = {attribute["key"]: _attribute_value(attribute["value"])
+                    for attribute in resource_spans.get("resource", {}).get("attributes", [])}
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            for span in scope_spans.get("spans", []):
+                spans.append({
+                    "service": resource.get("service.name"),
+                    "trace_id": span["traceId"],
+                    "span_id": span["spanId"],
+                    "parent_id": span.get("parentSpanId") or None,
+                    "name": span["name"],
+                    "start_ns": int(span["startTimeUnixNano"]),
+                    "end_ns": int(span["endTimeUnixNano"]),
+                    "attributes": {attribute["key"]: _attribute_value(attribute["value"])
+                                   for attribute in span.get("attributes", [])},
+                    "status": "error" if span.get("status", {}).get("code") == 2 else "ok",
+                })
+    return spans
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    output = "logs/collected_spans.jsonl"
+    traces: Dict[str, List[Dict[str, Any]]] = {}
+    lock = threading.Lock()
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/traces":
+            self._send(404, {"error": "not found"})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            spans = flatten(body)
+        except (ValueError, KeyError) as e:
+            self._send(400, {"error": str(e)})
+            return
+
+        with self.lock:
+            with open(self.output, "a") as f:
+                for span in spans:
+                    f.write(json.dumps(span) + "\n")
+            for span in spans:
+                self.traces.setdefault(span["trace_id"], []).append(span)
+        for trace_id in {span["trace_id"] for span in spans}:
+            received = sorted((s for s in spans if s["trace_id"] == trace_id),
+                              key=lambda s: s["start_ns"] - s["end_ns"])
+            logger.info("Trace {}: {}", trace_id[:12], ", ".join(
+                f"{s['name']} {(s['end_ns'] - s['start_ns']) / 1e6:.1f}ms" for s in received[:5]))
+        self._send(200, {"partialSuccess": {}})
+
+    def do_GET(self):
+        prefix = "/v1/traces/"
+        if not self.path.startswith(prefix):
+            self._send(404, {"error": "not found"})
+            return
+        with self.lock:
+            spans = sorted(self.traces.get(self.path[len(prefix):], []), key=lambda s: s["start_ns"])
+        self._send(200 if spans else 404, {"spans": spans})
+
+    def _send(self, status: int, body) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logger.debug("{}", format % args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenTelemetry collector stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--output", default="logs/collected_spans.jsonl", help="File spans are appended to")
+    args = parser.parse_args()
+
+    StandinHandler.output = args.output
+    server = ThreadingHTTPServer((args.host, args.port), StandinHandler)
+    logger.info(f"Collector stand-in listening on http://{args.host}:{args.port}, spans to {args.output}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Places suggested before anything has been geocoded: the client's popular
+# destinations and other major cities, as (name, lat, lon)
+KNOWN_PLACES: List[Tuple[str, float, float]] = [
+    ("Amsterdam, Netherlands", 52.3728, 4.8936),
+    ("Athens, Greece", 37.9838, 23.7275),
+    ("Auckland, New Zealand", -36.8485, 174.7633),
+    ("Bangkok, Thailand", 13.7525, 100.4935),
+    ("Barcelona, Spain", 41.3828, 2.1769),
+    ("Beijing, China", 39.9057, 116.3913),
+    ("Berlin, Germany", 52.5170, 13.3889),
+    ("Bogota, Colombia", 4.6534, -74.0837),
+    ("Buenos Aires, Argentina", -34.6076, -58.4371),
+    ("Cairo, Egypt", 30.0444, 31.2357),
+    ("Cape Town, South Africa", -33.9289, 18.4174),
+    ("Chicago, USA", 41.8756, -87.6244),
+    ("Delhi, India", 28.6517, 77.2219),
+    ("Dubai, UAE", 25.2650, 55.2925),
+    ("Dublin, Ireland", 53.3498, -6.2603),
+    ("Hong Kong", 22.2793, 114.1628),
+    ("Honolulu, USA", 21.3045, -157.8557),
+    ("Istanbul, Turkey", 41.0064, 28.9759),
+    ("Jakarta, Indonesia", -6.1754, 106.8272),
+    ("Johannesburg, South Africa", -26.2050, 28.0497),
+    ("Lagos, Nigeria", 6.4550, 3.3941),
+    ("Lima, Peru", -12.0464, -77.0428),
+    ("Lisbon, Portugal", 38.7078, -9.1366),
+    ("London, UK", 51.5073, -0.1277),
+    ("Los Angeles, USA", 34.0537, -118.2428),
+    ("Madrid, Spain", 40.4167, -3.7036),
+    ("Melbourne, Australia", -37.8142, 144.9632),
+    ("Mexico City, Mexico", 19.4326, -99.1332),
+    ("Miami, USA", 25.7742, -80.1936),
+    ("Moscow, Russia", 55.7505, 37.6175),
+    ("Mumbai, India", 19.0815, 72.8866),
+    ("Nairobi, Kenya", -1.2833, 36.8167),
+    ("New York, USA", 40.7127, -74.0060),
+    ("Oslo, Norway", 59.9133, 10.7390),
+    ("Paris, France", 48.8535, 2.3484),
+    ("Prague, Czech Republic", 50.0875, 14.4213),
+    ("Reykjavik, Iceland", 64.1460, -21.9422),
+    ("Rio de Janeiro, Brazil", -22.9111, -43.2056),
+    ("Rome, Italy", 41.8933, 12.4829),
+    ("San Francisco, USA", 37.7793, -122.4193),
+    ("Santiago, Chile", -33.4378, -70.6505),
+    ("Sao Paulo, Brazil", -23.5507, -46.6334),
+    ("Seoul, South Korea", 37.5667, 126.9784),
+    ("Shanghai, China", 31.2323, 121.4691),
+    ("Singapore", 1.2900, 103.8520),
+    ("Stockholm, Sweden", 59.3251, 18.0711),
+    ("Sydney, Australia", -33.8698, 151.2083),
+    ("Tashkent, Uzbekistan", 41.3123, 69.2787),
+    ("Tokyo, Japan", 35.6769, 139.7639),
+    ("Toronto, Canada", 43.6535, -79.3839),
+    ("Vancouver, Canada", 49.2609, -123.1140),
+    ("Vienna, Austria", 48.2084, 16.3725),
+]
+
+# Fuzzy matches scoring below this trigram similarity are not suggested
+MIN_SIMILARITY = 0.3
+# Characters of each word held in the prefix trie; longer queries are checked
+# against the candidates found at this depth, which keeps the trie small
+TRIE_DEPTH = 12
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and collapse punctuation, so "São Paulo" matches "sao paulo"."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(re.split(r"[^0-9a-z]+", text.lower())).strip()
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of a normalized string, padded so short words have some."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class Place:
+    name: str
+    lat: float
+    lon: float
+    key: str            # Normalized name
+    grams: Set[str]
+    uses: int = 0       # Times geocoded or resolved; ranks equally good matches
+
+
+class _TrieNode:
+    __slots__ = ("children", "places")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.places: Set[int] = set()  # Places with a word starting with this prefix
+
+
+class PlaceIndex:
+    def __init__(self, max_places: int = 20000):
+        """
+        Initialize the in-memory place name index.
+
+        Names are indexed in a prefix trie over every word ("york" finds
+        "New York, USA") and by character trigrams, which find names despite
+        typos ("lodnon" finds "London, UK").
+
+        Args:
+            max_places (int): Places kept; names geocoded beyond this are not added
+        """
+        self.max_places = max_places
+        self._places: List[Place] = []
+        self._by_key: Dict[str, int] = {}
+        self._trie = _TrieNode()
+        self._trigrams: Dict[str, Set[int]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def with_known_places(cls) -> "PlaceIndex":
+        """
+        Build an index seeded with KNOWN_PLACES.
+
+        Returns:
+            PlaceIndex: Seeded index
+        """
+        index = cls()
+        for name, lat, lon in KNOWN_PLACES:
+            index.add(name, lat, lon)
+        logger.info(f"Place index initialized with {len(KNOWN_PLACES)} known places")
+        return index
+
+    def add(self, name: str, lat: float, lon: float) -> None:
+        """
+        Add a place, or count another use of one already indexed.
+
+        Args:
+            name (str): Place name as users type it
+            lat (float): Latitude
+            lon (float): Longitude
+        """
+        key = normalize(name)
+        if not key:
+            return
+        with self._lock:
+            place_id = self._by_key.get(key)
+            if place_id is not None:
+                self._places[place_id].uses += 1
+                return
+            if len(self._places) >= self.max_places:
+                return
+
+            place_id = len(self._places)
+            place = Place(name, lat, lon, key, trigrams(key))
+            self._places.append(place)
+            self._by_key[key] = place_id
+            for word_start in [0] + [m.end() for m in re.finditer(" ", key)]:
+                node = self._trie
+                for char in key[word_start:word_start + TRIE_DEPTH]:
+                    node = node.children.setdefault(char, _TrieNode())
+                    node.places.add(place_id)
+            for gram in place.grams:
+                self._trigrams.setdefault(gram, set()).add(place_id)
+
+    def lookup(self, name: str) -> Optional[Tuple[float, float]]:
+        """
+        Coordinates of a place indexed under exactly this (normalized) name.
+
+        Args:
+            name (str): Place name
+
+        Returns:
+            Optional[Tuple[float, float]]: (lat, lon), or None if the name is not indexed
+        """
+        place_id = self._by_key.get(normalize(name))
+        if place_id is None:
+            return None
+        place = self._places[place_id]
+        return place.lat, place.lon
+
+    def suggest(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Rank places for a partially typed, possibly misspelt name.
+
+        Names starting with the query rank first, then names with a word
+        starting with it, then names similar to it; ties go to the more used.
+
+        Args:
+            query (str): Text typed so far
+            limit (int): Most suggestions returned
+
+        Returns:
+            List[Dict[str, Any]]: Suggestions with name, lat, lon and score (0 to 1)
+        """
+        key = normalize(query)
+        if not key:
+            return []
+
+        with self._lock:
+            scores: Dict[int, float] = {}
+
+            node = self._trie
+            for char in key[:TRIE_DEPTH]:
+                node = node.children.get(char)
+                if node is None:
+                    break
+            else:
+                for place_id in node.places:
+                    place_key = self._places[place_id].key
+                    if place_key.startswith(key):
+                        scores[place_id] = 1.0
+                    elif len(key) <= TRIE_DEPTH or f" {key}" in place_key:
+                        scores[place_id] = 0.9
+
+            # Trigram similarity (Dice coefficient) for typos
+            query_grams = trigrams(key)
+            shared: Dict[int, int] = {}
+            for gram in query_grams:
+                for place_id in self._trigrams.get(gram, ()):
+                    shared[place_id] = shared.get(place_id, 0) + 1
+            for place_id, count in shared.items():
+                if place_id in scores:
+                    continue
+                similarity = 2 * count / (len(query_grams) + len(self._places[place_id].grams))
+                if similarity >= MIN_SIMILARITY:
+                    scores[place_id] = 0.8 * similarity
+
+            ranked = sorted(scores.items(),
+                            key=lambda item: (-item[1], -self._places[item[0]].uses, self._places[item[0]].key))
+            return [
+                {
+                    "name": self._places[place_id].name,
+                    "lat": self._places[place_id].lat,
+                    "lon": self._places[place_id].lon,
+                    "score": round(score, 3),
+                }
+                for place_id, score in ranked[:limit]
+            ]
+
+
+# Singleton instance
+place_index = PlaceIndex.with_known_places()
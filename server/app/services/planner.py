@@ -0,0 +1,216 @@
+import os
+import math
+from dataclasses import dataclass, field, asdict
+from typing import List, Tuple, Dict, Any, Optional
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Mean Earth radius, as used by geopy's great_circle
+EARTH_RADIUS_KM = 6371.009
+
+# Legs shorter than this (the same stop twice) leave the aircraft in place
+STATIONARY_KM = 0.001
+
+
+@dataclass
+class LegPlan:
+    start: Tuple[float, float]      # (lat, lon)
+    end: Tuple[float, float]
+    distance_km: float
+    first_frame: int                # 1-based, as in Blender's timeline
+    frames: int
+    dwell_frames: int = 0           # Frames held at the start before departing, included in frames
+
+    @property
+    def stationary(self) -> bool:
+        return self.distance_km < STATIONARY_KM
+
+    def hold(self) -> Optional[Tuple[int, int]]:
+        """
+        The leg's run of identical frames: its dwell, or all of it if the aircraft
+        never moves. The aircraft, camera, trail and label are all still, so one
+        rendered frame can stand for the whole run.
+
+        Returns:
+            Optional[Tuple[int, int]]: (offset of the run's first frame in the leg, frames), or None
+        """
+        count = self.frames if self.stationary else self.dwell_frames
+        return (0, count) if count > 1 else None
+
+
+@dataclass
+class FramePlan:
+    fps: int
+    legs: List[LegPlan] = field(default_factory=list)
+    frame_budget: Optional[int] = None
+
+    @property
+    def total_frames(self) -> int:
+        return sum(leg.frames for leg in self.legs)
+
+    @property
+    def duration(self) -> float:
+        """Length of the animation in seconds."""
+        return self.total_frames / self.fps
+
+    @property
+    def unique_frames(self) -> int:
+        """Frames that have to be rendered, counting each hold once."""
+        return self.total_frames - sum(count - 1 for _, count in self.holds())
+
+    def leg_frames(self) -> List[List[int]]:
+        """[first_frame, frames, dwell_frames] per leg, as the render config expects them."""
+        return [[leg.first_frame, leg.frames, leg.dwell_frames] for leg in self.legs]
+
+    def holds(self) -> List[List[int]]:
+        """[first_frame, frames] of each run of identical frames, in timeline order."""
+        holds = []
+        for leg in self.legs:
+            hold = leg.hold()
+            if hold is not None:
+                holds.append([leg.first_frame + hold[0], hold[1]])
+        return holds
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the plan for the job status."""
+        return {
+            "fps": self.fps,
+            "total_frames": self.total_frames,
+            "unique_frames": self.unique_frames,
+            "duration": round(self.duration, 3),
+            "frame_budget": self.frame_budget,
+            "legs": [
+                {**asdict(leg), "distance_km": round(leg.distance_km, 1)}
+                for leg in self.legs
+            ],
+        }
+
+
+def great_circle_km(start: Tuple[float, float], end: Tuple[float, float]) -> float:
+    """
+    Great-circle distance between two (lat, lon) points on a spherical Earth.
+
+    Computed here rather than with geopy, whose import pulls in every geocoder
+    and requests at startup.
+    """
+    lat1, lon1, lat2, lon2 = map(math.radians, (*start, *end))
+    d_lon = lon2 - lon1
+    y = math.hypot(math.cos(lat2) * math.sin(d_lon),
+                   math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(d_lon))
+    x = math.sin(lat1) * math.sin(lat2) + math.cos(lat1) * math.cos(lat2) * math.cos(d_lon)
+    return EARTH_RADIUS_KM * math.atan2(y, x)
+
+
+def _distribute(weights: List[float], total: int) -> List[int]:
+    """
+    Split a frame total across legs in proportion to their weights.
+
+    Every leg gets at least one frame; the rest is handed out by largest remainder
+    so the parts add up to the total exactly.
+    """
+    count = len(weights)
+    if total <= count:
+        return [1] * count
+
+    spare = total - count
+    weight_sum = sum(weights)
+    shares = [spare * w / weight_sum for w in weights]
+    frames = [1 + int(share) for share in shares]
+    remainders = sorted(range(count), key=lambda i: shares[i] - int(shares[i]), reverse=True)
+    for i in remainders[:total - sum(frames)]:
+        frames[i] += 1
+    return frames
+
+
+class FramePlanner:
+    def __init__(self, seconds_per_1000km: float = 1.0,
+                 min_leg_seconds: float = 1.5,
+                 max_leg_seconds: float = 6.0,
+                 dwell_seconds: float = 0.0):
+        """
+        Initialize the frame planner.
+
+        Args:
+            seconds_per_1000km (float): Flight time per 1000 km of great-circle distance
+            min_leg_seconds (float): Shortest time spent on a leg, so hops stay readable
+            max_leg_seconds (float): Longest time spent on a leg, so long hauls don't drag
+            dwell_seconds (float): Time the aircraft waits at each stop before departing;
+                dwell frames are identical, so they are rendered once
+        """
+        self.seconds_per_1000km = seconds_per_1000km
+        self.min_leg_seconds = min_leg_seconds
+        self.max_leg_seconds = max_leg_seconds
+        self.dwell_seconds = dwell_seconds
+
+    @classmethod
+    def from_env(cls) -> "FramePlanner":
+        """
+        Build a frame planner configured from environment variables.
+
+        Returns:
+            FramePlanner: Configured planner
+        """
+        return cls(dwell_seconds=float(os.getenv("DWELL_SECONDS", "0")))
+
+    def plan(self, locations: List[Tuple[float, float]],
+             fps: int = 30,
+             duration: Optional[int] = None,
+             frame_budget: Optional[int] = None) -> FramePlan:
+        """
+        Allocate frames to each leg of a tour.
+
+        Legs get frames in proportion to their great-circle distance, clamped to
+        [min_leg_seconds, max_leg_seconds]. A leg's frame count then depends only on
+        the leg itself, so the same leg renders identically in any tour. An explicit
+        duration stretches or squeezes the plan to exactly that length; a frame budget
+        only ever caps it. Each leg starts with the dwell at its departure stop; dwells
+        are shortened to at most half of an explicit length.
+
+        Args:
+            locations (List[Tuple[float, float]]): List of (lat, lon) tuples
+            fps (int): Frames per second
+            duration (int, optional): Exact animation length in seconds
+            frame_budget (int, optional): Maximum number of frames
+
+        Returns:
+            FramePlan: Frames per leg and their position on the timeline
+        """
+        pairs = list(zip(locations, locations[1:]))
+        distances = [great_circle_km(start, end) for start, end in pairs]
+
+        min_frames = max(1, round(self.min_leg_seconds * fps))
+        max_frames = max(min_frames, round(self.max_leg_seconds * fps))
+        natural = [
+            min(max(round(km / 1000 * self.seconds_per_1000km * fps), min_frames), max_frames)
+            for km in distances
+        ]
+
+        dwell = max(0, round(self.dwell_seconds * fps))
+
+        target = None
+        if duration is not None:
+            target = duration * fps
+        if frame_budget is not None and (target or sum(natural) + dwell * len(pairs)) > frame_budget:
+            target = frame_budget
+        if target is None:
+            frames = natural
+        else:
+            dwell = min(dwell, target // (2 * len(pairs)))
+            frames = _distribute(natural, target - dwell * len(pairs))
+
+        plan = FramePlan(fps=fps, frame_budget=frame_budget)
+        first_frame = 1
+        for (start, end), km, flight_frames in zip(pairs, distances, frames):
+            plan.legs.append(LegPlan(tuple(start), tuple(end), km, first_frame, dwell + flight_frames, dwell))
+            first_frame += dwell + flight_frames
+
+        logger.info(f"Planned {plan.total_frames} frames ({plan.duration:.1f}s, {plan.unique_frames} unique) "
+                    f"over {len(plan.legs)} legs: "
+                    f"{', '.join(f'{leg.distance_km:.0f}km={leg.frames}' for leg in plan.legs)}")
+        return plan
+
+
+# Singleton instance
+frame_planner = FramePlanner.from_env()
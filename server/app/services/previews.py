@@ -0,0 +1,188 @@
+import os
+import glob
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# The sprite sheet as the WebVTT index refers to it, relative to the index
+SPRITE_CUE_PREFIX = "sprite.jpg#"
+
+
+def resolve_sprite_urls(vtt: str, sprite_url: str) -> str:
+    """
+    Point the cues of a sprite index at the sprite's delivery URL.
+
+    The index is written with a relative reference, which players resolve against
+    the index URL: that breaks once URLs are signed or redirect to an object store.
+
+    Args:
+        vtt (str): Contents of sprite.vtt
+        sprite_url (str): URL the sprite sheet is served at
+
+    Returns:
+        str: The index with every cue pointing at sprite_url
+    """
+    return "\n".join(sprite_url + "#" + line[len(SPRITE_CUE_PREFIX):] if line.startswith(SPRITE_CUE_PREFIX)
+                     else line for line in vtt.split("\n"))
+
+
+def _format_vtt_timestamp(seconds: float) -> str:
+    hours, remainder = divmod(seconds, 3600)
+    minutes, secs = divmod(remainder, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{secs:06.3f}"
+
+
+class PreviewGenerator:
+    def __init__(self, ffmpeg_path: str = "ffmpeg",
+                 output_dir: str = None,
+                 thumbnail_widths: List[int] = None,
+                 tile_width: int = 160,
+                 sprite_columns: int = 10,
+                 interval: float = 1.0):
+        """
+        Initialize the preview generator.
+
+        Args:
+            ffmpeg_path (str): Path to the ffmpeg executable
+            output_dir (str): Directory where preview folders are written
+            thumbnail_widths (List[int]): Widths of the thumbnails derived from the poster
+            tile_width (int): Width of each tile in the scrub sprite sheet
+            sprite_columns (int): Number of tiles per sprite sheet row
+            interval (float): Seconds of video covered by each sprite tile
+        """
+        self.ffmpeg_path = ffmpeg_path
+
+        if output_dir is None:
+            base_dir = Path(__file__).parent.parent.parent
+            self.output_dir = str(base_dir / "output" / "previews")
+        else:
+            self.output_dir = output_dir
+
+        self.thumbnail_widths = thumbnail_widths or [320, 160]
+        self.tile_width = tile_width
+        self.sprite_columns = sprite_columns
+        self.interval = interval
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        logger.info(f"Preview generator initialized with output directory: {self.output_dir}")
+
+    def _run_ffmpeg(self, args: List[str]) -> bool:
+        cmd = [self.ffmpeg_path, "-hide_banner", "-loglevel", "error", "-y"] + args
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        if result.returncode != 0:
+            logger.error(f"ffmpeg failed with code {result.returncode}: {result.stderr.strip()}")
+            return False
+        return True
+
+    def _extract_tiles(self, video_path: str, tiles_dir: str) -> List[str]:
+        """
+        Decode the rendered video once, keeping one downscaled frame per interval.
+        """
+        os.makedirs(tiles_dir, exist_ok=True)
+        ok = self._run_ffmpeg([
+            "-i", video_path,
+            "-vf", f"fps=1/{self.interval},scale={self.tile_width}:-2",
+            "-q:v", "4",
+            os.path.join(tiles_dir, "tile_%05d.jpg")
+        ])
+        if not ok:
+            return []
+        return sorted(glob.glob(os.path.join(tiles_dir, "tile_*.jpg")))
+
+    def _build_sprite(self, tiles: List[str], preview_dir: str) -> None:
+        """
+        Pack tiles into a single sprite sheet and write the WebVTT index for it.
+        """
+        from PIL import Image
+
+        with Image.open(tiles[0]) as first:
+            tile_w, tile_h = first.size
+
+        columns = min(self.sprite_columns, len(tiles))
+        rows = (len(tiles) + columns - 1) // columns
+        sprite = Image.new("RGB", (columns * tile_w, rows * tile_h))
+
+        cues = ["WEBVTT", ""]
+        for i, tile_path in enumerate(tiles):
+            x = (i % columns) * tile_w
+            y = (i // columns) * tile_h
+            with Image.open(tile_path) as tile:
+                sprite.paste(tile, (x, y))
+
+            start = i * self.interval
+            end = (i + 1) * self.interval
+            cues.append(f"{_format_vtt_timestamp(start)} --> {_format_vtt_timestamp(end)}")
+            cues.append(f"{SPRITE_CUE_PREFIX}xywh={x},{y},{tile_w},{tile_h}")
+            cues.append("")
+
+        sprite.save(os.path.join(preview_dir, "sprite.jpg"), quality=80, optimize=True)
+        with open(os.path.join(preview_dir, "sprite.vtt"), "w") as f:
+            f.write("\n".join(cues))
+
+    def generate(self, video_path: str) -> Optional[Dict[str, object]]:
+        """
+        Generate the poster, thumbnails and scrub sprite sheet for a rendered video.
+
+        Args:
+            video_path (str): Path to the rendered video file
+
+        Returns:
+            Optional[Dict[str, object]]: Paths of the generated files relative to the
+                parent of the previews directory, or None if generation failed
+        """
+        # Pillow is only needed once a video is finished; keep it out of startup
+        from PIL import Image
+
+        name = Path(video_path).stem
+        preview_dir = os.path.join(self.output_dir, name)
+        tiles_dir = os.path.join(preview_dir, "tiles")
+
+        try:
+            tiles = self._extract_tiles(video_path, tiles_dir)
+            if not tiles:
+                logger.error(f"No frames extracted for previews of {video_path}")
+                return None
+
+            # Poster from a third of the way in, where the flight is already underway
+            poster_time = len(tiles) * self.interval / 3
+            poster_path = os.path.join(preview_dir, "poster.jpg")
+            if not self._run_ffmpeg(["-ss", f"{poster_time:.3f}", "-i", video_path,
+                                     "-frames:v", "1", "-q:v", "2", poster_path]):
+                return None
+
+            thumbnails = {}
+            with Image.open(poster_path) as poster:
+                for width in self.thumbnail_widths:
+                    height = max(1, round(poster.height * width / poster.width))
+                    thumb_name = f"thumb_{width}.jpg"
+                    poster.resize((width, height), Image.LANCZOS).save(
+                        os.path.join(preview_dir, thumb_name), quality=80, optimize=True)
+                    thumbnails[str(width)] = thumb_name
+
+            self._build_sprite(tiles, preview_dir)
+
+            relative_dir = os.path.relpath(preview_dir, Path(self.output_dir).parent)
+            previews = {
+                "poster": f"{relative_dir}/poster.jpg",
+                "thumbnails": {width: f"{relative_dir}/{thumb}" for width, thumb in thumbnails.items()},
+                "sprite": f"{relative_dir}/sprite.jpg",
+                "sprite_vtt": f"{relative_dir}/sprite.vtt",
+            }
+            logger.info(f"Generated previews for {video_path} from {len(tiles)} frames")
+            return previews
+
+        except Exception as e:
+            logger.error(f"Error generating previews: {str(e)}")
+            return None
+
+        finally:
+            shutil.rmtree(tiles_dir, ignore_errors=True)
+
+# Singleton instance
+preview_generator = PreviewGenerator()
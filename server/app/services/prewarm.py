@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from app.models import AnimationRequest
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def tour_key(request: AnimationRequest) -> str:
+    """
+    Identify a tour by everything that changes its video.
+
+    Location names are compared case-insensitively and coordinates rounded to
+    ~1 m, so the same tour picked from the client's presets or typed by hand maps
+    to one key.
+
+    Args:
+        request (AnimationRequest): Animation request
+
+    Returns:
+        str: Hex digest identifying the tour
+    """
+    locations = [
+        [round(loc.lat, 5), round(loc.lon, 5)] if loc.lat is not None and loc.lon is not None
+        else " ".join((loc.name or "").lower().split())
+        for loc in request.locations
+    ]
+    payload = {
+        "locations": locations,
+        "quality": request.quality.value.lower(),
+        "visual": request.visual,
+        "duration": request.duration,
+        "frame_budget": request.frame_budget,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+@dataclass
+class TourStats:
+    request: AnimationRequest   # A request for the tour, replayed to pre-render it
+    score: float = 0.0          # Requests, decayed with PREWARM_HALF_LIFE
+    updated: float = field(default_factory=time.time)
+
+
+class PrewarmScheduler:
+    def __init__(self, render: Callable[[AnimationRequest], Optional[Dict[str, Any]]] = None,
+                 is_idle: Callable[[], bool] = None,
+                 exists: Callable[[str], bool] = os.path.exists,
+                 top_tours: int = 5,
+                 min_score: float = 3.0,
+                 half_life: float = 24 * 3600,
+                 interval: float = 60.0,
+                 max_tracked: int = 1000):
+        """
+        Initialize the pre-render scheduler for popular tours.
+
+        Every request is counted against its tour, with older requests weighing
+        less (exponential decay). While the render workers are idle, the most
+        popular tours that are not warm yet are geocoded and rendered one at a
+        time; a later request for a warm tour completes immediately with the
+        pre-rendered video.
+
+        Args:
+            render (Callable): Geocodes and renders a request. Returns None on failure,
+                else a dict with "artifact" (the video), "job" (fields a job served
+                from the pre-render gets) and optionally "release" (called once the
+                tour is no longer kept warm). Set by the app.
+            is_idle (Callable[[], bool]): Whether the render workers have spare capacity
+            exists (Callable[[str], bool]): Whether a pre-rendered artifact is still stored
+            top_tours (int): Most popular tours kept warm, 0 to disable pre-rendering
+            min_score (float): Decayed request count a tour needs to be pre-rendered
+            half_life (float): Seconds after which a request counts half
+            interval (float): Seconds between checks for idle capacity
+            max_tracked (int): Tours whose popularity is tracked at most
+        """
+        self.render = render
+        self.is_idle = is_idle
+        self.exists = exists
+        self.top_tours = top_tours
+        self.min_score = min_score
+        self.half_life = half_life
+        self.interval = interval
+        self.max_tracked = max_tracked
+
+        self._stats: Dict[str, TourStats] = {}
+        self._warm: Dict[str, Dict[str, Any]] = {}
+        self._failed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        logger.info(f"Pre-render scheduler initialized: top {self.top_tours} tours, min score {self.min_score}"
+                    if self.enabled else "Pre-render scheduler disabled")
+
+    @classmethod
+    def from_env(cls) -> "PrewarmScheduler":
+        """
+        Build a scheduler configured from environment variables.
+
+        Returns:
+            PrewarmScheduler: Configured scheduler
+        """
+        return cls(
+            top_tours=int(os.getenv("PREWARM_TOURS", "5")),
+            min_score=float(os.getenv("PREWARM_MIN_REQUESTS", "3")),
+            half_life=float(os.getenv("PREWARM_HALF_LIFE_HOURS", "24")) * 3600,
+            interval=float(os.getenv("PREWARM_INTERVAL", "60")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.top_tours > 0
+
+    def _decayed(self, stats: TourStats, now: float) -> float:
+        return stats.score * 0.5 ** ((now - stats.updated) / self.half_life)
+
+    def record(self, request: AnimationRequest) -> str:
+        """
+        Count a request towards its tour's popularity.
+
+        Args:
+            request (AnimationRequest): Animation request
+
+        Returns:
+            str: The tour's key
+        """
+        key = tour_key(request)
+        if not self.enabled:
+            return key
+        now = time.time()
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                if len(self._stats) >= self.max_tracked:
+                    # Forget the least popular tour
+                    coldest = min(self._stats, key=lambda k: self._decayed(self._stats[k], now))
+                    del self._stats[coldest]
+                stats = self._stats[key] = TourStats(request)
+            stats.score = self._decayed(stats, now) + 1
+            stats.updated = now
+        return key
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        The pre-rendered result of a tour, if it is warm.
+
+        Args:
+            key (str): Tour key from record()
+
+        Returns:
+            Optional[Dict[str, Any]]: Fields for a job served from the pre-render, or None
+        """
+        with self._lock:
+            result = self._warm.get(key)
+        if result is None:
+            return None
+        if not self.exists(result["artifact"]):
+            with self._lock:
+                self._warm.pop(key, None)
+            return None
+        return result["job"]
+
+    def popular(self) -> List[Dict[str, Any]]:
+        """Most popular tours with their decayed request counts and warm state."""
+        now = time.time()
+        with self._lock:
+            ranked = sorted(self._stats.items(), key=lambda item: -self._decayed(item[1], now))
+            return [
+                {
+                    "key": key,
+                    "locations": [loc.name or [loc.lat, loc.lon] for loc in stats.request.locations],
+                    "quality": stats.request.quality.value,
+                    "score": round(self._decayed(stats, now), 2),
+                    "warm": key in self._warm,
+                }
+                for key, stats in ranked[:max(self.top_tours, 10)]
+            ]
+
+    def start(self) -> None:
+        """Start checking for idle capacity in the background."""
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="prewarm", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.prewarm_next()
+            except Exception as e:
+                logger.error(f"Pre-rendering failed: {str(e)}")
+
+    def _targets(self) -> List[str]:
+        """Keys of the tours that should be warm, most popular first."""
+        now = time.time()
+        with self._lock:
+            scored = [(self._decayed(stats, now), key) for key, stats in self._stats.items()]
+        scored = [(score, key) for score, key in scored if score >= self.min_score]
+        return [key for _, key in sorted(scored, reverse=True)[:self.top_tours]]
+
+    def prewarm_next(self) -> bool:
+        """
+        Pre-render the most popular cold tour if the render workers are idle.
+
+        Tours that dropped out of the top are released first, so their cache
+        entries can be evicted again.
+
+        Returns:
+            bool: True if a tour was rendered
+        """
+        targets = self._targets()
+        with self._lock:
+            for key in [key for key in self._warm if key not in targets]:
+                released = self._warm.pop(key)
+                if released.get("release"):
+                    released["release"]()
+                logger.info(f"Tour {key[:12]} is no longer popular, released its pre-render")
+
+        if self.render is None or (self.is_idle is not None and not self.is_idle()):
+            return False
+
+        now = time.time()
+        for key in targets:
+            if self.lookup(key) or now - self._failed.get(key, 0) < self.half_life:
+                continue
+            with self._lock:
+                request = self._stats[key].request
+            logger.info(f"Pre-rendering popular tour {key[:12]} ({request.quality.value})")
+            result = self.render(request)
+            if result is None:
+                # Do not retry a failing tour on every idle check
+                self._failed[key] = now
+                return False
+            with self._lock:
+                self._warm[key] = result
+            return True
+        return False
+
+
+# Singleton instance
+prewarm_scheduler = PrewarmScheduler.from_env()
@@ -0,0 +1,149 @@
+import os
+import sys
+import random
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Deepest stack recorded per sample; deeper frames are cut off at the root
+MAX_STACK_DEPTH = 128
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.01, thread_id: Optional[int] = None):
+        """
+        Initialize a statistical profiler for one thread.
+
+        A background thread records the profiled thread's stack every interval
+        seconds. Time spent blocked (on Blender, ffmpeg or a geocoder) is sampled
+        like time spent computing, so the profile shows where wall-clock time goes.
+
+        Args:
+            interval (float): Seconds between samples
+            thread_id (int, optional): Thread to profile, by default the one calling start()
+        """
+        self.interval = interval
+        self.thread_id = thread_id
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        """
+        The samples in folded-stack format: one "root;...;leaf count" line per
+        distinct stack, as read by flamegraph.pl, speedscope and inferno.
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class JobProfiler:
+    def __init__(self, output_dir: str, sample_rate: float = 0.0, interval: float = 0.01):
+        """
+        Initialize on-demand profiling of render jobs.
+
+        A profiled job runs under a SamplingProfiler from geocoding to upload, and
+        its Blender runs time their phases and run under cProfile. The results are
+        written to profiles/<job_id>/ in the output directory and listed with the job.
+
+        Args:
+            output_dir (str): Output directory; profiles are artifacts like videos
+            sample_rate (float): Fraction of jobs profiled without being asked to
+            interval (float): Seconds between stack samples
+        """
+        self.root_dir = output_dir
+        self.profiles_dir = os.path.join(output_dir, "profiles")
+        self.sample_rate = sample_rate
+        self.interval = interval
+        logger.info(f"Job profiling: on request, sample rate {self.sample_rate}")
+
+    @classmethod
+    def from_env(cls, output_dir: str) -> "JobProfiler":
+        """
+        Build a job profiler configured from environment variables.
+
+        Args:
+            output_dir (str): Output directory
+
+        Returns:
+            JobProfiler: Configured profiler
+        """
+        return cls(
+            output_dir,
+            sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+            interval=float(os.getenv("PROFILE_INTERVAL_MS", "10")) / 1000,
+        )
+
+    def should_profile(self, requested: bool) -> bool:
+        """Whether to profile a job: when its request asks, or by sampling."""
+        return requested or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    @contextmanager
+    def profile(self, job_id: str, enabled: bool) -> Iterator[Optional[str]]:
+        """
+        Sample the calling thread while the block runs, if enabled.
+
+        Args:
+            job_id (str): Job being run
+            enabled (bool): Whether the job is profiled
+
+        Yields:
+            Optional[str]: The job's profile directory, for Blender's profiles, or None
+        """
+        if not enabled:
+            yield None
+            return
+        profile_dir = os.path.join(self.profiles_dir, job_id)
+        os.makedirs(profile_dir, exist_ok=True)
+        sampler = SamplingProfiler(self.interval)
+        sampler.start()
+        try:
+            yield profile_dir
+        finally:
+            sampler.stop()
+            with open(os.path.join(profile_dir, "server.folded"), "w") as f:
+                f.write(sampler.folded())
+            logger.info(f"Profiled job {job_id}: {sum(sampler.stacks.values())} samples in {profile_dir}")
+
+    def artifacts(self, job_id: str) -> List[str]:
+        """
+        Keys (paths relative to the output directory) of a job's profile files.
+
+        Args:
+            job_id (str): Job ID
+
+        Returns:
+            List[str]: Profile files, e.g. "profiles/<job_id>/server.folded"
+        """
+        profile_dir = os.path.join(self.profiles_dir, job_id)
+        keys = []
+        for directory, _, filenames in os.walk(profile_dir):
+            for filename in sorted(filenames):
+                keys.append(os.path.relpath(os.path.join(directory, filename), self.root_dir))
+        return sorted(keys)
@@ -0,0 +1,126 @@
+import os
+import time
+import threading
+from typing import Dict, Tuple
+
+from app.utils.logger import get_logger, log_sampler
+
+logger = get_logger(__name__)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        """
+        Initialize a full token bucket.
+
+        Args:
+            rate (float): Tokens added per second
+            burst (float): Bucket capacity
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, cost: float = 1.0) -> Tuple[bool, float]:
+        """
+        Take tokens from the bucket if enough are available.
+
+        Args:
+            cost (float): Tokens to take
+
+        Returns:
+            Tuple[bool, float]: Whether the tokens were taken, and if not, seconds
+                until enough will have accumulated
+        """
+        self._refill(time.monotonic())
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True, 0.0
+        if cost > self.burst:
+            # Can never be satisfied; report the time to a full bucket
+            return False, (self.burst - self.tokens) / self.rate
+        return False, (cost - self.tokens) / self.rate
+
+    def is_full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.burst
+
+
+class RateLimiter:
+    def __init__(self, per_minute: float = 10, burst: float = 20, max_clients: int = 10000):
+        """
+        Initialize per-client token-bucket rate limiting.
+
+        Args:
+            per_minute (float): Sustained requests per minute per client, 0 to disable
+            burst (float): Requests a client may make at once after being idle
+            max_clients (int): Buckets kept before idle (full) buckets are dropped
+        """
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+        logger.info(f"Rate limiter initialized: {per_minute}/min per client, burst {burst}"
+                    if self.enabled else "Rate limiter disabled")
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        """
+        Build a rate limiter configured from environment variables.
+
+        Returns:
+            RateLimiter: Configured rate limiter
+        """
+        return cls(
+            per_minute=float(os.getenv("RATE_LIMIT_PER_MINUTE", "10")),
+            burst=float(os.getenv("RATE_LIMIT_BURST", "20")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def check(self, client_id: str, cost: float = 1.0) -> Tuple[bool, float]:
+        """
+        Charge a client for a request.
+
+        Args:
+            client_id (str): API key or IP based client identifier
+            cost (float): Number of requests to charge, e.g. tours in a batch
+
+        Returns:
+            Tuple[bool, float]: Whether the request is allowed, and if not, the
+                suggested Retry-After in seconds
+        """
+        if not self.enabled:
+            return True, 0.0
+
+        with self._lock:
+            bucket = self._buckets.get(client_id)
+            if bucket is None:
+                if len(self._buckets) >= self.max_clients:
+                    self._prune()
+                bucket = self._buckets[client_id] = TokenBucket(self.rate, self.burst)
+            allowed, retry_after = bucket.take(cost)
+
+        if not allowed:
+            # A misbehaving client can hit this on every request; log it once per interval
+            log_sampler.log(logger, "WARNING", f"rate-limit:{client_id}",
+                            "Rate limit exceeded for {}, retry in {:.1f}s", client_id, retry_after)
+        return allowed, retry_after
+
+    def _prune(self) -> None:
+        """Forget clients whose buckets have refilled; they are indistinguishable from new ones."""
+        for client_id in [cid for cid, bucket in self._buckets.items() if bucket.is_full()]:
+            del self._buckets[client_id]
+
+
+# Singleton instance
+rate_limiter = RateLimiter.from_env()
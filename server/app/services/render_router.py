@@ -0,0 +1,123 @@
+import os
+import threading
+from typing import TYPE_CHECKING, List, Tuple, Optional
+
+from app.utils.lazy import LazyService
+from app.utils.logger import get_logger
+from app.models import VideoQuality
+from app.services.planner import FramePlan
+from app.services.resources import ResourceUsage
+from app.services.tracing import tracer
+
+if TYPE_CHECKING:
+    from app.services.renderer import BlenderRenderer
+    from app.services.software_renderer import SoftwareRenderer
+
+logger = get_logger(__name__)
+
+RENDER_BACKENDS = ("auto", "blender", "software")
+
+
+class RenderRouter:
+    def __init__(self, blender: "BlenderRenderer",
+                 software: "SoftwareRenderer",
+                 backend: str = None,
+                 max_blender_jobs: int = None,
+                 software_qualities: List[str] = None):
+        """
+        Route render jobs between the Blender and software backends.
+
+        Args:
+            blender (BlenderRenderer): Full-quality backend
+            software (SoftwareRenderer): Blender-free fallback backend
+            backend (str): "blender" or "software" to force a backend, or "auto" to use
+                Blender when it is installed and has capacity. Defaults to the
+                RENDER_BACKEND environment variable, then "auto".
+            max_blender_jobs (int): Concurrent Blender renders before "auto" overflows to
+                the software backend. Defaults to BLENDER_MAX_JOBS, then as many renders
+                as the render cores fit at the default thread split.
+            software_qualities (List[str]): Qualities "auto" always renders in software,
+                e.g. previews. Defaults to SOFTWARE_RENDER_QUALITIES, then "360p".
+        """
+        self.blender = blender
+        self.software = software
+        self.backend = (backend or os.getenv("RENDER_BACKEND", "auto")).lower()
+        if self.backend not in RENDER_BACKENDS:
+            raise ValueError(f"Unknown render backend: {self.backend}")
+        self.max_blender_jobs = (max_blender_jobs or int(os.getenv("BLENDER_MAX_JOBS", "0"))
+                                 or blender.cores.default_concurrency())
+        if software_qualities is None:
+            software_qualities = os.getenv("SOFTWARE_RENDER_QUALITIES", "360p").split(",")
+        self.software_qualities = {q.strip().lower() for q in software_qualities if q.strip()}
+
+        self._active_blender_jobs = 0
+        self._lock = threading.Lock()
+        logger.info(f"Render router initialized: backend {self.backend}, "
+                    f"max {self.max_blender_jobs} Blender jobs, software qualities {sorted(self.software_qualities)}")
+
+    def _claim_blender(self, quality: VideoQuality) -> bool:
+        """Decide whether a job goes to Blender, reserving a Blender slot if so."""
+        if self.backend == "software":
+            return False
+        if self.backend == "auto":
+            if quality.value.lower() in self.software_qualities:
+                return False
+            if not self.blender.is_available():
+                logger.warning(f"Blender not found at {self.blender.blender_path}, using the software renderer")
+                return False
+        with self._lock:
+            if self.backend == "auto" and self._active_blender_jobs >= self.max_blender_jobs:
+                logger.info(f"{self._active_blender_jobs} Blender jobs running, overflowing to the software renderer")
+                return False
+            self._active_blender_jobs += 1
+        return True
+
+    def render_animation(self, locations: List[Tuple[float, float]],
+                         quality: VideoQuality,
+                         fps: int = 30,
+                         duration: int = None,
+                         visual: str = "mobile",
+                         plan: Optional[FramePlan] = None,
+                         usage: Optional[ResourceUsage] = None,
+                         profile_dir: Optional[str] = None) -> Optional[str]:
+        """
+        Render a flight path animation on whichever backend should take it.
+
+        Args:
+            locations (List[Tuple[float, float]]): List of (lat, lon) tuples
+            quality (VideoQuality): Video quality enum
+            fps (int): Frames per second
+            duration (int, optional): Animation duration in seconds
+            visual (str): Visual profile name
+            plan (FramePlan, optional): Frames per leg
+            usage (ResourceUsage, optional): Accumulates the render's resource use
+            profile_dir (str, optional): Where Blender writes phase timings and profiles;
+                software renders are covered by the job's sampling profile only
+
+        Returns:
+            Optional[str]: Path to the rendered video file or None if rendering failed
+        """
+        if not self._claim_blender(quality):
+            with tracer.span("render", backend="software", quality=quality.value):
+                return self.software.render_animation(locations, quality, fps, duration, visual, plan, usage)
+
+        try:
+            with tracer.span("render", backend="blender", quality=quality.value):
+                return self.blender.render_animation(locations, quality, fps, duration, visual, plan, usage,
+                                                     profile_dir=profile_dir)
+        finally:
+            with self._lock:
+                self._active_blender_jobs -= 1
+
+
+def _build_render_router() -> RenderRouter:
+    # The backends (and NumPy, which the software renderer needs) are imported
+    # when the router is first used rather than when the API starts
+    from app.services.renderer import blender_renderer
+    from app.services.software_renderer import software_renderer
+
+    return RenderRouter(blender_renderer.get(), software_renderer.get())
+
+
+# Singleton instance, built on first use
+render_router = LazyService("render_router", _build_render_router)
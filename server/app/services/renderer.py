@@ -1,20 +1,40 @@
 import os
 import json
+import math
+import shutil
 import subprocess
 import tempfile
+import uuid
 from datetime import datetime
 from pathlib import Path
 from typing import List, Tuple, Dict, Any, Optional
 
+from app.utils.lazy import LazyService
 from app.utils.logger import get_logger
 from app.models import Location, VideoQuality
+from app.quality_profiles import resolve_render_profile
+from app.services.encoder import FFmpegEncoder
+from app.services.segment_cache import SegmentCache
+from app.services.tracing import tracer
+from app.services.planner import FramePlan, frame_planner
+from app.services.resources import (CoreAllocator, ProcessLimits, ResourceUsage, core_allocator, process_limits,
+                                   directory_size, wait_with_usage)
 
 logger = get_logger(__name__)
 
+# Lines of Blender output kept per stream for error reports
+BLENDER_OUTPUT_TAIL_LINES = 200
+
 class BlenderRenderer:
     def __init__(self, blender_path: str = "/Applications/Blender.app/Contents/MacOS/Blender", 
                  script_path: str = None,
-                 output_dir: str = None):
+                 output_dir: str = None,
+                 encode_mode: str = None,
+                 encoder: FFmpegEncoder = None,
+                 frame_format: str = "BMP",
+                 segment_cache: SegmentCache = None,
+                 cores: CoreAllocator = None,
+                 limits: ProcessLimits = None):
         """
         Initialize the Blender renderer.
         
@@ -22,13 +42,33 @@ class BlenderRenderer:
             blender_path (str): Path to the Blender executable
             script_path (str): Path to the Blender Python script
             output_dir (str): Directory to save rendered videos
+            encode_mode (str): "blender" to encode with Blender's built-in FFMPEG output,
+                or "pipe" to stream frames to a concurrently running ffmpeg process.
+                Defaults to the ENCODE_MODE environment variable, then "blender".
+            encoder (FFmpegEncoder): External encoder used in "pipe" mode
+            frame_format (str): Image format Blender streams to the encoder in "pipe" mode
+            segment_cache (SegmentCache): When set, tours are rendered leg by leg and legs
+                are reused across tours. Enabled from the environment with SEGMENT_CACHE=1.
+            cores (CoreAllocator): Hands each render a disjoint set of cores to pin
+                Blender to, sized per quality
+            limits (ProcessLimits): Memory and CPU time limits for Blender processes
         """
         self.blender_path = blender_path
+        self.encode_mode = encode_mode or os.getenv("ENCODE_MODE", "blender")
+        if self.encode_mode not in ("blender", "pipe"):
+            raise ValueError(f"Unknown encode mode: {self.encode_mode}")
+        self.encoder = encoder or FFmpegEncoder.from_env()
+        self.frame_format = frame_format
+        if segment_cache is None and os.getenv("SEGMENT_CACHE", "").lower() in ("1", "true", "yes"):
+            segment_cache = SegmentCache(max_bytes=int(os.getenv("SEGMENT_CACHE_MAX_BYTES", str(10 * 1024 ** 3))))
+        self.segment_cache = segment_cache
+        self.cores = cores or core_allocator
+        self.limits = limits or process_limits
         
         # Use default script path if not provided
         if script_path is None:
             base_dir = Path(__file__).parent.parent.parent
-            self.script_path = str(base_dir / "blender_scripts" / "render_flight_simple.py")
+            self.script_path = str(base_dir / "blender_scripts" / "render_flight.py")
         else:
             self.script_path = script_path
             
@@ -49,11 +89,25 @@ class BlenderRenderer:
         logger.info(f"Blender renderer initialized with script: {self.script_path}")
         logger.info(f"Output directory set to: {self.output_dir}")
         logger.info(f"Config directory set to: {self.config_dir}")
+        logger.info(f"Encode mode: {self.encode_mode}, segment cache: {'on' if self.segment_cache else 'off'}")
+    
+    def is_available(self) -> bool:
+        """
+        Check whether the Blender executable can be run.
+        
+        Returns:
+            bool: True if the Blender binary exists and is executable
+        """
+        if os.path.isfile(self.blender_path):
+            return os.access(self.blender_path, os.X_OK)
+        return shutil.which(self.blender_path) is not None
     
     def _prepare_config(self, locations: List[Tuple[float, float]], 
                         quality: VideoQuality,
                         fps: int = 30,
-                        duration: int = 10) -> str:
+                        duration: int = 10,
+                        extra: Optional[Dict[str, Any]] = None,
+                        visual: str = "mobile") -> str:
         """
         Prepare configuration file for Blender script.
         
@@ -62,25 +116,37 @@ class BlenderRenderer:
             quality (VideoQuality): Video quality enum
             fps (int): Frames per second
             duration (int): Animation duration in seconds
+            extra (Dict[str, Any], optional): Additional settings merged into the config
+            visual (str): Visual profile name
             
         Returns:
             str: Path to the configuration file
         """
-        # Prepare the configuration data
+        # Prepare the configuration data; the resolved profiles travel with it so the
+        # Blender script never needs its own resolution/engine tables
+        quality_profile, visual_profile = resolve_render_profile(quality.value, visual)
         config_data = {
             "locations": [{"lat": lat, "lon": lon} for lat, lon in locations],
             "quality": quality.value,
+            "profile": quality_profile.to_dict(),
+            "visual": visual_profile.to_dict(),
             "fps": fps,
             "duration": duration
         }
+        if extra:
+            config_data.update(extra)
         
-        # Create a timestamp-based filename for the config
+        # Timestamp for humans, random suffix so concurrent renders never share a config
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        config_filename = f"earth_tour_config_{timestamp}.json"
+        config_filename = f"earth_tour_config_{timestamp}_{uuid.uuid4().hex[:8]}.json"
         config_path = os.path.join(self.config_dir, config_filename)
         
+        if tracer.enabled:
+            # The script's spans join the job's trace; _run_blender exports them
+            config_data["trace"] = {"traceparent": tracer.inject(), "spans_path": _spans_path(config_path)}
+        
         # Write the configuration to a file
-        with open(config_path, 'w') as f:
+        with tracer.span("render.config_write"), open(config_path, 'w') as f:
             json.dump(config_data, f, indent=2)
             
         logger.info(f"Created configuration file: {config_path}")
@@ -97,7 +163,8 @@ class BlenderRenderer:
             str: Path to the output video file
         """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"earth_tour_{timestamp}_{quality.value}.mp4"
+        # Jobs finishing in the same second must not overwrite each other's video
+        filename = f"earth_tour_{timestamp}_{uuid.uuid4().hex[:8]}_{quality.value}.mp4"
         output_path = os.path.join(self.output_dir, filename)
         
         logger.info(f"Generated output filename: {output_path}")
@@ -106,7 +173,11 @@ class BlenderRenderer:
     def render_animation(self, locations: List[Tuple[float, float]], 
                          quality: VideoQuality,
                          fps: int = 30,
-                         duration: int = None) -> Optional[str]:
+                         duration: int = None,
+                         visual: str = "mobile",
+                         plan: Optional[FramePlan] = None,
+                         usage: Optional[ResourceUsage] = None,
+                         profile_dir: Optional[str] = None) -> Optional[str]:
         """
         Render a flight path animation using Blender.
         
@@ -114,7 +185,12 @@ class BlenderRenderer:
             locations (List[Tuple[float, float]]): List of (lat, lon) tuples
             quality (VideoQuality): Video quality enum
             fps (int): Frames per second
-            duration (int, optional): Animation duration in seconds. If None, duration will be calculated based on the number of locations.
+            duration (int, optional): Animation duration in seconds. If None, the frame planner sizes each leg by distance.
+            visual (str): Visual profile name; together with the quality it selects the render engine
+            plan (FramePlan, optional): Frames per leg; planned from the locations if not given
+            usage (ResourceUsage, optional): Accumulates CPU time, memory and disk use of the render
+            profile_dir (str, optional): Directory the Blender script writes phase timings
+                and cProfile stats to (one subdirectory per leg when rendering by leg)
             
         Returns:
             Optional[str]: Path to the rendered video file or None if rendering failed
@@ -123,62 +199,43 @@ class BlenderRenderer:
             logger.error("At least 2 locations are required for animation")
             return None
         
-        # Calculate dynamic duration if not provided
-        if duration is None:
-            # Base duration: 5 seconds for 2 locations, +3 seconds for each additional location
-            num_locations = len(locations)
-            duration = 5 + (num_locations - 2) * 3
-            logger.info(f"Calculated dynamic duration: {duration}s for {num_locations} locations")
+        if plan is None:
+            plan = frame_planner.plan(locations, fps, duration)
+        if usage is None:
+            usage = ResourceUsage()
             
         try:
-            # Prepare configuration file
-            config_path = self._prepare_config(locations, quality, fps, duration)
-            
             # Generate output path
             output_path = self._generate_output_filename(quality)
             
-            # Build Blender command
-            blender_cmd = [
-                self.blender_path,
-                "--background",
-                "--python", self.script_path,
-                "--",
-                "--config", config_path,
-                "--output", output_path
-            ]
-            
-            logger.info(f"Executing Blender: {' '.join(blender_cmd)}")
-            
-            # Run Blender process
-            process = subprocess.Popen(
-                blender_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True
-            )
+            # Waits until enough cores are free, so concurrent renders never share cores
+            with self.cores.reserve(self.cores.threads_for(quality.value)) as cores:
+                logger.info(f"Rendering {quality.value} on cores {cores}")
+                if self.segment_cache is not None:
+                    success = self._render_segmented(locations, quality, fps, plan, output_path, visual, cores,
+                                                     usage, profile_dir)
+                else:
+                    extra = {"frames": plan.total_frames, "legs": plan.leg_frames(), "holds": plan.holds()}
+                    if profile_dir:
+                        extra["profile_dir"] = profile_dir
+                    success = self._render_video(locations, quality, fps, math.ceil(plan.duration), output_path,
+                                                 extra=extra, visual=visual, cores=cores, usage=usage)
             
-            # Capture output
-            stdout, stderr = process.communicate()
-            
-            # Check if rendering was successful
-            if process.returncode != 0:
-                logger.error(f"Blender rendering failed with code {process.returncode}")
-                logger.error(f"Stderr: {stderr}")
-                logger.debug(f"Stdout: {stdout}")
+            if not success:
                 return None
-                
-            logger.info(f"Blender rendering completed successfully")
-            logger.debug(f"Blender stdout: {stdout}")
-            
-            # Clean up config file (optional)
-            # We're keeping it for now for debugging purposes
-            # try:
-            #     os.remove(config_path)
-            # except Exception as e:
-            #     logger.warning(f"Failed to clean up config file: {str(e)}")
+            
+            if self.encode_mode == "blender" and self.segment_cache is None:
+                # Blender writes the index last; move it up so phones can start playback
+                # while downloading. Joined segments and piped encodes are already fast-start.
+                with tracer.span("encode.faststart"):
+                    remuxed = self.encoder.faststart(output_path, usage)
+                if not remuxed:
+                    logger.warning(f"Fast-start remux failed, delivering {output_path} as rendered")
                 
             # Check if output file exists
             if os.path.exists(output_path):
+                usage.output_bytes = os.path.getsize(output_path)
+                logger.info(f"Render used {usage.cpu_seconds:.1f} CPU s, peak RSS {usage.peak_rss_bytes} bytes")
                 return output_path
             else:
                 logger.error(f"Output file not found: {output_path}")
@@ -187,6 +244,259 @@ class BlenderRenderer:
         except Exception as e:
             logger.error(f"Error during rendering: {str(e)}")
             return None
+    
+    def _render_video(self, locations: List[Tuple[float, float]],
+                      quality: VideoQuality,
+                      fps: int,
+                      duration: int,
+                      output_path: str,
+                      extra: Optional[Dict[str, Any]] = None,
+                      visual: str = "mobile",
+                      cores: Optional[List[int]] = None,
+                      usage: Optional[ResourceUsage] = None) -> bool:
+        """
+        Render locations into a single video using the configured encode mode.
+        
+        Args:
+            locations (List[Tuple[float, float]]): List of (lat, lon) tuples
+            quality (VideoQuality): Video quality enum
+            fps (int): Frames per second
+            duration (int): Animation duration in seconds
+            output_path (str): Path of the video to produce
+            extra (Dict[str, Any], optional): Additional settings for the Blender script
+            visual (str): Visual profile name
+            cores (List[int], optional): Cores reserved for Blender
+            usage (ResourceUsage, optional): Accumulates resource use
+            
+        Returns:
+            bool: True if rendering succeeded
+        """
+        # Short fixed GOPs for precise seeking, unless the caller chose one
+        profile, _ = resolve_render_profile(quality.value, visual)
+        extra = {"gop_size": profile.gop_frames(fps), **(extra or {})}
+        with tracer.span("blender.run", mode=self.encode_mode, frames=extra.get("frames", fps * duration)):
+            if self.encode_mode == "pipe":
+                return self._render_piped(locations, quality, fps, duration, output_path, extra, visual, cores,
+                                          usage)
+            config_path = self._prepare_config(locations, quality, fps, duration, extra=extra, visual=visual)
+            return self._run_blender(config_path, output_path, cores, usage)
+    
+    def _render_segmented(self, locations: List[Tuple[float, float]],
+                          quality: VideoQuality,
+                          fps: int,
+                          plan: FramePlan,
+                          output_path: str,
+                          visual: str = "mobile",
+                          cores: Optional[List[int]] = None,
+                          usage: Optional[ResourceUsage] = None,
+                          profile_dir: Optional[str] = None) -> bool:
+        """
+        Render a tour leg by leg, reusing cached legs, and join the legs without re-encoding.
+        
+        Each leg is its own encode with a fixed GOP, so it starts on a keyframe and can
+        be concatenated with stream copy.
+        
+        Args:
+            locations (List[Tuple[float, float]]): List of (lat, lon) tuples
+            quality (VideoQuality): Video quality enum
+            fps (int): Frames per second
+            plan (FramePlan): Frames per leg
+            output_path (str): Path of the video to produce
+            visual (str): Visual profile name
+            cores (List[int], optional): Cores reserved for Blender
+            usage (ResourceUsage, optional): Accumulates resource use; freshly rendered
+                legs count as temporary disk use
+            profile_dir (str, optional): Directory for the Blender profiles of rendered legs
+            
+        Returns:
+            bool: True if every leg was available and the tour was assembled
+        """
+        quality_profile, visual_profile = resolve_render_profile(quality.value, visual)
+        script_name = os.path.basename(self.script_path)
+        # The legs of this tour are pinned until they are joined, so concurrent
+        # renders cannot evict them in between
+        owner = f"render-{uuid.uuid4().hex}"
+        try:
+            segment_paths = []
+            for number, leg in enumerate(plan.legs, 1):
+                start, end, leg_frames = leg.start, leg.end, leg.frames
+                # Legs without a dwell keep the keys they were cached under before dwells existed
+                dwell = {"dwell_frames": leg.dwell_frames} if leg.dwell_frames else {}
+                key = SegmentCache.segment_key(start, end, quality.value, fps, leg_frames, **dwell,
+                                               profile=quality_profile.to_dict(),
+                                               visual=visual_profile.to_dict(),
+                                               script=script_name)
+                cached = self.segment_cache.get(key, owner=owner)
+                if cached:
+                    logger.info(f"Segment cache hit for leg {start} -> {end}")
+                    segment_paths.append(cached)
+                    continue
+            
+                logger.info(f"Segment cache miss for leg {start} -> {end}, rendering {leg_frames} frames")
+                # Render next to the cache so the final move is an atomic rename, in a
+                # directory of this render's own that eviction leaves alone
+                partial_dir = tempfile.mkdtemp(prefix=f"{key}.", suffix=".partial", dir=self.segment_cache.cache_dir)
+                leg_output = os.path.join(partial_dir, "leg.mp4")
+                hold = leg.hold()
+                extra = {"frames": leg_frames, "legs": [[1, leg_frames, leg.dwell_frames]],
+                         "holds": [[1 + hold[0], hold[1]]] if hold else [],
+                         "gop_size": quality_profile.gop_frames(fps)}
+                if profile_dir:
+                    extra["profile_dir"] = os.path.join(profile_dir, f"leg_{number}")
+                try:
+                    with tracer.span("render.leg", leg=number, frames=leg_frames):
+                        leg_ok = self._render_video([start, end], quality, fps, math.ceil(leg_frames / fps),
+                                                    leg_output, extra=extra, visual=visual, cores=cores,
+                                                    usage=usage)
+                    if not leg_ok or not os.path.exists(leg_output):
+                        logger.error(f"Failed to render leg {start} -> {end}")
+                        return False
+                    if usage is not None:
+                        usage.temp_bytes += os.path.getsize(leg_output)
+                    segment_paths.append(self.segment_cache.put(key, leg_output, owner=owner))
+                finally:
+                    shutil.rmtree(partial_dir, ignore_errors=True)
+        
+            with tracer.span("encode.concat", segments=len(segment_paths)):
+                return self.encoder.concat(segment_paths, output_path)
+        finally:
+            self.segment_cache.unpin(owner)
+    
+    def _run_blender(self, config_path: str, output_path: str, cores: Optional[List[int]] = None,
+                     usage: Optional[ResourceUsage] = None) -> bool:
+        """
+        Run the Blender script for a prepared configuration.
+        
+        Args:
+            config_path (str): Path to the configuration file
+            output_path (str): Path of the video Blender should produce
+            cores (List[int], optional): Cores to pin Blender to; it renders with one
+                thread per core instead of one per core on the machine
+            usage (ResourceUsage, optional): Accumulates Blender's CPU time and peak memory
+            
+        Returns:
+            bool: True if Blender exited successfully
+        """
+        # Build Blender command; --threads must precede --python to apply to its render
+        blender_cmd = [self.blender_path, "--background"]
+        if cores:
+            blender_cmd += ["--threads", str(len(cores))]
+        blender_cmd += [
+            "--python", self.script_path,
+            "--",
+            "--config", config_path,
+            "--output", output_path
+        ]
+        
+        logger.info(f"Executing Blender: {' '.join(blender_cmd)}")
+        process_span = tracer.start_span("blender.process", **({"threads": len(cores)} if cores else {}))
+        
+        # Run Blender process
+        process = subprocess.Popen(
+            blender_cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            preexec_fn=self.limits.preexec_fn(cores)
+        )
+        
+        # Capture the tail of the output (Blender logs every frame), reaping Blender
+        # with wait4 to get its resource usage
+        stdout, stderr, rusage = wait_with_usage(process, tail_lines=BLENDER_OUTPUT_TAIL_LINES)
+        tracer.end_span(process_span, RuntimeError(f"exit code {process.returncode}") if process.returncode else None)
+        tracer.import_file(_spans_path(config_path))
+        if usage is not None:
+            if rusage is not None:
+                usage.add_rusage(rusage)
+            usage.temp_bytes += os.path.getsize(config_path)
+        
+        # Check if rendering was successful
+        if process.returncode != 0:
+            logger.error("Blender rendering failed with code {}", process.returncode)
+            logger.error("Stderr: {}", stderr)
+            logger.debug("Stdout: {}", stdout)
+            return False
+            
+        logger.info("Blender rendering completed successfully")
+        logger.debug("Blender stdout: {}", stdout)
+        
+        # Clean up config file (optional)
+        # We're keeping it for now for debugging purposes
+        # try:
+        #     os.remove(config_path)
+        # except Exception as e:
+        #     logger.warning(f"Failed to clean up config file: {str(e)}")
+        return True
+    
+    def _render_piped(self, locations: List[Tuple[float, float]],
+                      quality: VideoQuality,
+                      fps: int,
+                      duration: int,
+                      output_path: str,
+                      extra: Optional[Dict[str, Any]] = None,
+                      visual: str = "mobile",
+                      cores: Optional[List[int]] = None,
+                      usage: Optional[ResourceUsage] = None) -> bool:
+        """
+        Render with encoding overlapped: Blender writes each finished frame into a named
+        pipe that a concurrently running ffmpeg process consumes.
+        
+        Args:
+            locations (List[Tuple[float, float]]): List of (lat, lon) tuples
+            quality (VideoQuality): Video quality enum
+            fps (int): Frames per second
+            duration (int): Animation duration in seconds
+            output_path (str): Path of the video to produce
+            extra (Dict[str, Any], optional): Additional settings for the Blender script
+            visual (str): Visual profile name
+            cores (List[int], optional): Cores reserved for Blender
+            usage (ResourceUsage, optional): Accumulates resource use of Blender and the encoder
+            
+        Returns:
+            bool: True if both Blender and the encoder succeeded
+        """
+        profile, _ = resolve_render_profile(quality.value, visual)
+        
+        with tempfile.TemporaryDirectory(prefix="earth_tour_") as work_dir:
+            frame_pipe = os.path.join(work_dir, "frames.pipe")
+            os.mkfifo(frame_pipe)
+            
+            pipe_settings = dict(extra or {})
+            pipe_settings.update({
+                "frame_pipe": frame_pipe,
+                "frame_format": self.frame_format
+            })
+            config_path = self._prepare_config(locations, quality, fps, duration, extra=pipe_settings,
+                                               visual=visual)
+            
+            # The encoder opens the pipe first and waits for Blender's frames
+            encode_span = tracer.start_span("encode", mode="pipe")
+            encoder_process = self.encoder.start(
+                self.encoder.image_pipe_input_args(frame_pipe, fps, self.frame_format),
+                output_path,
+                profile,
+                gop_size=pipe_settings.get("gop_size")
+            )
+            
+            blender_ok = self._run_blender(config_path, output_path, cores, usage)
+            if not blender_ok:
+                # Blender may have died before opening the pipe; don't leave ffmpeg waiting
+                self.encoder.release_pipe(frame_pipe)
+            
+            encoder_ok = self.encoder.finish(encoder_process, usage=usage)
+            tracer.end_span(encode_span, None if encoder_ok else RuntimeError("encoder failed"))
+            if usage is not None:
+                # The last staged frame is still in the work directory
+                usage.temp_bytes += directory_size(work_dir)
+            if blender_ok and encoder_ok:
+                logger.info(f"Piped encode completed: {output_path}")
+            return blender_ok and encoder_ok
+
+def _spans_path(config_path: str) -> str:
+    """File the Blender script leaves its trace spans in."""
+    return f"{config_path}.spans.jsonl"
 
-# Singleton instance
-blender_renderer = BlenderRenderer()
+# Singleton instance, built on first use
+blender_renderer = LazyService("blender_renderer", lambda: BlenderRenderer(
+    blender_path=os.getenv("BLENDER_PATH", "/Applications/Blender.app/Contents/MacOS/Blender")
+))
@@ -0,0 +1,312 @@
+import os
+import sys
+import time
+import threading
+import subprocess
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Render threads per Blender process by quality. Small frames stop scaling after a
+# few threads, so low qualities run as many narrow processes and high qualities as
+# a few wide ones.
+THREADS_PER_QUALITY: Dict[str, int] = {
+    "360p": 2,
+    "720p": 4,
+    "1080p": 4,
+    "1440p": 8,
+    "4k": 16,
+}
+
+
+def parse_cpu_list(spec: str) -> List[int]:
+    """
+    Parse a Linux-style CPU list such as "0-7,16-23".
+
+    Args:
+        spec (str): CPU list
+
+    Returns:
+        List[int]: CPU ids
+    """
+    cores = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            cores.extend(range(int(first), int(last) + 1))
+        else:
+            cores.append(int(part))
+    return cores
+
+
+class CoreAllocator:
+    def __init__(self, cores: Optional[List[int]] = None, threads_override: Optional[int] = None):
+        """
+        Initialize the allocator of CPU cores to render processes.
+
+        Each render process reserves a disjoint set of cores and is pinned to them,
+        so concurrent renders never compete for the same cores. A process that
+        needs more cores than are free waits for running renders to release theirs.
+
+        Args:
+            cores (List[int]): Cores available for rendering. Defaults to the cores
+                this process may run on.
+            threads_override (int): Threads per process for every quality, instead
+                of THREADS_PER_QUALITY
+        """
+        if cores is None:
+            if hasattr(os, "sched_getaffinity"):
+                cores = sorted(os.sched_getaffinity(0))
+            else:
+                cores = list(range(os.cpu_count() or 1))
+        self.cores = cores
+        self.threads_override = threads_override
+        self._free = list(cores)
+        self._condition = threading.Condition()
+
+        logger.info(f"Core allocator initialized with {len(self.cores)} cores")
+
+    @classmethod
+    def from_env(cls) -> "CoreAllocator":
+        """
+        Build an allocator configured from environment variables.
+
+        Returns:
+            CoreAllocator: Configured allocator
+        """
+        cores = os.getenv("RENDER_CORES")
+        threads = os.getenv("BLENDER_THREADS")
+        return cls(
+            cores=parse_cpu_list(cores) if cores else None,
+            threads_override=int(threads) if threads else None,
+        )
+
+    def threads_for(self, quality: str) -> int:
+        """
+        Threads to give one render process of a quality.
+
+        Args:
+            quality (str): Quality profile name
+
+        Returns:
+            int: Thread count, never more than the cores available
+        """
+        threads = self.threads_override or THREADS_PER_QUALITY.get(quality.lower(), 4)
+        return max(1, min(threads, len(self.cores)))
+
+    def default_concurrency(self) -> int:
+        """Concurrent renders that fill the cores at the default 1080p split."""
+        return max(1, len(self.cores) // self.threads_for("1080p"))
+
+    @contextmanager
+    def reserve(self, count: int) -> Iterator[List[int]]:
+        """
+        Reserve cores for the duration of a render, waiting until enough are free.
+
+        Args:
+            count (int): Number of cores
+
+        Yields:
+            List[int]: The reserved cores
+        """
+        count = max(1, min(count, len(self.cores)))
+        with self._condition:
+            while len(self._free) < count:
+                self._condition.wait()
+            reserved, self._free = self._free[:count], self._free[count:]
+        try:
+            yield reserved
+        finally:
+            with self._condition:
+                self._free.extend(reserved)
+                self._free.sort()
+                self._condition.notify_all()
+
+
+class ProcessLimits:
+    def __init__(self, memory_bytes: Optional[int] = None, cpu_seconds: Optional[int] = None):
+        """
+        Resource limits applied to each render process.
+
+        Args:
+            memory_bytes (int): Address space limit (RLIMIT_AS)
+            cpu_seconds (int): CPU time limit (RLIMIT_CPU); a runaway render is killed
+                with SIGXCPU once it has used this much CPU across all its threads
+        """
+        self.memory_bytes = memory_bytes
+        self.cpu_seconds = cpu_seconds
+
+    @classmethod
+    def from_env(cls) -> "ProcessLimits":
+        """
+        Build limits configured from environment variables.
+
+        Returns:
+            ProcessLimits: Configured limits
+        """
+        memory_mb = os.getenv("BLENDER_MEMORY_LIMIT_MB")
+        cpu_seconds = os.getenv("BLENDER_CPU_LIMIT_SECONDS")
+        return cls(
+            memory_bytes=int(memory_mb) * 1024 * 1024 if memory_mb else None,
+            cpu_seconds=int(cpu_seconds) if cpu_seconds else None,
+        )
+
+    def preexec_fn(self, cores: Optional[List[int]] = None) -> Optional[Callable[[], None]]:
+        """
+        Build a function that pins and limits a child process before it execs.
+
+        Args:
+            cores (List[int]): Cores to pin the process to
+
+        Returns:
+            Optional[Callable[[], None]]: Function for subprocess.Popen's preexec_fn,
+                or None if there is nothing to apply
+        """
+        pin = cores if cores and hasattr(os, "sched_setaffinity") else None
+        memory_bytes = self.memory_bytes if resource else None
+        cpu_seconds = self.cpu_seconds if resource else None
+        if not (pin or memory_bytes or cpu_seconds):
+            return None
+
+        def apply():
+            # Runs in the forked child: only async-signal-safe work, no logging
+            if pin:
+                os.sched_setaffinity(0, pin)
+            if memory_bytes:
+                resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+            if cpu_seconds:
+                resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+        return apply
+
+
+def maxrss_bytes(ru_maxrss: int) -> int:
+    """ru_maxrss in bytes; Linux reports kilobytes, macOS bytes."""
+    return ru_maxrss if sys.platform == "darwin" else ru_maxrss * 1024
+
+
+def directory_size(path: str) -> int:
+    """Total size of the files under a directory."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+@dataclass
+class ResourceUsage:
+    cpu_seconds: float = 0.0        # User + system CPU time of all processes
+    peak_rss_bytes: int = 0         # Largest resident set of any single process
+    output_bytes: int = 0           # Size of the delivered video
+    temp_bytes: int = 0             # Intermediate files: configs, piped frames, rendered legs
+    processes: int = 0              # Processes measured
+
+    def add_process(self, cpu_seconds: float, peak_rss_bytes: int) -> None:
+        """Account for one finished process."""
+        self.cpu_seconds += cpu_seconds
+        self.peak_rss_bytes = max(self.peak_rss_bytes, peak_rss_bytes)
+        self.processes += 1
+
+    def add_rusage(self, rusage) -> None:
+        """Account for a process from the resource usage returned by os.wait4()."""
+        self.add_process(rusage.ru_utime + rusage.ru_stime, maxrss_bytes(rusage.ru_maxrss))
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["cpu_seconds"] = round(self.cpu_seconds, 3)
+        return data
+
+
+def _tail(output, tail_lines: int):
+    """Last tail_lines lines of captured output."""
+    if not output:
+        return output
+    return output[:0].join(output.splitlines(keepends=True)[-tail_lines:])
+
+
+def _drain(stream, tail_lines: Optional[int]):
+    """Read a pipe to EOF, keeping everything or only the last tail_lines lines."""
+    if tail_lines is None:
+        return stream.read()
+    lines = deque(stream, maxlen=tail_lines)
+    if not lines:
+        return stream.read()  # Empty bytes or str, matching the pipe's mode
+    return lines[0][:0].join(lines)
+
+
+def wait_with_usage(process: subprocess.Popen, timeout: Optional[float] = None,
+                    tail_lines: Optional[int] = None) -> Tuple[Any, Any, Optional[Any]]:
+    """
+    Drain a process's output pipes and reap it with os.wait4() to get its rusage.
+
+    Popen.communicate() reaps the child with waitpid, which discards its resource
+    usage, so the pipes are read on helper threads and the child is reaped here.
+
+    Args:
+        process (subprocess.Popen): Process started with stdout/stderr pipes (or not)
+        timeout (float, optional): Seconds to wait before raising TimeoutExpired
+        tail_lines (int, optional): Keep only the last lines of each pipe, so chatty
+            processes (Blender prints several lines per frame) use bounded memory
+
+    Returns:
+        Tuple[Any, Any, Optional[Any]]: stdout, stderr and the rusage (None where
+            os.wait4 is unavailable)
+
+    Raises:
+        subprocess.TimeoutExpired: If the process is still running after timeout
+    """
+    if not hasattr(os, "wait4"):
+        stdout, stderr = process.communicate(timeout=timeout)
+        if tail_lines is not None:
+            stdout, stderr = (_tail(output, tail_lines) for output in (stdout, stderr))
+        return stdout, stderr, None
+
+    outputs = {}
+    readers = []
+    for name in ("stdout", "stderr"):
+        stream = getattr(process, name)
+        if stream is not None:
+            reader = threading.Thread(target=lambda n=name, st=stream: outputs.__setitem__(n, _drain(st, tail_lines)),
+                                      daemon=True)
+            reader.start()
+            readers.append(reader)
+    if process.stdin is not None:
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        pid, status, rusage = os.wait4(process.pid, 0 if deadline is None else os.WNOHANG)
+        if pid == process.pid:
+            break
+        if time.monotonic() >= deadline:
+            raise subprocess.TimeoutExpired(process.args, timeout)
+        time.sleep(0.1)
+
+    process.returncode = os.waitstatus_to_exitcode(status)
+    for reader in readers:
+        reader.join()
+    return outputs.get("stdout"), outputs.get("stderr"), rusage
+
+
+# Singleton instances
+core_allocator = CoreAllocator.from_env()
+process_limits = ProcessLimits.from_env()
@@ -0,0 +1,179 @@
+import os
+import time
+import heapq
+import itertools
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.quality_profiles import get_profile
+from app.services.accounting import usage_ledger
+from app.services.resources import core_allocator
+from app.services.tracing import Span, tracer
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """
+    Parse tenant weights from "client=weight,client=weight".
+
+    Args:
+        spec (str): Weight specification, e.g. "key:3f2a9c1b0d4e=4,ip:10.0.0.7=0.5"
+
+    Returns:
+        Dict[str, float]: Weight per client ID
+    """
+    weights = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        client_id, weight = item.rsplit("=", 1)
+        weights[client_id.strip()] = float(weight)
+    return weights
+
+
+def quality_cost(quality: str) -> float:
+    """
+    Relative cost of rendering at a quality, with 720p costing 1.
+
+    Uses the measured CPU time per job once enough jobs have been accounted,
+    and the pixel count ratio until then.
+    """
+    measured = usage_ledger.relative_cost(quality)
+    if measured is not None:
+        return measured
+    return (get_profile(quality).short_side / 720) ** 2
+
+
+@dataclass(order=True)
+class _Task:
+    start_tag: float
+    seq: int
+    tenant: str = field(compare=False)
+    cost: float = field(compare=False)
+    func: Callable = field(compare=False)
+    args: Tuple[Any, ...] = field(compare=False)
+    kwargs: Dict[str, Any] = field(compare=False)
+    trace_parent: Optional[Span] = field(compare=False, default=None)  # Span current at submit
+    submitted_ns: int = field(compare=False, default_factory=time.time_ns)
+
+
+class RenderScheduler:
+    def __init__(self, workers: int = 2, weights: Dict[str, float] = None, default_weight: float = 1.0):
+        """
+        Initialize the render scheduler.
+
+        Render jobs from all clients share a fixed number of workers. Jobs are
+        dispatched by start-time fair queuing: each tenant's jobs get virtual start
+        tags spaced by cost / weight, and the smallest tag runs next. A tenant
+        submitting many expensive jobs only pushes its own tags into the future, so
+        under contention each tenant receives capacity in proportion to its weight
+        and a light user's job waits behind at most one job per other tenant.
+
+        Args:
+            workers (int): Render jobs run concurrently
+            weights (Dict[str, float]): Share weight per client ID
+            default_weight (float): Weight of clients not listed in weights
+        """
+        self.workers = workers
+        self.weights = weights or {}
+        self.default_weight = default_weight
+
+        self._queue: List[_Task] = []
+        self._virtual_time = 0.0
+        self._last_finish: Dict[str, float] = {}
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._running = 0
+
+        logger.info(f"Render scheduler initialized with {self.workers} workers, {len(self.weights)} weighted tenants")
+
+    @classmethod
+    def from_env(cls) -> "RenderScheduler":
+        """
+        Build a scheduler configured from environment variables.
+
+        Returns:
+            RenderScheduler: Configured scheduler
+        """
+        return cls(
+            workers=int(os.getenv("RENDER_WORKERS", "0")) or core_allocator.default_concurrency(),
+            weights=parse_weights(os.getenv("TENANT_WEIGHTS", "")),
+        )
+
+    def submit(self, tenant: str, cost: float, func: Callable, *args, **kwargs) -> None:
+        """
+        Queue a render job.
+
+        Args:
+            tenant (str): Client ID the job is charged to
+            cost (float): Relative cost of the job, see quality_cost()
+            func (Callable): Job function, called on a worker thread
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+        """
+        weight = self.weights.get(tenant, self.default_weight)
+        with self._condition:
+            self._ensure_workers()
+            start_tag = max(self._virtual_time, self._last_finish.get(tenant, 0.0))
+            self._last_finish[tenant] = start_tag + cost / weight
+            heapq.heappush(self._queue, _Task(start_tag, next(self._seq), tenant, cost, func, args, kwargs,
+                                              trace_parent=tracer.current()))
+            self._condition.notify()
+            depth = len(self._queue)
+        logger.info("Queued render for {} (cost {:.2f}, start tag {:.2f}, queue depth {})",
+                    tenant, cost, start_tag, depth)
+
+    def queue_depth(self) -> int:
+        with self._condition:
+            return len(self._queue)
+
+    def is_idle(self) -> bool:
+        """Whether no job is queued or running."""
+        with self._condition:
+            return not self._queue and self._running == 0
+
+    def _ensure_workers(self) -> None:
+        """Start the worker threads on first use."""
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"render-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+                task = heapq.heappop(self._queue)
+                # Virtual time follows the job in service
+                self._virtual_time = max(self._virtual_time, task.start_tag)
+                if not self._queue:
+                    # Finish tags behind virtual time no longer affect scheduling
+                    self._last_finish = {t: f for t, f in self._last_finish.items() if f > self._virtual_time}
+                self._running += 1
+
+            # The job's span covers its wait in the queue, recorded as a child span
+            job_span = tracer.start_span("render.job", parent=task.trace_parent, start_ns=task.submitted_ns,
+                                         tenant=task.tenant, cost=round(task.cost, 2))
+            tracer.end_span(tracer.start_span("render.queue_wait", parent=job_span, start_ns=task.submitted_ns))
+            error = None
+            try:
+                with tracer.attach(job_span):
+                    task.func(*task.args, **task.kwargs)
+            except Exception as e:
+                error = e
+                logger.error(f"Render job for {task.tenant} raised: {str(e)}")
+            finally:
+                tracer.end_span(job_span, error)
+                with self._condition:
+                    self._running -= 1
+
+
+# Singleton instance
+render_scheduler = RenderScheduler.from_env()
@@ -0,0 +1,185 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class SegmentCache:
+    def __init__(self, cache_dir: str = None, max_bytes: int = 10 * 1024 ** 3):
+        """
+        Initialize the per-leg segment cache.
+
+        Args:
+            cache_dir (str): Directory holding cached segments
+            max_bytes (int): Size budget; least recently used segments are evicted above it
+        """
+        if cache_dir is None:
+            base_dir = Path(__file__).parent.parent.parent
+            self.cache_dir = str(base_dir / "cache" / "segments")
+        else:
+            self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # owner -> keys of the segments it keeps out of eviction
+        self._pins: Dict[str, Set[str]] = {}
+        self._tracking = threading.local()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        logger.info(f"Segment cache initialized at {self.cache_dir} (max {self.max_bytes} bytes)")
+
+    @staticmethod
+    def segment_key(start: Tuple[float, float], end: Tuple[float, float],
+                    quality: str, fps: int, frames: int, **params) -> str:
+        """
+        Build the cache key for a single leg.
+
+        Coordinates are rounded to ~1 m so the same city geocoded twice maps to the
+        same key.
+
+        Args:
+            start (Tuple[float, float]): (lat, lon) of the leg's start
+            end (Tuple[float, float]): (lat, lon) of the leg's end
+            quality (str): Quality profile name
+            fps (int): Frames per second
+            frames (int): Number of frames in the leg
+            **params: Any other settings that change the rendered pixels
+
+        Returns:
+            str: Hex digest identifying the segment
+        """
+        payload = {
+            "start": [round(start[0], 5), round(start[1], 5)],
+            "end": [round(end[0], 5), round(end[1], 5)],
+            "quality": quality.lower(),
+            "fps": fps,
+            "frames": frames,
+            **params,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        """Path where the segment for a key is (or would be) stored."""
+        return os.path.join(self.cache_dir, f"{key}.mp4")
+
+    def get(self, key: str, owner: Optional[str] = None) -> Optional[str]:
+        """
+        Look up a cached segment.
+
+        Args:
+            key (str): Segment key
+            owner (str, optional): Pins the segment for this owner (see pin()) before
+                looking it up, so it cannot be evicted before the owner is done with it
+
+        Returns:
+            Optional[str]: Path to the segment, or None on a miss
+        """
+        path = self.path_for(key)
+        if owner is not None:
+            self._pin_key(owner, key)
+        if not os.path.exists(path):
+            return None
+        self._track(key)
+        # Refresh the modification time so eviction is least-recently-used
+        os.utime(path)
+        return path
+
+    def put(self, key: str, source_path: str, owner: Optional[str] = None) -> str:
+        """
+        Move a freshly rendered segment into the cache.
+
+        Args:
+            key (str): Segment key
+            source_path (str): Path to the rendered segment
+            owner (str, optional): Pins the segment for this owner (see pin()), so the
+                eviction that follows cannot delete it
+
+        Returns:
+            str: Path to the cached segment
+        """
+        path = self.path_for(key)
+        if owner is not None:
+            self._pin_key(owner, key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.move(source_path, tmp_path)
+        # Atomic on the same filesystem, so readers never see a partial segment
+        os.replace(tmp_path, path)
+        self._track(key)
+        self.evict()
+        return path
+
+    @contextmanager
+    def track(self) -> Iterator[Set[str]]:
+        """
+        Collect the keys of the segments this thread uses inside the block.
+
+        Yields:
+            Set[str]: Filled with the keys of every segment looked up or stored
+        """
+        keys: Set[str] = set()
+        self._tracking.keys = keys
+        try:
+            yield keys
+        finally:
+            self._tracking.keys = None
+
+    def _track(self, key: str) -> None:
+        keys = getattr(self._tracking, "keys", None)
+        if keys is not None:
+            keys.add(key)
+
+    def pin(self, owner: str, keys: Iterable[str]) -> None:
+        """
+        Keep segments out of eviction on behalf of an owner, e.g. a pre-rendered tour.
+
+        Args:
+            owner (str): Identifies the pin, replacing the owner's previous keys
+            keys (Iterable[str]): Segment keys
+        """
+        with self._lock:
+            self._pins[owner] = set(keys)
+
+    def _pin_key(self, owner: str, key: str) -> None:
+        with self._lock:
+            self._pins.setdefault(owner, set()).add(key)
+
+    def unpin(self, owner: str) -> None:
+        """Release the segments an owner pinned."""
+        with self._lock:
+            self._pins.pop(owner, None)
+
+    def evict(self) -> None:
+        """
+        Delete least recently used, unpinned segments until the cache fits its size budget.
+
+        Only finished segments (<key>.mp4) are considered; legs being rendered live
+        in their own .partial directories.
+        """
+        with self._lock:
+            pinned = set().union(*self._pins.values()) if self._pins else set()
+            entries = []
+            total = 0
+            for entry in os.scandir(self.cache_dir):
+                if entry.is_file() and entry.name.endswith(".mp4"):
+                    stat_result = entry.stat()
+                    total += stat_result.st_size
+                    # Pinned segments count against the budget but are never evicted
+                    if entry.name[:-len(".mp4")] not in pinned:
+                        entries.append((stat_result.st_mtime, stat_result.st_size, entry.path))
+
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    logger.info(f"Evicted cached segment {os.path.basename(path)}")
+                except OSError as e:
+                    logger.warning(f"Failed to evict segment {path}: {str(e)}")
@@ -0,0 +1,534 @@
+import os
+import math
+import time
+import uuid
+import subprocess
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import List, Tuple, Dict, Any, Optional
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from app.utils.lazy import LazyService
+from app.utils.logger import get_logger, log_sampler
+from app.models import VideoQuality
+from app.quality_profiles import resolve_render_profile
+from app.services.encoder import FFmpegEncoder
+from app.services.planner import FramePlan, frame_planner
+from app.services.resources import CoreAllocator, ResourceUsage, core_allocator, maxrss_bytes, resource
+
+logger = get_logger(__name__)
+
+# Scene constants mirror blender_scripts/render_flight.py so both backends frame tours alike
+FLIGHT_ALTITUDE = 1.02
+SENSOR_WIDTH = 36.0
+CAMERAS = {
+    # mode: (lens in mm, camera distance)
+    "follow": (24.0, 0.8),     # Offset above the aircraft
+    "orbit": (35.0, 3.0),      # Distance from the globe's centre
+}
+BACKGROUND_COLOR = np.array([5, 5, 13], dtype=np.float32)
+ATMOSPHERE_COLOR = np.array([26, 51, 204], dtype=np.float32)
+ATMOSPHERE_THICKNESS = 0.06
+TRAIL_COLOR = (255, 255, 0)
+AIRCRAFT_COLOR = (204, 0, 0)
+LABEL_COLOR = (255, 255, 255)
+
+# Per-worker-process render state, filled by _init_worker so frames only carry their index
+_state: Dict[str, Any] = {}
+
+
+def latlon_to_xyz(lat: float, lon: float) -> np.ndarray:
+    """Unit vector for a (lat, lon) position, in the same frame as the Blender scene."""
+    lat_rad, lon_rad = math.radians(lat), math.radians(lon)
+    return np.array([math.cos(lat_rad) * math.cos(lon_rad),
+                     math.cos(lat_rad) * math.sin(lon_rad),
+                     math.sin(lat_rad)])
+
+
+def great_circle_points(start: np.ndarray, end: np.ndarray, count: int) -> np.ndarray:
+    """
+    Points along the great circle between two unit vectors.
+
+    Args:
+        start (np.ndarray): Start position on the unit sphere
+        end (np.ndarray): End position on the unit sphere
+        count (int): Number of points, including both ends
+
+    Returns:
+        np.ndarray: (count, 3) array of unit vectors
+    """
+    d_sigma = math.acos(float(np.clip(np.dot(start, end), -1.0, 1.0)))
+    if d_sigma < 1e-10 or count < 2:
+        return np.repeat(start[None, :], max(count, 1), axis=0)
+
+    t = np.linspace(0.0, 1.0, count)[:, None]
+    points = (np.sin((1 - t) * d_sigma) * start + np.sin(t * d_sigma) * end) / math.sin(d_sigma)
+    return points / np.linalg.norm(points, axis=1, keepdims=True)
+
+
+def flight_positions(waypoints: List[np.ndarray], legs: List[Tuple[int, int, int]]) -> np.ndarray:
+    """
+    Aircraft position for every frame.
+
+    Args:
+        waypoints (List[np.ndarray]): Tour stops as unit vectors
+        legs (List[Tuple[int, int, int]]): (first_frame, frame_count, dwell_frames) of each
+            leg, zero-based; the aircraft waits at the start for the dwell frames
+
+    Returns:
+        np.ndarray: (frames, 3) positions
+    """
+    frames = legs[-1][0] + legs[-1][1]
+    positions = np.empty((frames, 3))
+    for i, (first_frame, count, dwell) in enumerate(legs):
+        positions[first_frame:first_frame + dwell] = waypoints[i]
+        positions[first_frame + dwell:first_frame + count] = great_circle_points(waypoints[i], waypoints[i + 1],
+                                                                                 count - dwell)
+    return positions
+
+
+def _camera_basis(camera: np.ndarray, target: np.ndarray, radial: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Forward, right and up vectors of a camera looking at target with north up."""
+    forward = target - camera
+    forward /= np.linalg.norm(forward)
+
+    # Same up hint as the Blender script: the first world axis with a usable
+    # projection onto the view plane
+    up_hint = None
+    for axis in np.eye(3)[[1, 0, 2]]:
+        projected = axis - np.dot(axis, radial) * radial
+        if np.linalg.norm(projected) >= 0.001:
+            up_hint = projected / np.linalg.norm(projected)
+            break
+
+    right = np.cross(forward, up_hint)
+    right /= np.linalg.norm(right)
+    up = np.cross(right, forward)
+    return forward, right, up
+
+
+def _init_worker(settings: Dict[str, Any]) -> None:
+    """
+    Load the texture and precompute per-pixel view rays once per worker process.
+
+    Args:
+        settings (Dict[str, Any]): Frame-independent render settings
+    """
+    width, height = settings["width"], settings["height"]
+    lens, _ = CAMERAS[settings["camera"]]
+
+    # Blender fits the sensor to the longer side of the frame
+    half_extent = (SENSOR_WIDTH / 2) / lens
+    scale = half_extent / max(width, height)
+    xs = (np.arange(width) + 0.5 - width / 2) * 2 * scale
+    ys = (height / 2 - np.arange(height) - 0.5) * 2 * scale
+
+    if settings.get("cores") and hasattr(os, "sched_setaffinity"):
+        # Stay on the cores reserved for this render
+        os.sched_setaffinity(0, settings["cores"])
+
+    texture = np.asarray(Image.open(settings["texture_path"]).convert("RGB"))
+    label_size = max(12, height // 40)
+
+    _state.clear()
+    _state.update(settings)
+    _state.update({
+        "texture": texture,
+        "ray_x": xs[None, :],
+        "ray_y": ys[:, None],
+        "focal_scale": scale,
+        "font": ImageFont.load_default(size=label_size),
+    })
+
+
+def _project(points: np.ndarray, camera: np.ndarray, basis: Tuple[np.ndarray, ...]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Project world points to pixel coordinates.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (N, 2) pixel coordinates and a mask of points
+            in front of the camera on the globe's camera-facing side
+    """
+    forward, right, up = basis
+    relative = points - camera
+    depth = relative @ forward
+    in_front = depth > 1e-6
+    safe_depth = np.where(in_front, depth, 1.0)
+    scale = _state["focal_scale"] * 2
+
+    px = (relative @ right) / safe_depth / scale + _state["width"] / 2
+    py = _state["height"] / 2 - (relative @ up) / safe_depth / scale
+    # A point on (or just above) the sphere is visible if its normal faces the camera
+    facing = np.einsum("ij,ij->i", points, relative) < 0
+    return np.stack([px, py], axis=1), in_front & facing
+
+
+def _shade_globe(camera: np.ndarray, basis: Tuple[np.ndarray, ...]) -> np.ndarray:
+    """Ray-cast the textured globe for the whole frame; returns an (H, W, 3) uint8 image."""
+    forward, right, up = basis
+    height, width = _state["height"], _state["width"]
+    texture = _state["texture"]
+
+    # View rays: forward + x * right + y * up, normalized
+    dirs = (forward[None, None, :]
+            + _state["ray_x"][..., None] * right[None, None, :]
+            + _state["ray_y"][..., None] * up[None, None, :])
+    dirs /= np.linalg.norm(dirs, axis=2, keepdims=True)
+
+    # Ray/unit-sphere intersection: |camera + t * dir| = 1
+    b = dirs @ camera
+    c = float(camera @ camera) - 1.0
+    disc = b * b - c
+    hit = (disc > 0) & (b < 0)
+
+    frame = np.empty((height, width, 3), dtype=np.float32)
+    frame[:] = BACKGROUND_COLOR
+
+    if _state["atmosphere"]:
+        # Limb glow from how closely each missing ray passes the globe
+        closest = np.sqrt(np.maximum(c + 1.0 - b * b, 0.0))
+        alpha = np.clip((1.0 + ATMOSPHERE_THICKNESS - closest) / ATMOSPHERE_THICKNESS, 0.0, 1.0)
+        alpha = np.where(hit | (b >= 0), 0.0, alpha)[..., None] * 0.8
+        frame += alpha * (ATMOSPHERE_COLOR - BACKGROUND_COLOR)
+
+    hit_dirs = dirs[hit]
+    t = -b[hit] - np.sqrt(disc[hit])
+    normals = camera + t[:, None] * hit_dirs
+
+    lat = np.arcsin(np.clip(normals[:, 2], -1.0, 1.0))
+    lon = np.arctan2(normals[:, 1], normals[:, 0])
+    tex_h, tex_w = texture.shape[:2]
+    u = ((lon + np.pi) / (2 * np.pi) * tex_w).astype(np.int32) % tex_w
+    v = np.clip(((np.pi / 2 - lat) / np.pi * tex_h).astype(np.int32), 0, tex_h - 1)
+
+    # Headlight shading: ambient plus diffuse from the view direction darkens the limb
+    diffuse = np.clip(-np.einsum("ij,ij->i", normals, hit_dirs), 0.0, 1.0)
+    frame[hit] = texture[v, u] * (0.35 + 0.75 * diffuse)[:, None]
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def _draw_polyline(draw: ImageDraw.ImageDraw, pixels: np.ndarray, visible: np.ndarray,
+                   color: Tuple[int, ...], width: int) -> None:
+    """Draw the visible runs of a projected polyline."""
+    run = []
+    for point, is_visible in zip(pixels.tolist(), visible.tolist()):
+        if is_visible:
+            run.append(tuple(point))
+            continue
+        if len(run) > 1:
+            draw.line(run, fill=color, width=width, joint="curve")
+        run = []
+    if len(run) > 1:
+        draw.line(run, fill=color, width=width, joint="curve")
+
+
+def _render_frame(index: int) -> bytes:
+    """
+    Render one frame of the tour.
+
+    Args:
+        index (int): Zero-based frame number
+
+    Returns:
+        bytes: Raw RGB24 pixels
+    """
+    positions = _state["positions"]
+    plane = positions[index] * FLIGHT_ALTITUDE
+    radial = positions[index]
+    _, distance = CAMERAS[_state["camera"]]
+    camera = radial * distance if _state["camera"] == "orbit" else plane + radial * distance
+    basis = _camera_basis(camera, plane, radial)
+
+    image = Image.fromarray(_shade_globe(camera, basis))
+    draw = ImageDraw.Draw(image, "RGBA")
+    line_width = max(2, _state["width"] // 240)
+
+    # Trail up to and including the current position
+    trail = positions[:index + 1] * FLIGHT_ALTITUDE
+    if len(trail) > 1:
+        pixels, visible = _project(trail, camera, basis)
+        if _state["glow"]:
+            _draw_polyline(draw, pixels, visible, TRAIL_COLOR + (90,), line_width * 3)
+        _draw_polyline(draw, pixels, visible, TRAIL_COLOR, line_width)
+
+    # Aircraft marker: a triangle pointing along the heading
+    heading = _state["headings"][index]
+    side = np.cross(radial, heading)
+    marker_size = 0.03 if _state["camera"] == "follow" else 0.06
+    corners = np.array([
+        plane + heading * marker_size,
+        plane - heading * marker_size * 0.6 + side * marker_size * 0.6,
+        plane - heading * marker_size * 0.6 - side * marker_size * 0.6,
+    ])
+    pixels, visible = _project(corners, camera, basis)
+    if visible.any():
+        if _state["glow"]:
+            center = pixels.mean(axis=0)
+            radius = np.abs(pixels - center).max() * 1.8
+            draw.ellipse([tuple(center - radius), tuple(center + radius)], fill=AIRCRAFT_COLOR + (70,))
+        draw.polygon([tuple(p) for p in pixels.tolist()], fill=AIRCRAFT_COLOR)
+
+    if _state["labels"]:
+        for position, name, first_frame, last_frame in _state["label_spans"]:
+            if not first_frame <= index <= last_frame:
+                continue
+            pixels, visible = _project(position[None, :] * FLIGHT_ALTITUDE, camera, basis)
+            if visible[0]:
+                x, y = pixels[0]
+                draw.text((x, y - line_width * 6), name, fill=LABEL_COLOR, font=_state["font"],
+                          anchor="md", stroke_width=2, stroke_fill=(0, 0, 0))
+
+    return image.tobytes()
+
+
+def _render_frame_measured(index: int) -> Tuple[bytes, int, float, int]:
+    """Render a frame and report the worker's pid, CPU time for it and peak memory so far."""
+    cpu_start = time.process_time()
+    frame = _render_frame(index)
+    peak_rss = maxrss_bytes(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) if resource else 0
+    return frame, os.getpid(), time.process_time() - cpu_start, peak_rss
+
+
+class SoftwareRenderer:
+    def __init__(self, texture_path: str = None,
+                 output_dir: str = None,
+                 encoder: FFmpegEncoder = None,
+                 workers: int = None,
+                 cores: CoreAllocator = None):
+        """
+        Initialize the software renderer, a Blender-free backend that ray-casts the
+        globe with NumPy and draws the trail, aircraft and labels with Pillow.
+
+        Args:
+            texture_path (str): Equirectangular Earth texture
+            output_dir (str): Directory to save rendered videos
+            encoder (FFmpegEncoder): Encoder receiving the raw frames
+            workers (int): Frame rendering processes. Defaults to the SOFTWARE_RENDER_WORKERS
+                environment variable, then the cores a Blender render of the same quality gets.
+            cores (CoreAllocator): Hands each render a disjoint set of cores; shared with
+                the Blender renderer, so concurrent renders of either kind never share cores
+        """
+        base_dir = Path(__file__).parent.parent.parent
+        self.texture_path = texture_path or str(base_dir / "assets" / "8081_earthmap2k.jpg")
+        self.output_dir = output_dir or str(base_dir / "output")
+        self.encoder = encoder or FFmpegEncoder.from_env()
+        self.workers = workers or int(os.getenv("SOFTWARE_RENDER_WORKERS", "0")) or None
+        self.cores = cores or core_allocator
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        logger.info(f"Software renderer initialized with texture: {self.texture_path} "
+                    f"({self.workers or 'per-quality'} workers)")
+
+    def _generate_output_filename(self, quality: VideoQuality) -> str:
+        """
+        Generate a unique output filename based on timestamp and quality.
+
+        Args:
+            quality (VideoQuality): Video quality setting
+
+        Returns:
+            str: Path to the output video file
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Jobs finishing in the same second must not overwrite each other's video
+        return os.path.join(self.output_dir, f"earth_tour_{timestamp}_{uuid.uuid4().hex[:8]}_{quality.value}_sw.mp4")
+
+    def render_animation(self, locations: List[Tuple[float, float]],
+                         quality: VideoQuality,
+                         fps: int = 30,
+                         duration: int = None,
+                         visual: str = "mobile",
+                         plan: Optional[FramePlan] = None,
+                         usage: Optional[ResourceUsage] = None) -> Optional[str]:
+        """
+        Render a flight path animation without Blender.
+
+        Args:
+            locations (List[Tuple[float, float]]): List of (lat, lon) tuples
+            quality (VideoQuality): Video quality enum
+            fps (int): Frames per second
+            duration (int, optional): Animation duration in seconds. If None, the frame planner sizes each leg by distance.
+            visual (str): Visual profile name
+            plan (FramePlan, optional): Frames per leg; planned from the locations if not given
+            usage (ResourceUsage, optional): Accumulates CPU time, memory and disk use of the render
+
+        Returns:
+            Optional[str]: Path to the rendered video file or None if rendering failed
+        """
+        if not locations or len(locations) < 2:
+            logger.error("At least 2 locations are required for animation")
+            return None
+
+        if plan is None:
+            plan = frame_planner.plan(locations, fps, duration)
+
+        try:
+            output_path = self._generate_output_filename(quality)
+            usage = usage if usage is not None else ResourceUsage()
+            # One worker process per reserved core; waits until enough cores are free
+            with self.cores.reserve(self.workers or self.cores.threads_for(quality.value)) as cores:
+                rendered = self._render_video(locations, quality, plan, output_path, visual, usage, cores)
+            if rendered and os.path.exists(output_path):
+                usage.output_bytes = os.path.getsize(output_path)
+                return output_path
+            return None
+        except Exception as e:
+            logger.error(f"Error during software rendering: {str(e)}")
+            return None
+
+    def _frame_settings(self, locations: List[Tuple[float, float]], plan: FramePlan,
+                        width: int, height: int, visual_profile) -> Dict[str, Any]:
+        """Everything a worker needs to render any frame of the tour."""
+        waypoints = [latlon_to_xyz(lat, lon) for lat, lon in locations]
+        legs = [(leg.first_frame - 1, leg.frames, leg.dwell_frames) for leg in plan.legs]
+        positions = flight_positions(waypoints, legs)
+        frames = len(positions)
+
+        # Heading per frame; stationary frames keep the previous heading, and
+        # frames before the first movement (a dwell at the start) face the departure
+        headings = np.zeros_like(positions)
+        deltas = np.diff(positions, axis=0)
+        last = None
+        moving = np.flatnonzero(np.linalg.norm(deltas, axis=1) > 1e-9)
+        if len(moving):
+            first_move = moving[0]
+            delta, radial = deltas[first_move], positions[first_move]
+            tangent = delta - np.dot(delta, radial) * radial
+            last = tangent / np.linalg.norm(tangent)
+        for i in range(frames):
+            delta = deltas[i] if i < len(deltas) else None
+            radial = positions[i]
+            if delta is not None and np.linalg.norm(delta) > 1e-9:
+                tangent = delta - np.dot(delta, radial) * radial
+                last = tangent / np.linalg.norm(tangent)
+            if last is None:
+                # Never moves: point north
+                north = np.array([0.0, 0.0, 1.0]) - radial[2] * radial
+                norm = np.linalg.norm(north)
+                last = north / norm if norm > 1e-9 else np.array([1.0, 0.0, 0.0])
+            headings[i] = last
+
+        # Each label shows while its leg is flown; the last one from arrival to the end
+        label_spans = []
+        for i, waypoint in enumerate(waypoints):
+            name = f"Location {i + 1}"
+            if i < len(legs):
+                first_frame, count, _ = legs[i]
+                label_spans.append((waypoint, name, first_frame, first_frame + count - 1))
+            else:
+                label_spans.append((waypoint, name, frames - 1, frames - 1))
+
+        return {
+            "texture_path": self.texture_path,
+            "width": width,
+            "height": height,
+            "camera": visual_profile.camera if visual_profile.camera in CAMERAS else "follow",
+            "atmosphere": visual_profile.atmosphere,
+            "glow": visual_profile.glow,
+            "labels": visual_profile.labels,
+            "positions": positions,
+            "headings": headings,
+            "label_spans": label_spans,
+        }
+
+    def _render_video(self, locations: List[Tuple[float, float]],
+                      quality: VideoQuality,
+                      plan: FramePlan,
+                      output_path: str,
+                      visual: str = "mobile",
+                      usage: Optional[ResourceUsage] = None,
+                      cores: Optional[List[int]] = None) -> bool:
+        """
+        Render frames in a process pool and stream them, in order, to the encoder's stdin.
+
+        Runs of identical frames (the plan's holds) are rendered once and written
+        repeatedly; the encoder turns the repeats into near-empty frames.
+
+        Args:
+            locations (List[Tuple[float, float]]): List of (lat, lon) tuples
+            quality (VideoQuality): Video quality enum
+            plan (FramePlan): Frames per leg
+            output_path (str): Path of the video to produce
+            visual (str): Visual profile name
+            usage (ResourceUsage, optional): Accumulates worker and encoder resource use
+            cores (List[int], optional): Cores reserved for the render; one worker process
+                runs pinned to each
+
+        Returns:
+            bool: True if every frame was rendered and encoded
+        """
+        profile, visual_profile = resolve_render_profile(quality.value, visual)
+        width, height = (round(side * profile.resolution_percentage / 100) for side in profile.resolution)
+        width, height = width + width % 2, height + height % 2
+        fps, frames = plan.fps, plan.total_frames
+        settings = self._frame_settings(locations, plan, width, height, visual_profile)
+        settings["cores"] = cores
+        workers = len(cores) if cores else self.workers or 1
+
+        # Zero-based frames to render, and how many times each is written
+        repeats = [1] * frames
+        for first_frame, count in plan.holds():
+            repeats[first_frame - 1:first_frame - 1 + count] = [count] + [0] * (count - 1)
+        unique = [index for index, repeat in enumerate(repeats) if repeat]
+
+        logger.info(f"Software rendering {frames} frames ({len(unique)} unique) at {width}x{height} "
+                    f"with {workers} workers")
+        encoder_process = self.encoder.start(self.encoder.raw_input_args(width, height, fps),
+                                             output_path, profile, stdin=subprocess.PIPE,
+                                             gop_size=profile.gop_frames(fps))
+        rendered = 0
+        # pid -> [CPU seconds, peak RSS] of each process rendering frames
+        worker_stats: Dict[int, List[float]] = {}
+
+        def render_ahead(pool):
+            # Keep a couple of frames per worker in flight and hand them over in frame order;
+            # submitting every frame up front would buffer the finished ones the encoder hasn't taken
+            pending = deque()
+            for index in unique:
+                pending.append(pool.submit(_render_frame_measured, index))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+        def encode(results):
+            nonlocal rendered
+            for (frame, pid, cpu_seconds, peak_rss), index in zip(results, unique):
+                for _ in range(repeats[index]):
+                    encoder_process.stdin.write(frame)
+                rendered += repeats[index]
+                stats = worker_stats.setdefault(pid, [0.0, 0])
+                stats[0] += cpu_seconds
+                stats[1] = max(stats[1], peak_rss)
+                log_sampler.log(logger, "DEBUG", f"software-progress:{output_path}",
+                                "Rendered frame {} of {}", rendered, frames)
+
+        try:
+            # Frames always render in worker processes, even a single one: _init_worker fills
+            # process-global state and pins the process, neither of which may touch the server
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(settings,)) as pool:
+                encode(render_ahead(pool))
+        except BrokenPipeError:
+            logger.error(f"Encoder stopped accepting frames after {rendered} of {frames}")
+        except Exception as e:
+            logger.error(f"Frame {rendered} failed to render: {str(e)}")
+
+        if usage is not None:
+            for cpu_seconds, peak_rss in worker_stats.values():
+                usage.add_process(cpu_seconds, peak_rss)
+
+        # finish() closes stdin, which ends the stream for the encoder
+        encoder_ok = self.encoder.finish(encoder_process, usage=usage)
+        if rendered == frames and encoder_ok:
+            logger.info(f"Software render completed: {output_path}")
+            return True
+        return False
+
+
+# Singleton instance, built on first use
+software_renderer = LazyService("software_renderer", SoftwareRenderer)
@@ -0,0 +1,299 @@
+import os
+import shutil
+import mimetypes
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+from app.services.delivery import IMMUTABLE_CACHE_CONTROL
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ArtifactStore:
+    """
+    Where finished artifacts (videos, previews, variants) are kept for delivery.
+
+    Artifacts are addressed by keys: their paths relative to the output directory,
+    the same paths /videos/ URLs use. Render nodes write artifacts locally, upload
+    them, and may then delete the local copies.
+    """
+
+    name = "base"
+    # Whether artifacts are served from elsewhere, so local copies can be released
+    remote = False
+
+    def __init__(self, upload_workers: int = 4):
+        self._pool = ThreadPoolExecutor(max_workers=upload_workers, thread_name_prefix="upload")
+
+    @classmethod
+    def from_env(cls, root_dir: str) -> "ArtifactStore":
+        """
+        Build the store selected by ARTIFACT_STORE ("local" or "s3").
+
+        Args:
+            root_dir (str): Local output directory
+
+        Returns:
+            ArtifactStore: Configured store
+        """
+        backend = os.getenv("ARTIFACT_STORE", "local").lower()
+        if backend == "local":
+            return LocalArtifactStore(root_dir)
+        if backend == "s3":
+            return S3ArtifactStore(
+                bucket=os.getenv("S3_BUCKET", "earth-tour"),
+                prefix=os.getenv("S3_PREFIX", ""),
+                endpoint_url=os.getenv("S3_ENDPOINT_URL") or None,
+                region=os.getenv("S3_REGION") or None,
+                part_size=int(float(os.getenv("S3_PART_SIZE_MB", "8")) * 1024 * 1024),
+                upload_workers=int(os.getenv("S3_UPLOAD_CONCURRENCY", "4")),
+                url_ttl=int(os.getenv("S3_URL_TTL", "3600")),
+                keep_local=os.getenv("ARTIFACT_KEEP_LOCAL", "").lower() in ("1", "true", "yes"),
+            )
+        raise ValueError(f"Unknown ARTIFACT_STORE: {backend}. Available: local, s3")
+
+    @staticmethod
+    def valid_key(key: str) -> bool:
+        """
+        Whether a key names an artifact: a relative path without "." or ".." segments,
+        so keys taken from request paths cannot reach outside the artifact root.
+        """
+        if not key or key.startswith(("/", "\\")) or "\\" in key:
+            return False
+        return all(part not in ("", ".", "..") for part in key.split("/"))
+
+    def upload(self, key: str, local_path: str) -> bool:
+        """
+        Store a local file under a key.
+
+        Args:
+            key (str): Artifact key
+            local_path (str): File to store
+
+        Returns:
+            bool: True if the artifact was stored
+        """
+        raise NotImplementedError
+
+    def upload_async(self, key: str, local_path: str) -> "Future[bool]":
+        """Start upload() in the background, e.g. while previews are generated."""
+        return self._pool.submit(self.upload, key, local_path)
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def read(self, key: str) -> Optional[bytes]:
+        """
+        Contents of a (small) artifact, e.g. an index the server rewrites before serving.
+
+        Args:
+            key (str): Artifact key
+
+        Returns:
+            Optional[bytes]: The bytes, or None if there is no such artifact
+        """
+        raise NotImplementedError
+
+    def redirect_url(self, key: str) -> Optional[str]:
+        """
+        URL clients are redirected to for an artifact.
+
+        Args:
+            key (str): Artifact key
+
+        Returns:
+            Optional[str]: The URL, or None if the artifact is served by this process
+        """
+        return None
+
+    def release_local(self, local_path: str) -> None:
+        """Delete the local copy of a stored artifact if the store does not need it."""
+
+
+class LocalArtifactStore(ArtifactStore):
+    name = "local"
+
+    def __init__(self, root_dir: str):
+        """
+        Keep artifacts in the local output directory and serve them from this process.
+
+        Args:
+            root_dir (str): Output directory
+        """
+        super().__init__(upload_workers=1)
+        self.root_dir = os.path.realpath(root_dir)
+        logger.info(f"Artifact store: local ({self.root_dir})")
+
+    def _path(self, key: str) -> str:
+        """Local path of a key, refusing keys that resolve outside the output directory."""
+        path = os.path.realpath(os.path.join(self.root_dir, key))
+        if not self.valid_key(key) or os.path.commonpath([path, self.root_dir]) != self.root_dir:
+            raise ValueError(f"Invalid artifact key: {key}")
+        return path
+
+    def upload(self, key: str, local_path: str) -> bool:
+        target = self._path(key)
+        if os.path.realpath(local_path) == target:
+            return True
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        partial = f"{target}.partial"
+        shutil.copyfile(local_path, partial)
+        os.replace(partial, target)
+        return True
+
+    def upload_async(self, key: str, local_path: str) -> "Future[bool]":
+        if os.path.realpath(local_path) != self._path(key):
+            return super().upload_async(key, local_path)
+        # Rendered in place: nothing to wait for
+        future: "Future[bool]" = Future()
+        future.set_result(True)
+        return future
+
+    def exists(self, key: str) -> bool:
+        try:
+            return os.path.isfile(self._path(key))
+        except ValueError:
+            return False
+
+    def read(self, key: str) -> Optional[bytes]:
+        if not self.exists(key):
+            return None
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+
+class S3ArtifactStore(ArtifactStore):
+    name = "s3"
+    remote = True
+
+    def __init__(self, bucket: str,
+                 prefix: str = "",
+                 endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None,
+                 part_size: int = 8 * 1024 * 1024,
+                 upload_workers: int = 4,
+                 url_ttl: int = 3600,
+                 keep_local: bool = False):
+        """
+        Keep artifacts in an S3-compatible object store (AWS S3, MinIO, or the
+        local stand-in in object_store_standin) and redirect clients to it.
+
+        Files larger than part_size are uploaded in parts, upload_workers at a
+        time. Clients get presigned URLs, so the bucket can stay private. Needs
+        boto3, which is only imported when this store is used.
+
+        Args:
+            bucket (str): Bucket name
+            prefix (str): Prefix prepended to every key, e.g. "earth-tour/"
+            endpoint_url (str, optional): Endpoint of a non-AWS store, e.g. "http://localhost:9000"
+            region (str, optional): Region of the bucket
+            part_size (int): Bytes per multipart upload part (at least 5 MiB for S3)
+            upload_workers (int): Parts and files uploaded concurrently
+            url_ttl (int): Lifetime of presigned URLs in seconds
+            keep_local (bool): Keep local copies after uploading
+        """
+        try:
+            import boto3
+            from botocore.config import Config
+        except ImportError as e:
+            raise RuntimeError("ARTIFACT_STORE=s3 needs boto3: pip install boto3") from e
+
+        super().__init__(upload_workers=upload_workers)
+        self.bucket = bucket
+        self.prefix = prefix
+        self.part_size = max(5 * 1024 * 1024, part_size)
+        self.url_ttl = url_ttl
+        self.keep_local = keep_local
+        # Path-style addressing works with any endpoint, virtual hosts need DNS
+        config = Config(s3={"addressing_style": "path"} if endpoint_url else {},
+                        max_pool_connections=2 * upload_workers)
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region, config=config)
+        # Parts are uploaded on their own pool: a file's upload occupies a worker of
+        # the main pool while waiting for its parts
+        self._part_pool = ThreadPoolExecutor(max_workers=upload_workers, thread_name_prefix="upload-part")
+        logger.info(f"Artifact store: s3://{bucket}/{prefix} ({endpoint_url or 'AWS'})")
+
+    def _key(self, key: str) -> str:
+        if not self.valid_key(key):
+            raise ValueError(f"Invalid artifact key: {key}")
+        return self.prefix + key
+
+    def upload(self, key: str, local_path: str) -> bool:
+        extra = {
+            "ContentType": mimetypes.guess_type(key)[0] or "application/octet-stream",
+            # Keys are unique per render and never rewritten
+            "CacheControl": IMMUTABLE_CACHE_CONTROL,
+        }
+        size = os.path.getsize(local_path)
+        try:
+            if size <= self.part_size:
+                with open(local_path, "rb") as f:
+                    self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=f, **extra)
+            else:
+                self._upload_multipart(key, local_path, size, extra)
+        except Exception as e:
+            logger.error(f"Failed to upload {key}: {str(e)}")
+            return False
+        logger.info(f"Uploaded {key} ({size} bytes)")
+        return True
+
+    def _upload_multipart(self, key: str, local_path: str, size: int, extra: dict) -> None:
+        upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=self._key(key),
+                                                        **extra)["UploadId"]
+
+        def upload_part(number: int) -> dict:
+            with open(local_path, "rb") as f:
+                f.seek((number - 1) * self.part_size)
+                body = f.read(self.part_size)
+            response = self.client.upload_part(Bucket=self.bucket, Key=self._key(key), UploadId=upload_id,
+                                               PartNumber=number, Body=body)
+            return {"PartNumber": number, "ETag": response["ETag"]}
+
+        try:
+            part_count = (size + self.part_size - 1) // self.part_size
+            parts = list(self._part_pool.map(upload_part, range(1, part_count + 1)))
+            self.client.complete_multipart_upload(Bucket=self.bucket, Key=self._key(key), UploadId=upload_id,
+                                                  MultipartUpload={"Parts": parts})
+        except Exception:
+            # Stores keep (and bill for) the parts of unfinished uploads
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=self._key(key), UploadId=upload_id)
+            raise
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        if not self.valid_key(key):
+            return False
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    def read(self, key: str) -> Optional[bytes]:
+        from botocore.exceptions import ClientError
+
+        if not self.valid_key(key):
+            return None
+
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return response["Body"].read()
+
+    def redirect_url(self, key: str) -> Optional[str]:
+        if not self.valid_key(key):
+            return None
+        return self.client.generate_presigned_url("get_object", Params={"Bucket": self.bucket, "Key": self._key(key)},
+                                                  ExpiresIn=self.url_ttl)
+
+    def release_local(self, local_path: str) -> None:
+        if not self.keep_local and os.path.exists(local_path):
+            os.remove(local_path)
@@ -0,0 +1,365 @@
+import os
+import json
+import time
+import queue
+import threading
+import contextvars
+import urllib.request
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SERVICE_NAME = "earth-tour-server"
+
+
+@dataclass
+class Span:
+    trace_id: str               # 32 hex digits, shared by every span of a job
+    span_id: str                # 16 hex digits
+    parent_id: Optional[str]
+    name: str
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"          # "ok" or "error"
+    service: str = SERVICE_NAME
+
+    @property
+    def traceparent(self) -> str:
+        """W3C trace context header value identifying this span as the parent."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "attributes": self.attributes,
+            "status": self.status,
+            "service": self.service,
+        }
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Span]:
+    """
+    Parse a W3C traceparent header into a stand-in for the remote parent span.
+
+    Args:
+        value (str, optional): Header value, e.g. "00-<trace id>-<span id>-01"
+
+    Returns:
+        Optional[Span]: Span carrying the trace and span IDs, or None if malformed
+    """
+    parts = (value or "").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return Span(parts[1], parts[2], None, "remote")
+
+
+# The span the running code belongs to. Context variables follow asyncio tasks;
+# threads start empty, so work handed to another thread carries the span along
+# explicitly (see attach() and the parent argument of start_span())
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+class SpanExporter:
+    """Sends finished spans somewhere. Subclasses implement export()."""
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+
+class JsonlExporter(SpanExporter):
+    def __init__(self, path: str):
+        """
+        Append finished spans to a file, one JSON object per line.
+
+        Args:
+            path (str): File to append to
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(span) + "\n" for span in spans)
+        with self._lock, open(self.path, "a") as f:
+            f.write(lines)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpExporter(SpanExporter):
+    def __init__(self, endpoint: str, batch_size: int = 256, flush_interval: float = 2.0, timeout: float = 5.0):
+        """
+        Send spans to an OpenTelemetry collector with OTLP/HTTP (JSON encoding).
+
+        Spans are batched and posted from a background thread, so a slow or
+        unavailable collector never delays a request or render.
+
+        Args:
+            endpoint (str): Collector base URL, e.g. "http://localhost:4318"
+            batch_size (int): Most spans per request
+            flush_interval (float): Seconds between posts of a partial batch
+            timeout (float): Seconds to wait for the collector
+        """
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        # Bounded: spans are dropped rather than piling up while the collector is down
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=100 * batch_size)
+        self._thread = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        for span in spans:
+            try:
+                self._queue.put_nowait(span)
+            except queue.Full:
+                logger.warning("Dropping spans, the trace collector is not keeping up")
+                return
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                self._post(batch)
+            except Exception as e:
+                logger.warning(f"Could not export {len(batch)} spans to {self.url}: {str(e)}")
+
+    def _post(self, spans: List[Dict[str, Any]]) -> None:
+        by_service: Dict[str, List[Dict[str, Any]]] = {}
+        for span in spans:
+            by_service.setdefault(span.get("service", SERVICE_NAME), []).append({
+                "traceId": span["trace_id"],
+                "spanId": span["span_id"],
+                "parentSpanId": span.get("parent_id") or "",
+                "name": span["name"],
+                "kind": 1,
+                "startTimeUnixNano": str(span["start_ns"]),
+                "endTimeUnixNano": str(span["end_ns"]),
+                "attributes": [{"key": key, "value": _otlp_value(value)}
+                               for key, value in span.get("attributes", {}).items()],
+                "status": {"code": 2 if span.get("status") == "error" else 1},
+            })
+        body = {"resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service}}]},
+                "scopeSpans": [{"scope": {"name": "earth-tour"}, "spans": otlp_spans}],
+            }
+            for service, otlp_spans in by_service.items()
+        ]}
+        request = urllib.request.Request(self.url, data=json.dumps(body).encode(), method="POST",
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class Tracer:
+    def __init__(self, exporter: Optional[SpanExporter] = None):
+        """
+        Initialize the tracer.
+
+        A job's spans share one trace: the HTTP request that created it, the wait
+        in the render queue, geocoding, planning, the render with its config,
+        Blender process and encodes, and the spans of the Blender script itself,
+        which receives the trace context through its config.
+
+        Args:
+            exporter (SpanExporter, optional): Where finished spans go; without one,
+                tracing is off and spans cost next to nothing
+        """
+        self.exporter = exporter
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        """
+        Build a tracer configured from TRACE_EXPORTER ("none", "jsonl" or "otlp").
+
+        Returns:
+            Tracer: Configured tracer
+        """
+        kind = os.getenv("TRACE_EXPORTER", "none").lower()
+        if kind == "jsonl":
+            path = os.getenv("TRACE_FILE", "logs/traces.jsonl")
+            logger.info(f"Tracing to {path}")
+            return cls(JsonlExporter(path))
+        if kind == "otlp":
+            endpoint = os.getenv("OTLP_ENDPOINT", "http://localhost:4318")
+            logger.info(f"Tracing to OTLP collector at {endpoint}")
+            return cls(OtlpExporter(endpoint))
+        if kind != "none":
+            raise ValueError(f"Unknown TRACE_EXPORTER: {kind}. Available: none, jsonl, otlp")
+        return cls()
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def current(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def start_span(self, name: str, parent: Optional[Span] = None, start_ns: Optional[int] = None,
+                   **attributes) -> Optional[Span]:
+        """
+        Start a span without making it current, e.g. for work that overlaps others.
+
+        Args:
+            name (str): Span name
+            parent (Span, optional): Parent span, the current span by default
+            start_ns (int, optional): Start time (Unix nanoseconds), now by default
+            **attributes: Span attributes
+
+        Returns:
+            Optional[Span]: The span, to pass to end_span(); None when tracing is off
+        """
+        if not self.enabled:
+            return None
+        parent = parent or _current_span.get()
+        span = Span(
+            trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+            span_id=os.urandom(8).hex(),
+            parent_id=parent.span_id if parent else None,
+            name=name,
+            attributes=attributes,
+        )
+        if start_ns is not None:
+            span.start_ns = start_ns
+        return span
+
+    def end_span(self, span: Optional[Span], error: Optional[BaseException] = None) -> None:
+        if span is None:
+            return
+        span.end_ns = time.time_ns()
+        if error is not None:
+            span.status = "error"
+            span.attributes["error"] = str(error) or type(error).__name__
+        self.export([span.to_dict()])
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Optional[Span]]:
+        """
+        Run a block in a child span of the current span (or a new trace).
+
+        Args:
+            name (str): Span name
+            **attributes: Span attributes; more can be set on the yielded span
+
+        Yields:
+            Optional[Span]: The span, None when tracing is off
+        """
+        span = self.start_span(name, **attributes)
+        if span is None:
+            yield None
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            self.end_span(span, e)
+            raise
+        else:
+            self.end_span(span)
+        finally:
+            _current_span.reset(token)
+
+    @contextmanager
+    def attach(self, span: Optional[Span]) -> Iterator[None]:
+        """Make a span captured on another thread (or parsed from a header) current."""
+        token = _current_span.set(span)
+        try:
+            yield
+        finally:
+            _current_span.reset(token)
+
+    def inject(self) -> Optional[str]:
+        """Traceparent of the current span, for another process; None without one."""
+        span = _current_span.get()
+        return span.traceparent if span is not None else None
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        """Export finished spans, including spans recorded by other processes."""
+        if not self.enabled or not spans:
+            return
+        try:
+            self.exporter.export(spans)
+        except Exception as e:
+            logger.warning(f"Could not export spans: {str(e)}")
+
+    def import_file(self, path: str) -> None:
+        """
+        Export spans another process wrote to a JSONL file, and delete the file.
+
+        Args:
+            path (str): File written by the other process
+        """
+        if not os.path.exists(path):
+            return
+        with open(path) as f:
+            spans = [json.loads(line) for line in f if line.strip()]
+        os.remove(path)
+        self.export(spans)
+
+
+# Singleton instance
+tracer = Tracer.from_env()
+
+
+class TraceMiddleware:
+    def __init__(self, app):
+        """
+        ASGI middleware opening a span per HTTP request that starts work (POST) or
+        continues a caller's trace (has a traceparent header).
+
+        The span is current while the endpoint runs, so jobs created by the request
+        join its trace, and its traceparent is returned in the response headers.
+        Status polling and video downloads without a traceparent are not traced.
+        """
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        incoming = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        if scope["method"] != "POST" and incoming is None:
+            await self.app(scope, receive, send)
+            return
+
+        with tracer.attach(incoming), tracer.span(f"{scope['method']} {scope['path']}",
+                                                  method=scope["method"], path=scope["path"]) as span:
+            async def send_with_trace(message):
+                if message["type"] == "http.response.start":
+                    span.attributes["status_code"] = message["status"]
+                    message = {**message, "headers": list(message.get("headers", []))
+                               + [(b"traceparent", span.traceparent.encode())]}
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace)
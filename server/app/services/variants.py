@@ -0,0 +1,85 @@
+import os
+from typing import Dict, List, Optional
+
+from app.quality_profiles import get_profile
+from app.services.encoder import FFmpegEncoder, VARIANT_CODECS
+from app.services.resources import CoreAllocator, ResourceUsage, core_allocator
+from app.services.tracing import tracer
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class VariantEncoder:
+    def __init__(self, codecs: List[str] = None, encoder: FFmpegEncoder = None, cores: CoreAllocator = None):
+        """
+        Initialize the encoder of delivery variants.
+
+        Every finished H.264 video can additionally be delivered in more efficient
+        codecs (HEVC, AV1) for clients that can decode them. Variants are encoded
+        in software from the finished video, with the same GOP and fast-start
+        layout and a lower bitrate cap. Like renders, each encode reserves cores for
+        its quality and is pinned to them, so it never competes with Blender.
+
+        Args:
+            codecs (List[str]): Keys of VARIANT_CODECS to encode, empty to disable
+            encoder (FFmpegEncoder): Encoder to run ffmpeg with
+            cores (CoreAllocator): Hands each encode a set of cores; shared with the renderers
+        """
+        unknown = [codec for codec in codecs or [] if codec not in VARIANT_CODECS]
+        if unknown:
+            raise ValueError(f"Unknown delivery variant codecs: {', '.join(unknown)}. "
+                             f"Available: {', '.join(VARIANT_CODECS)}")
+        self.codecs = list(codecs or [])
+        self.encoder = encoder or FFmpegEncoder.from_env()
+        self.cores = cores or core_allocator
+        logger.info(f"Delivery variants: {', '.join(self.codecs) or 'none'}")
+
+    @classmethod
+    def from_env(cls) -> "VariantEncoder":
+        """
+        Build a variant encoder configured from DELIVERY_VARIANTS, e.g. "hevc,av1".
+
+        Returns:
+            VariantEncoder: Configured encoder
+        """
+        codecs = [codec.strip().lower() for codec in os.getenv("DELIVERY_VARIANTS", "").split(",") if codec.strip()]
+        return cls(codecs)
+
+    def encode(self, video_path: str, quality: str, fps: int,
+               usage: Optional[ResourceUsage] = None) -> Dict[str, str]:
+        """
+        Encode the configured variants of a finished video next to it.
+
+        A failed variant is logged and left out; the H.264 video is always delivered.
+
+        Args:
+            video_path (str): Finished H.264 video
+            quality (str): Quality profile name the video was rendered at
+            fps (int): Frame rate of the video
+            usage (ResourceUsage, optional): Accumulates ffmpeg's CPU time and memory
+
+        Returns:
+            Dict[str, str]: Codec -> variant filename, in the video's directory
+        """
+        profile = get_profile(quality)
+        stem, ext = os.path.splitext(video_path)
+        variants = {}
+        for codec in self.codecs:
+            variant_path = f"{stem}_{codec}{ext}"
+            # Waits like a render until enough cores are free
+            with self.cores.reserve(self.cores.threads_for(quality)) as cores, \
+                    tracer.span("encode.variant", codec=codec, threads=len(cores)):
+                encoded = self.encoder.transcode(video_path, variant_path, profile, codec,
+                                                 gop_size=profile.gop_frames(fps), usage=usage, cores=cores)
+            if encoded:
+                variants[codec] = os.path.basename(variant_path)
+            else:
+                logger.warning(f"Could not encode {codec} variant of {video_path}")
+                if os.path.exists(variant_path):
+                    os.remove(variant_path)
+        return variants
+
+
+# Singleton instance
+variant_encoder = VariantEncoder.from_env()
@@ -0,0 +1,58 @@
+import time
+import threading
+from typing import Any, Callable, Optional
+
+
+class LazyService:
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        """
+        Stand-in for a service singleton that is built on first use.
+
+        Attribute access is forwarded to the service, building it first if needed,
+        so modules can import the singleton without paying for its construction
+        (clients, directories, heavy imports) at import time.
+
+        Args:
+            name (str): Service name used in startup reports
+            factory (Callable[[], Any]): Builds the service
+        """
+        self._name = name
+        self._factory = factory
+        self._instance = None
+        self._init_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        """
+        Return the service, building it on the first call.
+
+        Returns:
+            Any: The service instance
+        """
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    started = time.monotonic()
+                    instance = self._factory()
+                    self._init_seconds = time.monotonic() - started
+                    self._instance = instance
+        return self._instance
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    @property
+    def init_seconds(self) -> Optional[float]:
+        """Seconds the factory took, or None if the service was not built yet."""
+        return self._init_seconds
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.get(), attr)
+
+    def __repr__(self) -> str:
+        return f"<LazyService {self._name} ({'loaded' if self.loaded else 'not loaded'})>"
@@ -1,18 +1,26 @@
 import os
 import sys
+import time
+import threading
 from loguru import logger
 
 # Configure Loguru
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# "text" for human-readable lines, "json" for one JSON object per line (log shippers)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
 
 # Remove default handler
 logger.remove()
 
-# Add stdout handler with custom format
+# Add stdout handler with custom format. Sinks are enqueue=True: records go onto a
+# queue drained by a background thread, so a slow terminal or log collector never
+# blocks a request or render thread.
 logger.add(
     sys.stdout,
     level=LOG_LEVEL,
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
+    serialize=LOG_FORMAT == "json",
+    enqueue=True
 )
 
 # Add file handler for error logs
@@ -22,18 +30,74 @@ logger.add(
     rotation="10 MB",
     retention="1 week",
     compression="zip",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
+    enqueue=True
 )
 
 # Create a function to get the logger
 def get_logger(name):
     """
     Return a logger instance with the specified name.
-    
+
+    Prefer brace-style arguments over f-strings on hot paths, e.g.
+    ``logger.debug("Frame {} done", i)``: loguru only formats the message if the
+    level is enabled.
+
     Args:
         name (str): The name of the logger, typically the module name
-        
+
     Returns:
         logger: A configured logger instance
     """
     return logger.bind(name=name)
+
+
+class LogSampler:
+    def __init__(self, interval: float = 5.0):
+        """
+        Throttle high-frequency log events to at most one per interval per key.
+
+        Args:
+            interval (float): Minimum seconds between emitted events with the same key
+        """
+        self.interval = interval
+        self._last = {}
+        self._suppressed = {}
+        self._lock = threading.Lock()
+
+    def log(self, log, level: str, key: str, message: str, *args, **kwargs) -> bool:
+        """
+        Log an event unless one with the same key was logged within the interval.
+
+        The next emitted event reports how many were suppressed in between.
+
+        Args:
+            log: Logger returned by get_logger()
+            level (str): Level name, e.g. "INFO"
+            key (str): Identifies the event stream, e.g. "rate-limit:ip:10.0.0.7"
+            message (str): Brace-style message
+            *args: Message arguments
+            **kwargs: Message keyword arguments
+
+        Returns:
+            bool: True if the event was logged
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last.get(key, float("-inf")) < self.interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return False
+            self._last[key] = now
+            suppressed = self._suppressed.pop(key, 0)
+            if len(self._last) > 10000:
+                # Forget streams that went quiet so the sampler stays bounded
+                self._last = {k: t for k, t in self._last.items() if now - t < self.interval}
+
+        if suppressed:
+            message += f" ({suppressed} similar suppressed)"
+        log.opt(depth=1).log(level, message, *args, **kwargs)
+        return True
+
+
+# Shared sampler for hot paths
+log_sampler = LogSampler(interval=float(os.getenv("LOG_SAMPLE_INTERVAL", "5")))
@@ -1,761 +1,704 @@
 #!/usr/bin/env python3
+# Earth Tour flight path renderer.
+#
+# Single Blender script behind every render. The render engine and look are chosen
+# per job through the quality profile and visual profile embedded in the config:
+#   - engine: BLENDER_WORKBENCH (fast, flat shading) or BLENDER_EEVEE (materials, glow)
+#   - camera: "follow" (above the aircraft, portrait) or "orbit" (wide view of the globe)
+#   - atmosphere, glow and labels can be toggled independently
+#
+# Usage:
+#   blender --background --python render_flight.py -- --config job.json --output out.mp4
 import bpy
 import bmesh
-import math
 import os
 import sys
 import json
+import time
+import cProfile
 import argparse
-from math import radians, sin, cos, asin, sqrt, atan2
+import traceback
+from contextlib import contextmanager
+from math import radians, sin, cos, asin, sqrt
 from mathutils import Vector, Matrix
 
+# Height of the aircraft, labels and trail above the unit-radius Earth
+FLIGHT_ALTITUDE = 1.02
+# Minimum seconds between per-frame progress lines; the server keeps only the
+# tail of Blender's output, so progress is sampled rather than logged every frame
+PROGRESS_INTERVAL = 5.0
+
+
 # Setup basic logging (prints to Blender's console)
 def log(message, level="INFO"):
     print(f"[{level}] {message}")
     sys.stdout.flush()  # Ensure output is immediately visible
-log("Starting Blender flight path animation script")
 
-# Parse command line arguments
-try:
+
+class PhaseTimer:
+    """
+    Wall-clock time per script phase (nested phases are timed within their parent).
+
+    With a profile directory, the whole run is also profiled with cProfile, and
+    phases.json (seconds per phase), phases.folded (milliseconds per phase, in
+    folded-stack format for flame graphs) and blender.prof (cProfile stats) are
+    written there by report().
+
+    With trace context from the server ({"traceparent", "spans_path"}), phases
+    are also recorded as spans of the job's trace, and write_spans() leaves them
+    in spans_path for the server to export.
+    """
+
+    def __init__(self, profile_dir=None, trace=None):
+        self.profile_dir = profile_dir
+        self.totals = {}
+        self._stack = []
+        self._profiler = None
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+        self.spans = []
+        self._trace = None
+        self._span_ids = []
+        parts = ((trace or {}).get('traceparent') or "").split("-")
+        if len(parts) == 4:
+            self._trace = {"trace_id": parts[1], "parent_id": parts[2], "spans_path": trace['spans_path']}
+
+    @contextmanager
+    def phase(self, name, span=True):
+        """Time a phase; span=False for phases repeated per frame, which would flood the trace."""
+        self._stack.append(name)
+        path = ";".join(self._stack)
+        traced = span and self._trace is not None
+        if traced:
+            span_id = os.urandom(8).hex()
+            parent_id = self._span_ids[-1] if self._span_ids else self._trace['parent_id']
+            self._span_ids.append(span_id)
+            started_ns = time.time_ns()
+        started = time.perf_counter()
+        status = "error"
+        try:
+            yield
+            status = "ok"
+        finally:
+            self.totals[path] = self.totals.get(path, 0.0) + time.perf_counter() - started
+            self._stack.pop()
+            if traced:
+                self._span_ids.pop()
+                self.spans.append({
+                    "trace_id": self._trace['trace_id'], "span_id": span_id, "parent_id": parent_id,
+                    "name": f"blender.{name}", "start_ns": started_ns, "end_ns": time.time_ns(),
+                    "attributes": {"pid": os.getpid()}, "status": status, "service": "blender",
+                })
+
+    def write_spans(self):
+        if self._trace is None or not self.spans:
+            return
+        with open(self._trace['spans_path'], 'w') as f:
+            for span in self.spans:
+                f.write(json.dumps(span) + "\n")
+
+    def report(self):
+        top_level = {path: seconds for path, seconds in self.totals.items() if ";" not in path}
+        log("Phase timings: " + ", ".join(f"{path} {seconds:.2f}s" for path, seconds in top_level.items()))
+        if not self.profile_dir:
+            return
+        self._profiler.disable()
+        self._profiler.dump_stats(os.path.join(self.profile_dir, "blender.prof"))
+        with open(os.path.join(self.profile_dir, "phases.json"), 'w') as f:
+            json.dump({path: round(seconds, 4) for path, seconds in self.totals.items()}, f, indent=2)
+        # Folded stacks count self time, so subtract the time of nested phases
+        self_ms = {path: seconds * 1000 for path, seconds in self.totals.items()}
+        for path, seconds in self.totals.items():
+            parent = path.rpartition(";")[0]
+            if parent in self_ms:
+                self_ms[parent] -= seconds * 1000
+        with open(os.path.join(self.profile_dir, "phases.folded"), 'w') as f:
+            for path, ms in self_ms.items():
+                f.write(f"{path} {max(0, round(ms))}\n")
+        log(f"Wrote profile to {self.profile_dir}")
+
+
+def parse_args():
     argv = sys.argv
     if "--" in argv:
         argv = argv[argv.index("--") + 1:]
     else:
         argv = []
-    
+
     parser = argparse.ArgumentParser(description="Render flight path animation")
     parser.add_argument("--config", required=True, help="Path to configuration JSON file")
     parser.add_argument("--output", required=True, help="Output video file path")
     args = parser.parse_args(argv)
-    
+
     log(f"Parsed command line arguments: {argv}")
-    log(f"Config file: {args.config}")
-    log(f"Output file: {args.output}")
-    
-    # Load configuration from file
-    with open(args.config, 'r') as f:
-        config = json.load(f)
-    log(f"Loaded configuration: {config}")
-    
-    # Extract parameters from config
-    locations = config['locations']
-    quality = config['quality']
-    fps = config.get('fps', 30)
-    
-    # Always use the duration value provided in the config
-    duration = config['duration']
-    
-    log(f"Rendering with: {len(locations)} locations, {quality} quality, {fps} fps, {duration}s duration")
-    
-    # Set resolution based on quality
-    resolution = {
-        '480p': (854, 480),
-        '720p': (1280, 720),
-        '1080p': (1920, 1080),
-        '4k': (3840, 2160)
-    }.get(quality, (1280, 720))
-    
-    log(f"Resolution: {resolution[0]}x{resolution[1]}, Total frames: {fps * duration}")
-    
-    # Calculate total frames
-    frames = fps * duration
-    
-    # Clear existing scene
+    return args
+
+
+def load_profiles(config):
+    """Return the (quality, visual) profile dicts, falling back to the server's registry."""
+    profile = config.get('profile')
+    visual = config.get('visual')
+    if profile is None or visual is None:
+        # Older configs don't embed the profiles
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from app.quality_profiles import resolve_render_profile
+        quality_profile, visual_profile = resolve_render_profile(config['quality'], config.get('visual_name', 'mobile'))
+        profile = profile or quality_profile.to_dict()
+        visual = visual or visual_profile.to_dict()
+    return profile, visual
+
+
+def resolve_engine(engine):
+    """Map an engine name onto one this Blender build provides (Eevee was renamed in 4.2)."""
+    available = bpy.types.RenderSettings.bl_rna.properties['engine'].enum_items.keys()
+    if engine in available:
+        return engine
+    if engine == 'BLENDER_EEVEE' and 'BLENDER_EEVEE_NEXT' in available:
+        return 'BLENDER_EEVEE_NEXT'
+    log(f"Render engine {engine} not available, using BLENDER_WORKBENCH", "WARNING")
+    return 'BLENDER_WORKBENCH'
+
+
+def setup_scene(config, profile, visual, frames):
     log("Clearing existing scene")
     bpy.ops.wm.read_factory_settings(use_empty=True)
-    
-    # Create a new scene
+
     log("Setting up scene and render settings")
     scene = bpy.context.scene
+    resolution = profile['resolution']
     scene.render.resolution_x = resolution[0]
     scene.render.resolution_y = resolution[1]
-    scene.render.resolution_percentage = 100
+    scene.render.resolution_percentage = profile['resolution_percentage']
     scene.render.image_settings.file_format = 'FFMPEG'
     scene.render.ffmpeg.format = 'MPEG4'
     scene.render.ffmpeg.codec = 'H264'
-    scene.render.ffmpeg.constant_rate_factor = 'MEDIUM'
-    scene.render.fps = fps
+    scene.render.ffmpeg.constant_rate_factor = profile['blender']['constant_rate_factor']
+    scene.render.ffmpeg.ffmpeg_preset = profile['blender']['ffmpeg_preset']
+    if profile.get('max_bitrate'):
+        # A one-second rate buffer keeps bitrate peaks within what cellular links sustain
+        scene.render.ffmpeg.maxrate = profile['max_bitrate']
+        scene.render.ffmpeg.buffersize = profile['max_bitrate']
+    if config.get('gop_size'):
+        # Fixed keyframe interval: precise seeking, and independently rendered legs
+        # can be joined losslessly
+        scene.render.ffmpeg.gopsize = config['gop_size']
+    scene.render.fps = config.get('fps', 30)
     scene.frame_start = 1
     scene.frame_end = frames
-    
-    # Set the render engine to a reliable option with better appearance and speed
-    scene.render.engine = 'BLENDER_WORKBENCH'  # Use Workbench for faster rendering in Blender 4.4.3
-    
-    # Configure workbench renderer for better appearance
-    scene.display.shading.light = 'STUDIO'
-    scene.display.shading.color_type = 'MATERIAL'
-    scene.display.shading.show_shadows = True
-    
-    # Create world environment with a simple blue background and stars
-    world = bpy.data.worlds.new("Earth_World")
-    world.use_nodes = True
-    bg_node = world.node_tree.nodes["Background"]
-    bg_node.inputs[0].default_value = (0.0, 0.0, 0.05, 1.0)  # Very dark blue for space
-    bg_node.inputs[1].default_value = 1.0  # Strength
-    scene.world = world  # Assign the world to the scene
-    
-    # Add more lighting for better visibility
-    # Add a rim light to highlight the Earth's edges
-    sun = bpy.data.lights.new("Sun", type='SUN')
-    sun.energy = 5.0
-    sun_obj = bpy.data.objects.new("Sun", sun)
-    bpy.context.collection.objects.link(sun_obj)
-    sun_obj.location = (10, -10, 10)
-    sun_obj.rotation_euler = (radians(45), radians(45), 0)
-    
-    rim_light = bpy.data.lights.new("RimLight", type='SUN')
-    rim_light.energy = 2.0
-    rim_light_obj = bpy.data.objects.new("RimLight", rim_light)
-    bpy.context.collection.objects.link(rim_light_obj)
-    rim_light_obj.location = (-10, 2, 5)
-    rim_light_obj.rotation_euler = (radians(30), radians(-30), 0)
-
-    # Create Earth sphere
-    bpy.ops.mesh.primitive_uv_sphere_add(segments=64, ring_count=32, radius=1.0, location=(0, 0, 0))
-    # Make sure we get the active object properly in both GUI and headless mode
-    earth = bpy.context.view_layer.objects.active
-    if not earth:
-        # Fallback to finding the object by name
-        for obj in bpy.context.scene.objects:
-            if obj.type == 'MESH':
-                earth = obj
-                break
-    earth.name = "Earth"
-    log(f"Created Earth object: {earth.name}")
-
-    # Create simple Earth materials for Workbench renderer
-    # Create blue material for oceans
-    ocean_mat = bpy.data.materials.new(name="Ocean_Material")
-    ocean_mat.diffuse_color = (0.03, 0.15, 0.4, 1.0)  # Deep blue for oceans
-    
-    # Create green material for land
-    land_mat = bpy.data.materials.new(name="Land_Material")
-    land_mat.diffuse_color = (0.15, 0.5, 0.15, 1.0)  # Green for land
-    
-    # Create a simple material for the plane
-    plane_mat = bpy.data.materials.new(name="Plane_Material")
-    plane_mat.diffuse_color = (0.8, 0.0, 0.0, 1.0)  # Red for visibility
-    
-    # Assign material to Earth
-    if earth.data.materials:
-        earth.data.materials[0] = ocean_mat
-    else:
-        earth.data.materials.append(ocean_mat)
-    
-    # Add atmosphere glow - simplified for Workbench renderer
-    atmosphere = bpy.data.materials.new(name="Atmosphere")
-    atmosphere.diffuse_color = (0.1, 0.2, 0.8, 0.5)  # Blue glow with transparency
 
-    # Create atmosphere sphere slightly larger than Earth
-    bpy.ops.mesh.primitive_uv_sphere_add(segments=64, ring_count=32, radius=1.05, location=(0, 0, 0))
-    # Make sure we get the active object properly in both GUI and headless mode
-    atm = bpy.context.view_layer.objects.active
-    if not atm or atm.name == "Earth":  # Make sure we don't get the Earth object
-        # Fallback to finding the object by name or the last created object
-        for obj in bpy.context.scene.objects:
-            if obj.type == 'MESH' and obj != earth:
-                atm = obj
-                break
-    atm.name = "Atmosphere"
-    log(f"Created Atmosphere object: {atm.name}")
-    
-    # Assign atmosphere material
-    if atm.data.materials:
-        atm.data.materials[0] = atmosphere
+    scene.render.engine = resolve_engine(profile['engine'])
+    if scene.render.engine == 'BLENDER_WORKBENCH':
+        scene.display.shading.light = 'STUDIO'
+        scene.display.shading.color_type = 'MATERIAL'
+        scene.display.shading.show_shadows = True
+        scene.display.render_aa = profile['blender']['render_aa']
     else:
-        atm.data.materials.append(atmosphere)
+        scene.eevee.taa_render_samples = profile['samples']
+        if hasattr(scene.eevee, 'use_soft_shadows'):
+            scene.eevee.use_soft_shadows = True
+        if visual['glow'] and hasattr(scene.eevee, 'use_bloom'):
+            scene.eevee.use_bloom = True
+            scene.eevee.bloom_intensity = 0.05
 
-    # Make atmosphere partially transparent
-    # Updated for Blender 4.4+ compatibility
-    atmosphere.blend_method = 'BLEND'
-    
-    # Add camera
-    camera_data = bpy.data.cameras.new(name='Camera')
-    camera = bpy.data.objects.new('Camera', camera_data)
-    bpy.context.collection.objects.link(camera)
-    scene.camera = camera
-    
-    # Position camera to view Earth
-    camera.location = (0, -3, 1.5)  # Position camera to view Earth
-    camera.rotation_euler = (radians(60), 0, 0)  # Rotate camera to look at Earth
-    camera_data.lens = 35  # Set lens for a good field of view
-    
-    # Helper function to convert lat/long to 3D coordinates
-    def latlon_to_xyz(lat, lon, radius=1.0):
-        lat_rad = radians(lat)
-        lon_rad = radians(lon)
-        x = radius * cos(lat_rad) * cos(lon_rad)
-        y = radius * cos(lat_rad) * sin(lon_rad)
-        z = radius * sin(lat_rad)
-        return (x, y, z)
-
-    # Create a plane to represent the aircraft
-    bpy.ops.mesh.primitive_cone_add(radius1=0.05, radius2=0.0, depth=0.2, location=(0, 0, 0))
-    # Make sure we get the active object properly in both GUI and headless mode
-    plane = bpy.context.view_layer.objects.active
-    if not plane or plane.name in ["Earth", "Atmosphere"]:
-        # Fallback to finding the object by name or the last created object
-        for obj in bpy.context.scene.objects:
-            if obj.type == 'MESH' and obj != earth and obj != atm:
-                plane = obj
-                break
-    plane.name = "Aircraft"
-    log(f"Created Aircraft object: {plane.name}")
-    
-    # Rotate to point along Y axis
-    plane.rotation_euler = (0, radians(90), 0)
-    
-    # Assign plane material
-    if plane.data.materials:
-        plane.data.materials[0] = plane_mat
-    else:
-        plane.data.materials.append(plane_mat)
-
-    # Helper function for great circle path calculation
-    def great_circle_points(start_lat, start_lon, end_lat, end_lon, steps=100):
-        log(f"Calculating great circle: {start_lat},{start_lon} to {end_lat},{end_lon}")
-        
-        # Convert to radians
-        start_lat_rad = radians(start_lat)
-        start_lon_rad = radians(start_lon)
-        end_lat_rad = radians(end_lat)
-        end_lon_rad = radians(end_lon)
-        
-        # Calculate the angular distance
-        d_lon = end_lon_rad - start_lon_rad
-        
-        # Handle edge case: same point
-        if abs(end_lat_rad - start_lat_rad) < 1e-10 and abs(d_lon) < 1e-10:
-            # Linear interpolation for identical points
-            log("Points are nearly identical, using linear interpolation", "WARNING")
-            points = []
-            for i in range(steps + 1):
-                t = i / steps
-                x = cos(start_lat_rad) * cos(start_lon_rad)
-                y = cos(start_lat_rad) * sin(start_lon_rad)
-                z = sin(start_lat_rad)
-                points.append((x, y, z))
-            return points
-        
-        # Use safer haversine formula
-        a = sin((end_lat_rad - start_lat_rad) / 2) ** 2
-        b = cos(start_lat_rad) * cos(end_lat_rad) * sin(d_lon / 2) ** 2
-        sin_sigma = sqrt(a + b)
-        
-        # Clamp to valid range to avoid domain errors
-        sin_sigma = max(-1.0, min(sin_sigma, 1.0))
-        d_sigma = 2 * asin(sin_sigma)
-        
-        log(f"Great circle distance: {d_sigma} radians")
-        
-        # Generate points along the great circle
-        points = []
-        for i in range(steps + 1):
-            t = i / steps
-            
-            # Handle edge case: very small distance
-            if abs(d_sigma) < 1e-10:
-                x = cos(start_lat_rad) * cos(start_lon_rad)
-                y = cos(start_lat_rad) * sin(start_lon_rad)
-                z = sin(start_lat_rad)
-            else:
-                # Standard spherical interpolation
-                A = sin((1 - t) * d_sigma) / sin(d_sigma)
-                B = sin(t * d_sigma) / sin(d_sigma)
-                
-                x = A * cos(start_lat_rad) * cos(start_lon_rad) + B * cos(end_lat_rad) * cos(end_lon_rad)
-                y = A * cos(start_lat_rad) * sin(start_lon_rad) + B * cos(end_lat_rad) * sin(end_lon_rad)
-                z = A * sin(start_lat_rad) + B * sin(end_lat_rad)
-            
-            # Normalize to ensure we're on the unit sphere
-            mag = sqrt(x**2 + y**2 + z**2)
-            x, y, z = x/mag, y/mag, z/mag
-            points.append((x, y, z))
-        
-        return points
-
-    # Create waypoints from locations
-    waypoints = []
-    for loc in locations:
-        lat = loc['lat']
-        lon = loc['lon']
-        waypoints.append((lat, lon))
-    
-    # Animate plane along the flight path
-    total_segments = len(waypoints) - 1
-    frames_per_segment = frames // total_segments
-    
-    for i in range(total_segments):
-        start_lat, start_lon = waypoints[i]
-        end_lat, end_lon = waypoints[i + 1]
-        
-        # Calculate path points for this segment
-        path_points = great_circle_points(start_lat, start_lon, end_lat, end_lon, steps=frames_per_segment)
-        
-        # Animate plane along path
-        for j, point in enumerate(path_points):
-            frame_num = i * frames_per_segment + j + 1
-            bpy.context.scene.frame_set(frame_num)
-            
-            # Position plane slightly above Earth's surface
-            plane.location = Vector(point) * 1.02
-            plane.keyframe_insert(data_path="location", frame=frame_num)
-            
-            # Orient plane along path direction
-            if j < len(path_points) - 1:
-                next_point = Vector(path_points[j + 1])
-                direction = (next_point - Vector(point)).normalized()
-                up = -Vector(point).normalized()  # Up is away from Earth center
-                forward = direction
-                right = forward.cross(up)
-                up = right.cross(forward)  # Recalculate for orthogonality
-                
-                # Create rotation matrix and apply to plane
-                rot_matrix = Matrix((right, forward, up)).transposed().to_4x4()
-                plane.matrix_world = rot_matrix
-                plane.matrix_world.translation = Vector(point) * 1.02
-                plane.keyframe_insert(data_path="rotation_euler", frame=frame_num)
-    
-    # Animate labels to appear when the plane reaches each waypoint
-    for i, (lat, lon) in enumerate(waypoints):
-        # Convert lat/lon to 3D position
-        pos = Vector(latlon_to_xyz(lat, lon, 1.02))
-        
-        # Get the frame where the plane reaches this waypoint
-        if i == 0:
-            appear_frame = 1
-        else:
-            appear_frame = i * frames_per_segment + 1
-        
-        # Make the label appear when the plane reaches this waypoint
-        label = labels[i]
-        
-        # Hide the label initially
-        if i > 0:  # Keep the first label visible from the start
-            label.hide_render = True
-            label.hide_viewport = True
-            label.keyframe_insert(data_path="hide_render", frame=1)
-            label.keyframe_insert(data_path="hide_viewport", frame=1)
-        
-        # Make the label appear
-        label.hide_render = False
-        label.hide_viewport = False
-        label.keyframe_insert(data_path="hide_render", frame=appear_frame)
-        label.keyframe_insert(data_path="hide_viewport", frame=appear_frame)
-    
-    # Animate camera to follow the plane while keeping Earth in view
-    for i in range(1, frames + 1):
-        bpy.context.scene.frame_set(i)
-        
-        # Get plane position at this frame
-        plane_pos = Vector(plane.location)
-        earth_center = Vector((0, 0, 0))
-        
-        # Position camera to see both plane and Earth
-        camera_distance = (plane_pos - earth_center).magnitude * 1.5
-        camera_direction = (plane_pos - earth_center).normalized()
-        camera.location = earth_center - camera_direction * camera_distance
-        
-        # Make camera look at the plane
-        direction_to_plane = (plane_pos - camera.location).normalized()
-        rotation_quat = direction_to_plane.to_track_quat('-Z', 'Y')
-        camera.rotation_euler = rotation_quat.to_euler()
-        
-        # Set keyframes for camera
-        camera.keyframe_insert(data_path="location", frame=i)
-        camera.keyframe_insert(data_path="rotation_euler", frame=i)
-    
-    # Adjust camera lens for better view
-    camera.data.lens = 20
-    
-    # Set output path
-    scene.render.filepath = args.output
-    
-    # Render animation
-    log(f"Starting render to {args.output}")
-    bpy.ops.render.render(animation=True, write_still=False)
-    
-    log(f"Rendering completed successfully to {args.output}")
-    sys.exit(0)  # Exit with success code
-except Exception as e:
-    log(f"Error during rendering: {str(e)}", "ERROR")
-    import traceback
-    log(f"Traceback: {traceback.format_exc()}", "ERROR")
-    sys.exit(1)  # Exit with error code
-
-    # Create a new scene
-    log("Setting up scene and render settings")
-    scene = bpy.context.scene
-    scene.render.resolution_x = resolution[0]
-    scene.render.resolution_y = resolution[1]
-    scene.render.resolution_percentage = 100
-    scene.render.image_settings.file_format = 'FFMPEG'
-    scene.render.ffmpeg.format = 'MPEG4'
-    scene.render.ffmpeg.codec = 'H264'
-    scene.render.ffmpeg.constant_rate_factor = 'MEDIUM'
-    scene.render.fps = fps
-    scene.frame_start = 1
-    scene.frame_end = frames
-    
-    # Set the render engine to a reliable option with better appearance and speed
-    scene.render.engine = 'BLENDER_WORKBENCH'  # Use Workbench for faster rendering in Blender 4.4.3
-    
-    # Configure workbench renderer for better appearance
-    scene.display.shading.light = 'STUDIO'
-    scene.display.shading.color_type = 'MATERIAL'
-    scene.display.shading.show_shadows = True
-    
-    # Create world environment with a simple blue background and stars
+    log(f"Engine: {scene.render.engine}, resolution: {resolution[0]}x{resolution[1]}, frames: {frames}")
+    return scene
+
+
+def setup_world_and_lights(scene):
+    # Very dark blue background for space
     world = bpy.data.worlds.new("Earth_World")
     world.use_nodes = True
     bg_node = world.node_tree.nodes["Background"]
-    bg_node.inputs[0].default_value = (0.0, 0.0, 0.05, 1.0)  # Very dark blue for space
+    bg_node.inputs[0].default_value = (0.0, 0.0, 0.05, 1.0)
     bg_node.inputs[1].default_value = 1.0  # Strength
-    scene.world = world  # Assign the world to the scene
-    
-    # Add more lighting for better visibility
-    # Add a rim light to highlight the Earth's edges
-    rim_light = bpy.data.lights.new("RimLight", type='SUN')
-    rim_light.energy = 2.0
-    rim_light_obj = bpy.data.objects.new("RimLight", rim_light)
-    bpy.context.collection.objects.link(rim_light_obj)
-    rim_light_obj.location = (-10, 2, 5)
-    rim_light_obj.rotation_euler = (radians(30), radians(-30), 0)
-
-    # Create Earth sphere
+    scene.world = world
+
+    # Main sun, a rim light to highlight the Earth's edges and a fill light
+    for name, energy, location, rotation in [
+        ("Sun", 5.0, (10, -10, 10), (radians(45), radians(45), 0)),
+        ("RimLight", 2.0, (-10, 2, 5), (radians(30), radians(-30), 0)),
+        ("FillLight", 1.0, (0, 5, -5), (radians(-30), 0, 0)),
+    ]:
+        light = bpy.data.lights.new(name, type='SUN')
+        light.energy = energy
+        light_obj = bpy.data.objects.new(name, light)
+        bpy.context.collection.objects.link(light_obj)
+        light_obj.location = location
+        light_obj.rotation_euler = rotation
+
+
+def make_material(name, color, use_nodes, emission=0.0, metallic=0.0, roughness=0.5, alpha=1.0):
+    """
+    Create a material that looks right in both engines: Workbench uses the viewport
+    diffuse color, Eevee the Principled BSDF.
+    """
+    mat = bpy.data.materials.new(name=name)
+    mat.diffuse_color = color
+    if not use_nodes:
+        return mat
+
+    mat.use_nodes = True
+    bsdf = mat.node_tree.nodes.get('Principled BSDF')
+    bsdf.inputs['Base Color'].default_value = color
+    bsdf.inputs['Metallic'].default_value = metallic
+    bsdf.inputs['Roughness'].default_value = roughness
+    if emission > 0:
+        # Renamed from 'Emission' to 'Emission Color' in Blender 4.0
+        emission_input = bsdf.inputs.get('Emission Color') or bsdf.inputs.get('Emission')
+        emission_input.default_value = color
+        bsdf.inputs['Emission Strength'].default_value = emission
+    if alpha < 1.0:
+        bsdf.inputs['Alpha'].default_value = alpha
+    return mat
+
+
+def set_blend_transparent(mat):
+    # blend_method was superseded by surface_render_method in Blender 4.2
+    if hasattr(mat, 'surface_render_method'):
+        mat.surface_render_method = 'BLENDED'
+    else:
+        mat.blend_method = 'BLEND'
+
+
+def create_earth(use_nodes):
     bpy.ops.mesh.primitive_uv_sphere_add(segments=64, ring_count=32, radius=1.0, location=(0, 0, 0))
-    # Make sure we get the active object properly in both GUI and headless mode
     earth = bpy.context.view_layer.objects.active
-    if not earth:
-        # Fallback to finding the object by name
-        for obj in bpy.context.scene.objects:
-            if obj.type == 'MESH':
-                earth = obj
-                break
     earth.name = "Earth"
-    log(f"Created Earth object: {earth.name}")
-
-    # Create simple Earth materials for Workbench renderer
-    # Create blue material for oceans
-    ocean_mat = bpy.data.materials.new(name="Ocean_Material")
-    ocean_mat.diffuse_color = (0.03, 0.15, 0.4, 1.0)  # Deep blue for oceans
-    
-    # Create green material for land
-    land_mat = bpy.data.materials.new(name="Land_Material")
-    land_mat.diffuse_color = (0.15, 0.5, 0.15, 1.0)  # Green for land
-    
-    # Create a simple material for the plane
-    plane_mat = bpy.data.materials.new(name="Plane_Material")
-    plane_mat.diffuse_color = (0.8, 0.0, 0.0, 1.0)  # Red for visibility
-    
-    # Assign material to Earth
-    if earth.data.materials:
-        earth.data.materials[0] = ocean_mat
-    else:
-        earth.data.materials.append(ocean_mat)
-    
-    # Add atmosphere glow - simplified for Workbench renderer
-    atmosphere = bpy.data.materials.new(name="Atmosphere")
-    atmosphere.diffuse_color = (0.1, 0.2, 0.8, 0.5)  # Blue glow with transparency
 
-    # Create atmosphere sphere slightly larger than Earth
+    # Rebuild with a lower-resolution sphere so continents map onto coarse faces
+    sphere = bmesh.new()
+    bmesh.ops.create_uvsphere(sphere, u_segments=32, v_segments=16, radius=1.0)
+    sphere.to_mesh(earth.data)
+    sphere.free()
+
+    earth.data.materials.append(make_material("Ocean_Material", (0.05, 0.3, 0.6, 1.0), use_nodes, roughness=0.2))
+    earth.data.materials.append(make_material("Land_Material", (0.1, 0.5, 0.1, 1.0), use_nodes, roughness=0.7))
+
+    # Rough continent shapes
+    for face in earth.data.polygons:
+        x, y, z = face.center
+        if ((-0.5 > x > -0.9) and (abs(z) < 0.7)            # Americas
+                or (0.2 < x < 0.6) and (-0.2 < z < 0.7)     # Africa and Europe
+                or (0.5 < x < 0.9) and (0.0 < z < 0.7)      # Asia
+                or (0.7 < x < 0.9) and (-0.6 < z < -0.2)    # Australia
+                or abs(z) > 0.8):                           # Polar caps
+            face.material_index = 1
+    return earth
+
+
+def create_atmosphere(use_nodes):
     bpy.ops.mesh.primitive_uv_sphere_add(segments=64, ring_count=32, radius=1.05, location=(0, 0, 0))
-    # Make sure we get the active object properly in both GUI and headless mode
-    atm = bpy.context.view_layer.objects.active
-    if not atm or atm.name == "Earth":  # Make sure we don't get the Earth object
-        # Fallback to finding the object by name or the last created object
-        for obj in bpy.context.scene.objects:
-            if obj.type == 'MESH' and obj != earth:
-                atm = obj
-                break
-    atm.name = "Atmosphere"
-    log(f"Created Atmosphere object: {atm.name}")
-    
-    # Assign atmosphere material
-    if atm.data.materials:
-        atm.data.materials[0] = atmosphere
-    else:
-        atm.data.materials.append(atmosphere)
+    atmosphere = bpy.context.view_layer.objects.active
+    atmosphere.name = "Atmosphere"
+    mat = make_material("Atmosphere", (0.1, 0.2, 0.8, 0.5), use_nodes, emission=0.3, roughness=0.1, alpha=0.3)
+    set_blend_transparent(mat)
+    atmosphere.data.materials.append(mat)
+    return atmosphere
+
 
-    # Make atmosphere partially transparent
-    # Updated for Blender 4.4+ compatibility
-    atmosphere.blend_method = 'BLEND'
+def create_aircraft(use_nodes, glow):
+    bpy.ops.mesh.primitive_cone_add(radius1=0.05, radius2=0.0, depth=0.2, location=(0, 0, 0))
+    plane = bpy.context.view_layer.objects.active
+    plane.name = "Aircraft"
+    plane.data.materials.append(make_material("Plane_Material", (0.8, 0.0, 0.0, 1.0), use_nodes,
+                                              emission=0.5 if glow else 0.0, metallic=0.7, roughness=0.2))
+    return plane
 
-    # Add lighting
-    sun = bpy.data.lights.new("Sun", type='SUN')
-    sun.energy = 5.0
-    sun_obj = bpy.data.objects.new("Sun", sun)
-    bpy.context.collection.objects.link(sun_obj)
-    sun_obj.location = (10, -10, 10)
-    sun_obj.rotation_euler = (radians(45), radians(45), 0)
 
-    # Add camera
+def create_camera(scene, visual):
     camera_data = bpy.data.cameras.new(name='Camera')
     camera = bpy.data.objects.new('Camera', camera_data)
     bpy.context.collection.objects.link(camera)
     scene.camera = camera
 
-    # Position camera
-    camera.location = (0, -5, 2)
-    camera.rotation_euler = (radians(75), 0, 0)
-    camera_data.lens = 35
-
-    # Helper function to convert lat/long to 3D coordinates
-    def latlon_to_xyz(lat, lon, radius=1.0):
-        lat_rad = radians(lat)
-        lon_rad = radians(lon)
-        x = radius * cos(lat_rad) * cos(lon_rad)
-        y = radius * cos(lat_rad) * sin(lon_rad)
-        z = radius * sin(lat_rad)
-        return (x, y, z)
-
-    # Create a plane to represent the aircraft
-    bpy.ops.mesh.primitive_cone_add(radius1=0.05, radius2=0.0, depth=0.2, location=(0, 0, 0))
-    # Make sure we get the active object properly in both GUI and headless mode
-    plane = bpy.context.view_layer.objects.active
-    if not plane or plane.name in ["Earth", "Atmosphere"]:
-        # Fallback to finding the object by name or the last created object
-        for obj in bpy.context.scene.objects:
-            if obj.type == 'MESH' and obj != earth and obj != atm:
-                plane = obj
-                break
-    plane.name = "Aircraft"
-    log(f"Created Aircraft object: {plane.name}")
-    
-    # Rotate to point along Y axis
-    plane.rotation_euler = (0, radians(90), 0)
-    
-    # Assign plane material
-    if plane.data.materials:
-        plane.data.materials[0] = plane_mat
-    # We already assigned the material above
-
-    # Helper function for great circle path calculation
-    def great_circle_points(start_lat, start_lon, end_lat, end_lon, steps=100):
-        log(f"Calculating great circle: {start_lat},{start_lon} to {end_lat},{end_lon}")
-        
-        # Convert to radians
-        start_lat_rad = radians(start_lat)
-        start_lon_rad = radians(start_lon)
-        end_lat_rad = radians(end_lat)
-        end_lon_rad = radians(end_lon)
-        
-        # Use safer haversine formula
-        d_lon = end_lon_rad - start_lon_rad
-        
-        # Check if points are nearly identical
-        if abs(end_lat_rad - start_lat_rad) < 1e-10 and abs(d_lon) < 1e-10:
-            log("Points are nearly identical, using linear interpolation", "WARNING")
-            # Just do linear interpolation for nearly identical points
-            points = []
-            for i in range(steps + 1):
-                t = i / steps
-                x = cos(start_lat_rad) * cos(start_lon_rad)
-                y = cos(start_lat_rad) * sin(start_lon_rad)
-                z = sin(start_lat_rad)
-                points.append((x, y, z))
-            return points
-            
-        # Calculate the value for asin safely
-        a = sin((end_lat_rad - start_lat_rad) / 2) ** 2
-        b = cos(start_lat_rad) * cos(end_lat_rad) * sin(d_lon / 2) ** 2
-        sin_sigma = sqrt(a + b)
-        
-        # Ensure we're in domain for asin
-        sin_sigma = max(-1.0, min(sin_sigma, 1.0))
-        d_sigma = 2 * asin(sin_sigma)
-        
-        log(f"Great circle distance: {d_sigma} radians")
-        
-        points = []
-        for i in range(steps + 1):
-            t = i / steps
-            
-            # Special case for nearly zero angle
-            if abs(d_sigma) < 1e-10:
-                # Linear interpolation
-                x = cos(start_lat_rad) * cos(start_lon_rad)
-                y = cos(start_lat_rad) * sin(start_lon_rad)
-                z = sin(start_lat_rad)
-            else:
-                # Calculate intermediate point at t on the great circle
-                A = sin((1 - t) * d_sigma) / sin(d_sigma)
-                B = sin(t * d_sigma) / sin(d_sigma)
-                
-                x = A * cos(start_lat_rad) * cos(start_lon_rad) + B * cos(end_lat_rad) * cos(end_lon_rad)
-                y = A * cos(start_lat_rad) * sin(start_lon_rad) + B * cos(end_lat_rad) * sin(end_lon_rad)
-                z = A * sin(start_lat_rad) + B * sin(end_lat_rad)
-            
-            # Normalize the vector to ensure it's on the unit sphere
-            mag = sqrt(x**2 + y**2 + z**2)
-            x, y, z = x/mag, y/mag, z/mag
-            
-            # Convert to Cartesian coordinates (already done)
-            points.append((x, y, z))
-        
-        return points
-
-    # Create waypoints from locations
-    waypoints = []
-    for loc in locations:
-        lat = loc['lat']
-        lon = loc['lon']
-        waypoints.append((lat, lon))
-
-    # Calculate frames per segment
-    total_segments = len(waypoints) - 1
-    frames_per_segment = frames // total_segments
-    
-    # Create location labels
+    camera.location = (0, -3, 2.5)
+    camera.rotation_euler = (radians(65), 0, 0)
+    # Wider field of view for the close follow camera
+    camera_data.lens = 24 if visual['camera'] == 'follow' else 35
+    return camera
+
+
+def latlon_to_xyz(lat, lon, radius=1.0):
+    lat_rad = radians(lat)
+    lon_rad = radians(lon)
+    x = radius * cos(lat_rad) * cos(lon_rad)
+    y = radius * cos(lat_rad) * sin(lon_rad)
+    z = radius * sin(lat_rad)
+    return (x, y, z)
+
+
+def great_circle_points(start_lat, start_lon, end_lat, end_lon, steps=100):
+    """Points on the unit sphere along the great circle between two locations (steps + 1 points)."""
+    start = latlon_to_xyz(start_lat, start_lon)
+    end = latlon_to_xyz(end_lat, end_lon)
+
+    # Angular distance via the haversine formula, clamped into asin's domain
+    start_lat_rad, end_lat_rad = radians(start_lat), radians(end_lat)
+    d_lon = radians(end_lon) - radians(start_lon)
+    a = sin((end_lat_rad - start_lat_rad) / 2) ** 2
+    b = cos(start_lat_rad) * cos(end_lat_rad) * sin(d_lon / 2) ** 2
+    d_sigma = 2 * asin(max(-1.0, min(sqrt(a + b), 1.0)))
+
+    if abs(d_sigma) < 1e-10 or steps == 0:
+        # Identical points (or a single frame): hold position
+        return [start] * (steps + 1)
+
+    points = []
+    for i in range(steps + 1):
+        t = i / steps
+        A = sin((1 - t) * d_sigma) / sin(d_sigma)
+        B = sin(t * d_sigma) / sin(d_sigma)
+        x = A * start[0] + B * end[0]
+        y = A * start[1] + B * end[1]
+        z = A * start[2] + B * end[2]
+
+        # Normalize to stay on the unit sphere
+        mag = sqrt(x ** 2 + y ** 2 + z ** 2)
+        points.append((x / mag, y / mag, z / mag))
+    return points
+
+
+def create_labels(waypoints, names):
     labels = []
     for i, (lat, lon) in enumerate(waypoints):
-        # Convert lat/lon to 3D position
-        pos = Vector(latlon_to_xyz(lat, lon, 1.02))  # Slightly above Earth surface
-        
-        # Create text object for the label
+        pos = Vector(latlon_to_xyz(lat, lon, FLIGHT_ALTITUDE))
+
         label_text = bpy.data.curves.new(type="FONT", name=f"LabelText{i}")
-        label_text.body = location_names[i]
+        label_text.body = names[i]
         label_text.size = 0.05
         label_text.align_x = 'CENTER'
-        
-        # Create the text object
+        label_text.align_y = 'CENTER'
+
         label_obj = bpy.data.objects.new(f"Label{i}", label_text)
         bpy.context.collection.objects.link(label_obj)
-        
-        # Position the label above the location point
-        label_obj.location = pos + Vector((0, 0, 0.1))
-        
-        # Make the label face the camera
+        label_obj.location = pos + Vector((0, 0, 0.05))
         label_obj.rotation_euler = (radians(90), 0, 0)
-        
-        # Store the label object for animation
         labels.append(label_obj)
-    
-    # Create a curve object for the trail
+    return labels
+
+
+def create_trail(use_nodes, glow):
     curve_data = bpy.data.curves.new('FlightTrail', type='CURVE')
     curve_data.dimensions = '3D'
     curve_data.resolution_u = 2
     curve_data.bevel_depth = 0.01  # Thickness of the trail
-    
-    # Create the trail object
     trail_obj = bpy.data.objects.new("FlightTrail", curve_data)
     bpy.context.collection.objects.link(trail_obj)
-    
-    # Assign the yellow material to the trail
-    if trail_obj.data.materials:
-        trail_obj.data.materials[0] = trail_mat
+    trail_obj.data.materials.append(make_material("Trail_Material", (1.0, 1.0, 0.0, 1.0), use_nodes,
+                                                  emission=1.0 if glow else 0.0))
+    spline = curve_data.splines.new('POLY')
+    return spline
+
+
+def build_trail(spline, points):
+    """Write the whole trail geometry in one bulk call."""
+    spline.points.add(len(points) - 1)
+    coords = []
+    for point in points:
+        coords.extend((point.x, point.y, point.z, 1.0))
+    spline.points.foreach_set('co', coords)
+
+
+def animate_trail_reveal(curve_data, marks, point_count):
+    """
+    Reveal the trail behind the aircraft by animating the bevel end factor.
+
+    With 'RESOLUTION' mapping the factor is proportional to the point index along a
+    POLY spline, and the aircraft advances one point per frame once it departs, so
+    linear keys at leg boundaries and departures reproduce the per-frame growth exactly.
+    """
+    curve_data.bevel_factor_mapping_end = 'RESOLUTION'
+    curve_data.bevel_factor_start = 0.0
+
+    edit_prefs = bpy.context.preferences.edit
+    previous_interpolation = edit_prefs.keyframe_new_interpolation_type
+    edit_prefs.keyframe_new_interpolation_type = 'LINEAR'
+    try:
+        last_index = max(1, point_count - 1)
+        for frame, index in marks:
+            curve_data.bevel_factor_end = index / last_index
+            curve_data.keyframe_insert(data_path="bevel_factor_end", frame=frame)
+    finally:
+        edit_prefs.keyframe_new_interpolation_type = previous_interpolation
+
+
+def aircraft_orientation(point, next_point, state):
+    """
+    Rotation that points the aircraft along the path with its up axis radial.
+
+    ``state`` carries the previous direction/right vectors across frames for the
+    degenerate cases (stationary aircraft, direction parallel to up).
+    """
+    current = Vector(point)
+    direction = Vector(next_point) - current
+    if direction.length > 0.0001:
+        direction.normalize()
     else:
-        trail_obj.data.materials.append(trail_mat)
-    
-    # Create flight path and animate plane
-    for i in range(total_segments):
+        direction = state.get('direction', Vector((1, 0, 0)))
+    state['direction'] = direction
+
+    up = -current.normalized()
+    if abs(direction.dot(up)) > 0.999:
+        right = state.get('right')
+        if right is None:
+            reference = Vector((0, 0, 1)) if abs(up.z) < 0.9 else Vector((0, 1, 0))
+            right = up.cross(reference).normalized()
+        forward = up.cross(right).normalized()
+        direction = forward if direction.dot(forward) >= 0 else -forward
+
+    right = up.cross(direction).normalized()
+    state['right'] = right
+    forward = right.cross(up).normalized()
+
+    rot_matrix = Matrix()
+    rot_matrix[0].xyz = up.cross(forward)
+    rot_matrix[1].xyz = up
+    rot_matrix[2].xyz = forward
+    rot_matrix.transpose()
+    return rot_matrix.to_4x4()
+
+
+def animate_flight(scene, plane, spline, waypoints, legs):
+    state = {}
+    trail_points = []
+    # (frame, index of the trail's last point at that frame) at each leg's first, departure and last frame
+    reveal_marks = []
+    for i, leg in enumerate(legs):
+        first_frame, leg_frames = leg[:2]
+        # The aircraft waits at the start for the dwell frames, then flies the rest
+        dwell = min(leg[2], leg_frames - 1) if len(leg) > 2 else 0
         start_lat, start_lon = waypoints[i]
         end_lat, end_lon = waypoints[i + 1]
-        
-        # Get great circle points between waypoints
-        path_points = great_circle_points(start_lat, start_lon, end_lat, end_lon, steps=frames_per_segment)
-        
-        # Animate plane position along path
+        flight_points = great_circle_points(start_lat, start_lon, end_lat, end_lon,
+                                            steps=max(0, leg_frames - dwell - 1))
+        path_points = flight_points[:1] * dwell + flight_points
+        if 'direction' not in state and len(flight_points) > 1:
+            # Nothing flown yet: wait facing the way the aircraft will depart
+            departure = Vector(flight_points[1]) - Vector(flight_points[0])
+            if departure.length > 0.0001:
+                state['direction'] = departure.normalized()
+
         for j, point in enumerate(path_points):
-            frame_num = i * frames_per_segment + j + 1
-            bpy.context.scene.frame_set(frame_num)
-            
-            # Set plane position
-            plane_pos = Vector(point) * 1.02  # Slightly above Earth's surface
+            frame_num = first_frame + j
+            if frame_num > scene.frame_end:
+                continue
+
+            plane_pos = Vector(point) * FLIGHT_ALTITUDE
             plane.location = plane_pos
             plane.keyframe_insert(data_path="location", frame=frame_num)
-            
-            # Update the trail curve at each frame
-            if j == 0 and i == 0:
-                # Create the first point of the trail
-                spline = curve_data.splines.new('POLY')
-                spline.points.add(1)
-                spline.points[0].co = (plane_pos.x, plane_pos.y, plane_pos.z, 1)
-                spline.points[1].co = (plane_pos.x, plane_pos.y, plane_pos.z, 1)
-            else:
-                # Add a new point to the trail
-                spline = curve_data.splines[0]
-                spline.points.add(1)
-                spline.points[-1].co = (plane_pos.x, plane_pos.y, plane_pos.z, 1)
-            
-            # Animate the trail visibility
-            trail_obj.keyframe_insert(data_path="hide_render", frame=frame_num)
-            trail_obj.keyframe_insert(data_path="hide_viewport", frame=frame_num)
-            
-            # Calculate plane orientation
+
+            # Skip points that coincide with the previous one (leg joins, stationary legs)
+            if not trail_points or (trail_points[-1] - plane_pos).length > 0.0001:
+                trail_points.append(plane_pos)
+            if j in (0, dwell, len(path_points) - 1) or frame_num == scene.frame_end:
+                reveal_marks.append((frame_num, len(trail_points) - 1))
+
             if j < len(path_points) - 1:
-                # Look-at the next point
-                next_point = Vector(path_points[j + 1])
-                direction = (next_point - Vector(point)).normalized()
-                
-                # Up vector is toward the center of the Earth (normalized location)
-                up = -Vector(point).normalized()
-                
-                # Calculate rotation to align with flight direction
-                forward = direction
-                right = forward.cross(up)
-                up = right.cross(forward)
-                
-                # Create rotation matrix
-                rot_matrix = Matrix((right, forward, up)).transposed().to_4x4()
-                plane.matrix_world = rot_matrix
-                plane.matrix_world.translation = Vector(point) * 1.02
-                
-                # Insert keyframe
+                rotation = aircraft_orientation(point, path_points[j + 1], state)
+                plane.matrix_world = Matrix.Translation(plane_pos) @ rotation
                 plane.keyframe_insert(data_path="rotation_euler", frame=frame_num)
 
-    # Orbit camera around the Earth to follow the plane
-    # Position camera to get a wider view
+    build_trail(spline, trail_points)
+    animate_trail_reveal(spline.id_data, reveal_marks, len(trail_points))
+
+
+def set_label_visible(label, visible, frame):
+    label.hide_render = not visible
+    label.keyframe_insert(data_path="hide_render", frame=frame)
+    label.hide_viewport = not visible
+    label.keyframe_insert(data_path="hide_viewport", frame=frame)
+
+
+def animate_labels(labels, legs, frames):
+    """Show each label while the aircraft flies the leg starting there; the last stays visible."""
+    for i, label in enumerate(labels):
+        appear_frame = legs[i][0] if i < len(legs) else legs[-1][0] + legs[-1][1]
+        appear_frame = min(appear_frame, frames)
+        if appear_frame > 1:
+            set_label_visible(label, False, appear_frame - 1)
+        set_label_visible(label, True, appear_frame)
+
+        if i < len(legs):
+            disappear_frame = legs[i][0] + legs[i][1]
+            if disappear_frame <= frames:
+                set_label_visible(label, False, disappear_frame)
+            else:
+                set_label_visible(label, True, frames)
+        else:
+            set_label_visible(label, True, frames)
+
+
+def look_at_rotation(camera_location, target, up_hint):
+    forward = target - camera_location
+    if forward.length > 0.0001:
+        forward.normalize()
+    else:
+        forward = Vector((0, 0, -1))
+
+    z_axis = -forward
+    x_axis = up_hint.cross(z_axis)
+    if x_axis.length > 0.0001:
+        x_axis.normalize()
+    else:
+        x_axis = up_hint.cross(Vector((0, 0, 1)) if abs(up_hint.z) < 0.9 else Vector((1, 0, 0))).normalized()
+    y_axis = z_axis.cross(x_axis).normalized()
+
+    rot_matrix = Matrix()
+    rot_matrix[0].xyz = x_axis
+    rot_matrix[1].xyz = y_axis
+    rot_matrix[2].xyz = z_axis
+    rot_matrix.transpose()
+    return rot_matrix.to_euler('XYZ')
+
+
+def animate_camera(scene, camera, plane, frames, mode):
+    """
+    Key the camera on every frame.
+
+    "follow" hovers above the aircraft looking straight down with north up;
+    "orbit" stays further out on the aircraft's side of the globe for a wide view.
+    """
     for i in range(1, frames + 1):
-        bpy.context.scene.frame_set(i)
-        
-        # Get current plane position
-        plane_pos = Vector(plane.location)
-        
-        # Calculate more distant camera position to see more of the Earth
-        # Start further back for a better view
-        camera_offset = Vector((-2.0, -2.0, 1.0))  # Further away for a better view
-        camera.location = plane_pos + camera_offset
-        
-        # Look at the plane
-        direction = (plane_pos - camera.location).normalized()
-        
-        # Set camera rotation to look at plane
-        camera.rotation_euler = direction.to_track_quat('Z', 'Y').to_euler()
-        
-        # Insert keyframe
+        scene.frame_set(i)
+
+        plane_pos = plane.matrix_world.translation.copy()
+        radial = plane_pos.normalized() if plane_pos.length > 0 else Vector((0, 0, 1))
+
+        if mode == 'orbit':
+            camera.location = radial * 3.0
+        else:
+            camera.location = plane_pos + radial * 0.8
+
+        # Keep north up by projecting the global Y axis onto the view plane
+        up_hint = None
+        for axis in (Vector((0, 1, 0)), Vector((1, 0, 0)), Vector((0, 0, 1))):
+            projected = axis - axis.dot(radial) * radial
+            if projected.length >= 0.001:
+                up_hint = projected.normalized()
+                break
+
+        camera.rotation_euler = look_at_rotation(camera.location, plane_pos, up_hint)
         camera.keyframe_insert(data_path="location", frame=i)
         camera.keyframe_insert(data_path="rotation_euler", frame=i)
-    
-    # Set camera lens for wider view
-    camera.data.lens = 20  # Wider angle lens
-
-    # Set render output path
-    scene.render.filepath = args.output
-    log(f"Setting render output path to: {args.output}")
-    
-    # Ensure the output directory exists
-    output_dir = os.path.dirname(args.output)
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Render animation
-    log("Starting render process")
-    bpy.ops.render.render(animation=True, write_still=False)
-    
-    log(f"Animation rendered to {args.output}")
-    
-    # Verify the output file exists
-    if os.path.exists(args.output):
-        log(f"Output file successfully created at: {args.output}")
-        file_size = os.path.getsize(args.output)
-        log(f"File size: {file_size} bytes")
+
+
+def render(scene, config, output, timer):
+    frame_pipe = config.get('frame_pipe')
+    if frame_pipe:
+        # Encode-while-render: stream each finished frame to the external encoder
+        # reading the pipe, instead of encoding in Blender after every frame
+        frame_format = config.get('frame_format', 'BMP')
+        scene.render.image_settings.file_format = frame_format
+        frame_path = os.path.join(os.path.dirname(frame_pipe), f"frame.{frame_format.lower()}")
+        scene.render.filepath = frame_path
+
+        # Runs of identical frames (first_frame -> count) are rendered once and
+        # written count times
+        holds = {first_frame: count for first_frame, count in config.get('holds', [])}
+
+        log(f"Streaming frames to encoder pipe {frame_pipe}")
+        last_progress = time.monotonic()
+        rendered = 0
+        with open(frame_pipe, 'wb') as pipe:
+            i = scene.frame_start
+            while i <= scene.frame_end:
+                repeat = min(holds.get(i, 1), scene.frame_end - i + 1)
+                with timer.phase("frame_set", span=False):
+                    scene.frame_set(i)
+                with timer.phase("rasterize", span=False):
+                    bpy.ops.render.render(write_still=True)
+                rendered += 1
+                # Blocks while the encoder is behind
+                with timer.phase("pipe_write", span=False):
+                    with open(frame_path, 'rb') as frame_file:
+                        frame = frame_file.read()
+                    for _ in range(repeat):
+                        pipe.write(frame)
+                i += repeat
+                if time.monotonic() - last_progress >= PROGRESS_INTERVAL:
+                    last_progress = time.monotonic()
+                    log(f"Streamed frame {i - 1} of {scene.frame_end}")
+        log(f"Streamed {scene.frame_end - scene.frame_start + 1} frames ({rendered} rendered) for {output}")
     else:
-        log(f"Output file was not created at: {args.output}", "ERROR")
-    
-except Exception as e:
-    log(f"Error during rendering: {str(e)}", "ERROR")
-    log(traceback.format_exc(), "ERROR")
-    sys.exit(1)
-
-log("Script completed successfully")
-sys.exit(0)
+        scene.render.filepath = output
+        log(f"Starting render to {output}")
+        # Rasterization and Blender's own encoding, frame by frame
+        with timer.phase("rasterize_and_encode"):
+            bpy.ops.render.render(animation=True, write_still=False)
+        log(f"Rendering completed successfully to {output}")
+
+
+def main():
+    log("Starting Blender flight path animation script")
+    timer = None
+    try:
+        started = time.perf_counter()
+        args = parse_args()
+        log(f"Config file: {args.config}")
+        log(f"Output file: {args.output}")
+
+        with open(args.config, 'r') as f:
+            config = json.load(f)
+        timer = PhaseTimer(config.get('profile_dir'), config.get('trace'))
+        timer.totals["load_config"] = time.perf_counter() - started
+        # Summarize rather than dump the config: it embeds every location and profile
+        log(f"Loaded configuration: {len(config.get('locations', []))} locations, "
+            f"{len(config.get('legs', []))} legs, keys {sorted(config)}")
+
+        locations = config['locations']
+        fps = config.get('fps', 30)
+        duration = config['duration']
+        # An explicit frame count wins, e.g. for cached tour legs
+        frames = config.get('frames') or fps * duration
+        profile, visual = load_profiles(config)
+        log(f"Rendering with: {len(locations)} locations, {config['quality']} quality, "
+            f"visual '{visual['name']}', {fps} fps, {frames} frames")
+
+        with timer.phase("scene_setup"):
+            scene = setup_scene(config, profile, visual, frames)
+            use_nodes = scene.render.engine != 'BLENDER_WORKBENCH'
+            setup_world_and_lights(scene)
+
+            create_earth(use_nodes)
+            if visual['atmosphere']:
+                create_atmosphere(use_nodes)
+            plane = create_aircraft(use_nodes, visual['glow'])
+            camera = create_camera(scene, visual)
+
+        waypoints = [(loc['lat'], loc['lon']) for loc in locations]
+        names = [loc.get('name', f"Location {i + 1}") for i, loc in enumerate(locations)]
+        # (first_frame, frame_count[, dwell_frames]) per leg, sized by distance on the server
+        legs = [tuple(leg) for leg in config['legs']]
+
+        with timer.phase("keyframing"):
+            spline = create_trail(use_nodes, visual['glow'])
+            animate_flight(scene, plane, spline, waypoints, legs)
+
+            if visual['labels']:
+                labels = create_labels(waypoints, names)
+                animate_labels(labels, legs, frames)
+
+            animate_camera(scene, camera, plane, frames, visual['camera'])
+
+        with timer.phase("render"):
+            render(scene, config, args.output, timer)
+        timer.report()
+        timer.write_spans()
+
+    except Exception as e:
+        log(f"Error during rendering: {str(e)}", "ERROR")
+        log(traceback.format_exc(), "ERROR")
+        if timer is not None:
+            # The spans up to the failure show where it happened
+            timer.write_spans()
+        sys.exit(1)
+
+    log("Script completed successfully")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
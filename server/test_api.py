@@ -1,6 +1,5 @@
 import requests
 import json
-import time
 import argparse
 
 def main():
@@ -42,11 +41,16 @@ def main():
             job_id = result.get("job_id")
             print(f"✅ Animation request submitted - Job ID: {job_id}")
             
-            # Poll job status
+            # Long-poll job status: the server holds each request until the job
+            # changes (or 30s pass), answering 304 if nothing changed
             max_attempts = 60  # Maximum number of status checks
+            etag, job_status = None, {}
             for i in range(max_attempts):
-                job_response = requests.get(f"{args.host}/job/{job_id}")
-                job_status = job_response.json()
+                headers = {"If-None-Match": etag} if etag else {}
+                job_response = requests.get(f"{args.host}/job/{job_id}", params={"wait": 30}, headers=headers)
+                if job_response.status_code != 304:
+                    job_status = job_response.json()
+                    etag = job_response.headers.get("ETag")
                 status = job_status.get("status")
                 
                 print(f"Job status: {status} (attempt {i+1}/{max_attempts})")
@@ -59,9 +63,6 @@ def main():
                 elif status == "failed":
                     print(f"❌ Animation failed: {job_status.get('error', 'Unknown error')}")
                     break
-                
-                # Wait before next check
-                time.sleep(5)
             else:
                 print("❌ Job polling timed out")
         else: